@@ -1,21 +1,13 @@
-from langgraph.prebuilt import create_react_agent
+import threading
 from datetime import datetime
 
-from tools.gmail_tools import create_draft
-from tools.calendar_tools import (
-    create_calendar_event,
-    update_calendar_event,
-    get_calendar_events,
-    delete_calendar_event,
-)
-from models import gemini_2_5_pro_exp
+from tools.agent_checkpoints import AGENT_CHECKPOINTS, open_checkpointer
 
+# LangGraph, the tools and the Gemini models are imported when the first agent
+# is built, so importing this module (and main.py) stays cheap.
 
-email_draft_assistant = create_react_agent(
-    tools=[create_draft],
-    model=gemini_2_5_pro_exp,
-    prompt=(
-        """
+
+DRAFT_PROMPT = """
         You are an email assistant expert at communication and managing User's emails.
         You have access to the following tools that utilize Google's Gmail API.
         - create_draft: Creates a draft email in Gmail, optionally as a reply to an existing message.
@@ -27,15 +19,8 @@ email_draft_assistant = create_react_agent(
 
         You will be provided with the incoming email details to do your analysis
         """
-        + f"The current system date and time is {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}, day of the week: {datetime.now().strftime('%A')} and timezone: {datetime.now().strftime('%Z')}"
-    ),
-)
-
-email_assistant_with_scheduling = create_react_agent(
-    tools=[create_draft, create_calendar_event, update_calendar_event, get_calendar_events, delete_calendar_event],
-    model=gemini_2_5_pro_exp,
-    prompt=(
-        """
+
+SCHEDULING_PROMPT = """
         <background>
 
         You are an email assistant expert at communication and managing User's emails.
@@ -44,8 +29,9 @@ email_assistant_with_scheduling = create_react_agent(
         - create_draft: Creates a draft email in Gmail, optionally as a reply to an existing message.
         - create_calendar_event: Creates a new calendar event.
         - update_calendar_event: Updates an existing calendar event.
-        - get_calendar_events: Retrieves calendar events.
+        - get_calendar_events: Retrieves calendar events as a table, one page at a time; pass next_cursor to get the next page.
         - delete_calendar_event: Deletes a calendar event.
+        - find_matching_events: Finds existing events that likely match a title and start time, with a match score.
 
         </background>
         <instructions>
@@ -62,13 +48,127 @@ email_assistant_with_scheduling = create_react_agent(
 
         <important_notes>
         1. Follow the instructions carefully and do not deviate from them. Do not ask for confirmations for any additional information
-        1. Do not create duplicate events in the calendar. Always fetch the calendar events and check if the event already exists before creating a new one.
+        1. Do not create duplicate events in the calendar. Always use find_matching_events to check if the event already exists before creating a new one. A score above 0.7 means the event very likely exists.
         2. If the event already exists, update the event instead of creating a new one.
-        3. If the event does not exist, create a new event.
+        3. If the event does not exist, create a new event. Pass the Gmail message ID followed by a short slug of the event title as idempotency_key, for eg. 18f2a9c3d4e5:team-sync.
         4. If the event is deleted, delete the event.
-        5. DO NOT REPEAT YOUR STEPS. STOP PROCESSING ONCE THE DRAFT IS CREATED.
+        5. Tool calls made in the same turn run in parallel. Batch independent calls (e.g. checking several events, or creating several unrelated events) into one turn.
+        6. DO NOT REPEAT YOUR STEPS. STOP PROCESSING ONCE THE DRAFT IS CREATED.
         </important_notes>
         """
-        + f"The current system date and time is {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}, day of the week: {datetime.now().strftime('%A')} and timezone: {datetime.now().strftime('%Z')}"
-    ),
-)
\ No newline at end of file
+
+
+def current_date_note():
+    # Part of the cached prompt: a cached reply is never replayed on another day
+    now = datetime.now().astimezone()
+    return f"The current system date is {now.strftime('%Y-%m-%d')}, day of the week: {now.strftime('%A')} and timezone: {now.strftime('%Z')}"
+
+
+def current_time_note():
+    return f"The current system time is {datetime.now().astimezone().strftime('%H:%M')}."
+
+
+def dynamic_prompt(system_prompt):
+    """
+    Prompt callable rendering the current date and time on every model call.
+
+    The time of day goes into a separate system message left out of the LLM
+    cache key, so replies stay cacheable for the whole day.
+    """
+    from langchain_core.messages import SystemMessage
+    from tools.llm_cache import UNCACHED_MESSAGE_NAME
+
+    def prompt(state):
+        return [
+            SystemMessage(content=system_prompt + current_date_note()),
+            SystemMessage(content=current_time_note(), name=UNCACHED_MESSAGE_NAME),
+        ] + state["messages"]
+
+    return prompt
+
+
+def build_draft_assistant(model, checkpointer=None):
+    """Builds the reply-only agent around the given chat model."""
+    from langgraph.prebuilt import create_react_agent
+    from tools.gmail_tools import create_draft
+    from tools.tool_execution import OrderedToolNode
+
+    return create_react_agent(
+        tools=OrderedToolNode([create_draft]),
+        model=model,
+        prompt=dynamic_prompt(DRAFT_PROMPT),
+        checkpointer=checkpointer,
+    )
+
+
+def build_scheduling_assistant(model, checkpointer=None):
+    """Builds the agent that drafts replies and manages calendar events."""
+    from langgraph.prebuilt import create_react_agent
+    from tools.calendar_tools import (
+        create_calendar_event,
+        delete_calendar_event,
+        find_matching_events,
+        get_calendar_events,
+        update_calendar_event,
+    )
+    from tools.gmail_tools import create_draft
+    from tools.tool_execution import OrderedToolNode
+
+    return create_react_agent(
+        # Independent tool calls of one turn run concurrently, calls on the same event in order
+        tools=OrderedToolNode(
+            [
+                create_draft,
+                create_calendar_event,
+                update_calendar_event,
+                get_calendar_events,
+                delete_calendar_event,
+                find_matching_events,
+            ]
+        ),
+        model=model,
+        prompt=dynamic_prompt(SCHEDULING_PROMPT),
+        checkpointer=checkpointer,
+    )
+
+
+_agents = {}
+_agents_lock = threading.Lock()
+
+
+def get_checkpointer():
+    """Agent steps are checkpointed per Gmail message ID with AGENT_CHECKPOINTS=1."""
+    with _agents_lock:
+        if "checkpointer" not in _agents:
+            _agents["checkpointer"] = open_checkpointer() if AGENT_CHECKPOINTS else None
+        return _agents["checkpointer"]
+
+
+def _get_agent(name, build):
+    agent = _agents.get(name)
+    if agent is None:
+        checkpointer = get_checkpointer()
+        with _agents_lock:
+            agent = _agents.get(name)
+            if agent is None:
+                from models import gemini_2_5_pro_exp
+
+                agent = _agents[name] = build(gemini_2_5_pro_exp, checkpointer)
+    return agent
+
+
+def email_draft_assistant():
+    """Returns the reply-only agent, building it on first use."""
+    return _get_agent("draft", build_draft_assistant)
+
+
+def email_assistant_with_scheduling():
+    """Returns the scheduling agent, building it on first use."""
+    return _get_agent("scheduling", build_scheduling_assistant)
+
+
+def install_agents(draft_assistant, scheduling_assistant):
+    """Pins ready-made agents, e.g. around another chat model; the offline benchmark uses this."""
+    with _agents_lock:
+        _agents["draft"] = draft_assistant
+        _agents["scheduling"] = scheduling_assistant
@@ -0,0 +1 @@
+"""Offline benchmark harness: fake Google services, a scripted chat model and synthetic inboxes."""
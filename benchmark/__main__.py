@@ -0,0 +1,85 @@
+"""Command line entry point: ``python -m benchmark``."""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+from benchmark.corpus import generate_corpus, load_corpus, save_corpus
+from benchmark.run import run_benchmark
+from tools.metrics import metrics
+
+
+def format_report(report):
+    lines = [
+        f"emails:                 {report['emails']} ({report['workers']} workers)",
+        f"elapsed:                {report['elapsed_seconds']} s",
+        f"throughput:             {report['emails_per_second']} emails/s",
+        f"latency p50 / p95:      {report['latency_p50_ms']} ms / {report['latency_p95_ms']} ms",
+        f"API round trips/email:  {report['api_round_trips_per_email']}",
+        f"API calls/email:        {report['api_calls_per_email']}",
+        f"API retries:            {report['api_retries']}",
+        f"model calls/email:      {report['model_calls_per_email']}",
+        f"tokens/email:           {report['prompt_tokens_per_email']} prompt, "
+        f"{report['completion_tokens_per_email']} completion",
+        f"drafts / events:        {report['drafts_created']} / {report['events_created']}",
+        f"queued / dead letters:  {report['queued_for_retry']} / {report['dead_letters']}",
+        f"logging:                {report['log_format']}, {report['log_events_per_email']} events/email, "
+        f"{report['log_kb_per_email']} KB/email, {report['log_truncated_fields']} truncated, "
+        f"{report['log_sampled_out']} sampled out, {report['log_dropped']} dropped, "
+        f"flush {report['log_flush_ms']} ms",
+        "outcomes:               " + ", ".join(f"{k}={v}" for k, v in report["outcomes"].items()),
+        "API calls:",
+    ]
+    lines += [f"  {method:<28}{count}" for method, count in report["api_calls"].items()]
+    if not report["valid"]:
+        lines += ["INVALID RUN:"] + [f"  {problem}" for problem in report["problems"]]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the email pipeline")
+    parser.add_argument("--emails", type=int, default=200, help="Size of the generated inbox")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated inbox")
+    parser.add_argument("--corpus", help="Replay a corpus saved with --save-corpus instead")
+    parser.add_argument("--save-corpus", help="Write the inbox to this JSON lines file")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("EMAIL_WORKERS", "4")))
+    parser.add_argument("--batch-size", type=int, help="Emails per check_recent_emails cycle")
+    parser.add_argument("--api-latency-ms", type=float, default=20, help="Per Google API round trip")
+    parser.add_argument("--model-latency-ms", type=float, default=50, help="Per model call")
+    parser.add_argument("--api-error-rate", type=float, default=0.0, help="Share of API requests failing with 429")
+    parser.add_argument("--log-level", default="WARNING", help="Application log level during the run")
+    parser.add_argument(
+        "--log-format",
+        choices=["console", "json"],
+        default="console",
+        help="Application log output during the run; use with --log-level info to measure logging overhead",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--metrics", action="store_true", help="Also print the Prometheus metrics of the run")
+    args = parser.parse_args()
+
+    messages = load_corpus(args.corpus) if args.corpus else generate_corpus(args.emails, args.seed)
+    if args.save_corpus:
+        save_corpus(messages, os.path.abspath(args.save_corpus))
+
+    report = run_benchmark(
+        messages,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        api_latency_seconds=args.api_latency_ms / 1000,
+        model_latency_seconds=args.model_latency_ms / 1000,
+        api_error_rate=args.api_error_rate,
+        log_level=getattr(logging, args.log_level.upper()),
+        log_format=args.log_format,
+    )
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    if args.metrics:
+        print(metrics.render_prometheus())
+    if not report["valid"]:
+        sys.exit("benchmark run invalid: " + "; ".join(report["problems"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""In-memory stand-ins for the Gmail and Calendar API services."""
+
+import base64
+import copy
+import email
+import itertools
+import random
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+import httplib2
+from googleapiclient.errors import HttpError
+from tools.calendar_cache import event_bounds, idempotency_key, parse_event_time
+from tools.metrics import metrics
+from tools.rate_limit import rate_limiter
+
+PAGE_SIZE = 100
+
+
+def http_error(status: int, reason: str = "", headers: Optional[Dict[str, str]] = None) -> HttpError:
+    resp = httplib2.Response({"status": status, **(headers or {})})
+    resp.reason = reason
+    return HttpError(resp, reason.encode())
+
+
+class ApiRecorder:
+    """
+    Counts API calls and HTTP round trips and simulates per-request latency.
+
+    With ``error_rate`` set, that share of single requests fails with a 429
+    (with ``Retry-After`` when ``retry_after_seconds`` is given) to exercise
+    the rate limiter's retries.
+    """
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.0,
+        error_rate: float = 0.0,
+        retry_after_seconds: Optional[float] = None,
+        seed: int = 0,
+    ):
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self.retry_after_seconds = retry_after_seconds
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Counter = Counter()
+        self.round_trips = 0
+
+    def record(self, method: str, round_trip: bool = True) -> None:
+        with self._lock:
+            self.calls[method] += 1
+            if round_trip:
+                self.round_trips += 1
+        if round_trip and self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def maybe_fail(self) -> None:
+        with self._lock:
+            fail = self._random.random() < self.error_rate
+        if fail:
+            headers = {} if self.retry_after_seconds is None else {"retry-after": str(self.retry_after_seconds)}
+            raise http_error(429, "Too Many Requests", headers)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.round_trips = 0
+
+
+class FakeRequest:
+    """Mimics ``googleapiclient.http.HttpRequest``: nothing happens until ``execute``."""
+
+    def __init__(self, recorder: ApiRecorder, method: str, handler: Callable[..., Any], **params: Any):
+        self.recorder = recorder
+        self.method = method
+        self.handler = handler
+        self.params = params
+
+    def execute(self, round_trip: bool = True) -> Any:
+        if not round_trip:
+            self.recorder.record(self.method, round_trip)
+            return copy.deepcopy(self.handler(**self.params))
+
+        # Same path as InstrumentedHttpRequest: rate limited, retried and timed
+        def send():
+            with metrics.track_api_call(self.method):
+                self.recorder.record(self.method)
+                self.recorder.maybe_fail()
+                return copy.deepcopy(self.handler(**self.params))
+
+        return rate_limiter.call(self.method, send)
+
+
+class FakeBatch:
+    """Mimics ``BatchHttpRequest``: one round trip for up to 100 requests."""
+
+    def __init__(self, recorder: ApiRecorder, callback: Callable[[str, Any, Optional[Exception]], Any]):
+        self.recorder = recorder
+        self.callback = callback
+        self._requests: List = []
+
+    def add(self, request: FakeRequest, request_id: str = None) -> None:
+        self._requests.append((request_id or str(len(self._requests)), request))
+
+    def execute(self) -> None:
+        self.recorder.record("gmail.batch")
+        for request_id, request in self._requests:
+            try:
+                response, exception = request.execute(round_trip=False), None
+            except HttpError as error:
+                response, exception = None, error
+            self.callback(request_id, response, exception)
+
+
+class _Collection:
+    """Resource collection whose methods build FakeRequests, with ``list_next`` paging."""
+
+    def __init__(self, recorder: ApiRecorder, prefix: str, handlers: Dict[str, Callable[..., Any]]):
+        self._recorder = recorder
+        self._prefix = prefix
+        self._handlers = handlers
+
+    def __getattr__(self, name: str) -> Callable[..., FakeRequest]:
+        try:
+            handler = self._handlers[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return lambda **params: FakeRequest(self._recorder, f"{self._prefix}.{name}", handler, **params)
+
+    def list_next(self, previous_request: FakeRequest, previous_response: Dict[str, Any]) -> Optional[FakeRequest]:
+        token = previous_response.get("nextPageToken")
+        if not token:
+            return None
+        return FakeRequest(
+            self._recorder,
+            previous_request.method,
+            previous_request.handler,
+            **{**previous_request.params, "pageToken": token},
+        )
+
+
+def _page(items: List[Any], page_token: Optional[str], page_size: int) -> Dict[str, Any]:
+    start = int(page_token or 0)
+    page = {"items": items[start : start + page_size]}
+    if start + page_size < len(items):
+        page["nextPageToken"] = str(start + page_size)
+    return page
+
+
+class FakeGmailService:
+    """
+    In-memory mailbox implementing the ``users()`` surface the tools use.
+
+    Supports messages.list/get (including batch requests), threads.get,
+    history.list, getProfile, drafts.create and watch. Messages are delivered with
+    ``deliver`` and are visible through history like real new mail.
+    """
+
+    def __init__(self, recorder: Optional[ApiRecorder] = None, email_address: str = "me@example.com"):
+        self.recorder = recorder or ApiRecorder()
+        self.email_address = email_address
+        self._lock = threading.Lock()
+        self._messages: Dict[str, Dict[str, Any]] = {}
+        self._history: List[Dict[str, Any]] = []
+        self._history_id = 1000
+        self.created_drafts: List[Dict[str, Any]] = []
+        self._draft_ids = itertools.count(1)
+
+    @property
+    def history_id(self) -> str:
+        return str(self._history_id)
+
+    def deliver(self, message: Dict[str, Any]) -> None:
+        """Adds a message resource (as returned by messages.get) to the mailbox."""
+        with self._lock:
+            self._history_id += 1
+            message = {**message, "historyId": str(self._history_id)}
+            self._messages[message["id"]] = message
+            self._history.append(
+                {
+                    "id": str(self._history_id),
+                    "messagesAdded": [
+                        {"message": {k: message[k] for k in ("id", "threadId", "labelIds")}}
+                    ],
+                }
+            )
+
+    # Resource tree
+
+    def users(self) -> "FakeGmailService":
+        return self
+
+    def messages(self) -> _Collection:
+        return _Collection(self.recorder, "gmail.messages", {"list": self._list_messages, "get": self._get_message})
+
+    def threads(self) -> _Collection:
+        return _Collection(self.recorder, "gmail.threads", {"get": self._get_thread})
+
+    def history(self) -> _Collection:
+        return _Collection(self.recorder, "gmail.history", {"list": self._list_history})
+
+    def drafts(self) -> _Collection:
+        return _Collection(self.recorder, "gmail.drafts", {"create": self._create_draft})
+
+    def getProfile(self, userId: str) -> FakeRequest:
+        return FakeRequest(self.recorder, "gmail.getProfile", self._profile)
+
+    def watch(self, userId: str, body: Dict[str, Any]) -> FakeRequest:
+        return FakeRequest(self.recorder, "gmail.watch", self._watch)
+
+    def new_batch_http_request(self, callback: Callable[..., Any]) -> FakeBatch:
+        return FakeBatch(self.recorder, callback)
+
+    # Handlers
+
+    def _list_messages(
+        self, userId: str, labelIds: List[str] = None, q: str = None, pageToken: str = None, maxResults: int = PAGE_SIZE
+    ) -> Dict[str, Any]:
+        after = re.search(r"after:(\d+)", q or "")
+        with self._lock:
+            messages = [
+                m
+                for m in self._messages.values()
+                if set(labelIds or []) <= set(m.get("labelIds", []))
+                and (after is None or int(m["internalDate"]) // 1000 > int(after.group(1)))
+            ]
+        messages.sort(key=lambda m: int(m["internalDate"]), reverse=True)
+        page = _page([{"id": m["id"], "threadId": m["threadId"]} for m in messages], pageToken, maxResults)
+        page["messages"] = page.pop("items")
+        return page
+
+    def _get_message(self, userId: str, id: str, format: str = "full", fields: str = None) -> Dict[str, Any]:
+        with self._lock:
+            if id not in self._messages:
+                raise http_error(404, "Not Found")
+            return self._messages[id]
+
+    def _get_thread(
+        self, userId: str, id: str, format: str = "full", metadataHeaders: List[str] = None, fields: str = None
+    ) -> Dict[str, Any]:
+        with self._lock:
+            messages = [m for m in self._messages.values() if m["threadId"] == id]
+            drafts = [d["message"] for d in self.created_drafts if d["message"].get("threadId") == id]
+        if not messages and not drafts:
+            raise http_error(404, "Not Found")
+        for draft in drafts:
+            parsed = email.message_from_bytes(base64.urlsafe_b64decode(draft["raw"]))
+            messages.append(
+                {
+                    "id": f"draft-message-{len(messages)}",
+                    "threadId": id,
+                    "labelIds": ["DRAFT"],
+                    "payload": {"headers": [{"name": name, "value": value} for name, value in parsed.items()]},
+                }
+            )
+        return {"id": id, "messages": messages}
+
+    def _list_history(
+        self,
+        userId: str,
+        startHistoryId: str,
+        historyTypes: List[str] = None,
+        labelId: str = None,
+        pageToken: str = None,
+    ) -> Dict[str, Any]:
+        with self._lock:
+            records = [r for r in self._history if int(r["id"]) > int(startHistoryId)]
+            history_id = self.history_id
+        page = _page(records, pageToken, PAGE_SIZE)
+        page["history"] = page.pop("items")
+        page["historyId"] = history_id
+        return page
+
+    def _create_draft(self, userId: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            draft = {"id": f"draft-{next(self._draft_ids)}", "message": body["message"]}
+            self.created_drafts.append(draft)
+        return draft
+
+    def _profile(self) -> Dict[str, Any]:
+        return {"emailAddress": self.email_address, "historyId": self.history_id}
+
+    def _watch(self) -> Dict[str, Any]:
+        return {"historyId": self.history_id, "expiration": str(int((time.time() + 7 * 86400) * 1000))}
+
+
+class FakeCalendarService:
+    """
+    In-memory primary calendar implementing the ``events()`` surface.
+
+    Supports list (time ranges, private extended properties and sync
+    tokens), get, insert, update and delete.
+    """
+
+    def __init__(self, recorder: Optional[ApiRecorder] = None):
+        self.recorder = recorder or ApiRecorder()
+        self._lock = threading.Lock()
+        self._events: Dict[str, Dict[str, Any]] = {}
+        # Change sequence numbers, used as sync tokens
+        self._changed: Dict[str, int] = {}
+        self._sequence = 0
+        self._event_ids = itertools.count(1)
+
+    @property
+    def events_by_id(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {k: v for k, v in self._events.items() if v.get("status") != "cancelled"}
+
+    def events(self) -> _Collection:
+        return _Collection(
+            self.recorder,
+            "calendar.events",
+            {
+                "list": self._list,
+                "get": self._get,
+                "insert": self._insert,
+                "update": self._update,
+                "delete": self._delete,
+            },
+        )
+
+    def _touch(self, event: Dict[str, Any]) -> None:
+        self._sequence += 1
+        self._events[event["id"]] = event
+        self._changed[event["id"]] = self._sequence
+
+    def _list(
+        self,
+        calendarId: str,
+        timeMin: str = None,
+        timeMax: str = None,
+        syncToken: str = None,
+        privateExtendedProperty: str = None,
+        pageToken: str = None,
+        maxResults: int = 250,
+        **params: Any,
+    ) -> Dict[str, Any]:
+        with self._lock:
+            if syncToken is not None:
+                since = int(syncToken)
+                items = [self._events[i] for i, seq in self._changed.items() if seq > since]
+            else:
+                items = [e for e in self._events.values() if e.get("status") != "cancelled"]
+                if privateExtendedProperty:
+                    key = privateExtendedProperty.split("=", 1)[1]
+                    items = [e for e in items if idempotency_key(e) == key]
+                if timeMin or timeMax:
+                    low = parse_event_time(timeMin) if timeMin else float("-inf")
+                    high = parse_event_time(timeMax) if timeMax else float("inf")
+                    items = [
+                        e for e in items if (b := event_bounds(e)) is not None and b[1] > low and b[0] < high
+                    ]
+                items.sort(key=lambda e: (event_bounds(e) or (0.0, 0.0))[0])
+            sequence = self._sequence
+        page = _page(items, pageToken, maxResults)
+        if "nextPageToken" not in page:
+            page["nextSyncToken"] = str(sequence)
+        return page
+
+    def _get(self, calendarId: str, eventId: str) -> Dict[str, Any]:
+        with self._lock:
+            event = self._events.get(eventId)
+            if event is None or event.get("status") == "cancelled":
+                raise http_error(404, "Not Found")
+            return event
+
+    def _insert(self, calendarId: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            event_id = body.get("id") or f"evt{next(self._event_ids)}"
+            if event_id in self._events:
+                # Like Calendar, also for a deleted (cancelled) event
+                raise http_error(409, "The requested identifier already exists.")
+            event = {**copy.deepcopy(body), "id": event_id, "status": "confirmed"}
+            self._touch(event)
+            return event
+
+    def _update(self, calendarId: str, eventId: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            if eventId not in self._events:
+                raise http_error(404, "Not Found")
+            event = {**copy.deepcopy(body), "id": eventId, "status": "confirmed"}
+            self._touch(event)
+            return event
+
+    def _delete(self, calendarId: str, eventId: str) -> str:
+        with self._lock:
+            event = self._events.get(eventId)
+            if event is None or event.get("status") == "cancelled":
+                raise http_error(410, "Gone")
+            self._touch({**event, "status": "cancelled"})
+            return ""
@@ -0,0 +1,181 @@
+"""Runs ``check_recent_emails`` over a synthetic inbox and reports throughput and latency."""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from benchmark.fake_google import ApiRecorder, FakeCalendarService, FakeGmailService
+from benchmark.scripted_model import ScriptedChatModel
+from tools.google_clients import registry
+from tools.logger import configure_logger, flush_logs, log_stats
+from tools.ledger import FAILED
+from tools.metrics import metrics
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of ``values`` (``q`` between 0 and 100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(q / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def run_benchmark(
+    messages: List[Dict[str, Any]],
+    workers: int = 4,
+    batch_size: Optional[int] = None,
+    api_latency_seconds: float = 0.02,
+    model_latency_seconds: float = 0.05,
+    api_error_rate: float = 0.0,
+    log_level: int = logging.WARNING,
+    log_format: str = "console",
+    workdir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Feeds ``messages`` through the real pipeline against fake Google services.
+
+    ``main`` is imported inside a scratch directory, so the sync checkpoint,
+    ledger and LLM cache start empty and nothing in the working tree is
+    touched. Both agents are rebuilt around a ``ScriptedChatModel``. Runs once
+    per process, since ``main`` keeps its state in module globals.
+
+    Args:
+        messages: Gmail message resources, oldest first (see ``generate_corpus``)
+        workers: EMAIL_WORKERS for the run
+        batch_size: Messages delivered per ``check_recent_emails`` cycle (default: all at once)
+        api_latency_seconds: Simulated latency of every Google API round trip
+        model_latency_seconds: Simulated latency of every model call
+        api_error_rate: Share of Google API requests failing with 429 (retried by the rate limiter)
+        log_level: Minimum level of the application logs during the run
+        log_format: "console" or "json" (written by the background writer to logs/ in the scratch directory)
+        workdir: Directory for the run's state files (default: a new temp directory)
+
+    Returns:
+        Dict[str, Any]: Throughput, latency percentiles and per-email call counts; ``valid`` is
+        False, with the reasons in ``problems``, when tool calls failed or emails were not processed
+    """
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    os.environ["EMAIL_WORKERS"] = str(workers)
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+    recorder = ApiRecorder(api_latency_seconds, error_rate=api_error_rate)
+    gmail = FakeGmailService(recorder)
+    calendar = FakeCalendarService(recorder)
+    registry.install("gmail", gmail)
+    registry.install("calendar", calendar)
+
+    previous_cwd = os.getcwd()
+    os.chdir(workdir or tempfile.mkdtemp(prefix="email-benchmark-"))
+    try:
+        configure_logger(log_format, level=log_level)
+        import agents
+        import main
+
+        model = ScriptedChatModel(latency_seconds=model_latency_seconds)
+        agents.install_agents(
+            agents.build_draft_assistant(model, agents.get_checkpointer()),
+            agents.build_scheduling_assistant(model, agents.get_checkpointer()),
+        )
+
+        latencies: List[float] = []
+        process_email = main.process_email
+
+        def timed_process_email(email):
+            started = time.perf_counter()
+            try:
+                process_email(email)
+            finally:
+                latencies.append(time.perf_counter() - started)
+
+        aprocess_email = main.aprocess_email
+
+        async def timed_aprocess_email(email):
+            started = time.perf_counter()
+            try:
+                await aprocess_email(email)
+            finally:
+                latencies.append(time.perf_counter() - started)
+
+        # EMAIL_ASYNC=1 runs the coroutine variant
+        main.process_email = timed_process_email
+        main.aprocess_email = timed_aprocess_email
+        # Start from the current mailbox state, like an already running assistant
+        main.inbox_sync.history_id = gmail.history_id
+        recorder.reset()
+        model.reset()
+        metrics.reset()
+        log_stats.snapshot(reset=True)
+
+        batch_size = batch_size or len(messages) or 1
+        started = time.perf_counter()
+        for start in range(0, len(messages), batch_size):
+            for message in messages[start : start + batch_size]:
+                gmail.deliver(message)
+            main.check_recent_emails()
+        elapsed = time.perf_counter() - started
+        # Time the writer still needs for the events queued during the run
+        flush_started = time.perf_counter()
+        flush_logs()
+        log_flush_seconds = time.perf_counter() - flush_started
+        logged = log_stats.snapshot()
+
+        outcomes = Counter(main.ledger.status(message["id"]) or "unprocessed" for message in messages)
+        queue = main.work_queue.stats()
+    finally:
+        os.chdir(previous_cwd)
+
+    count = len(messages) or 1
+    snapshot = metrics.snapshot()
+    tokens = Counter()
+    for series in snapshot.get("model_tokens_total", []):
+        tokens[series["labels"]["type"]] += series["value"]
+    retries = sum(series["value"] for series in snapshot.get("api_retries_total", []))
+    tool_errors = sum(
+        series["count"] for series in snapshot.get("tool_call_seconds", []) if series["labels"].get("status") == "error"
+    )
+    # Numbers of a run whose emails did not go through the pipeline are meaningless
+    problems = []
+    if messages and len(latencies) < len(messages):
+        problems.append(f"{len(messages) - len(latencies)} emails never reached process_email")
+    if tool_errors:
+        problems.append(f"{tool_errors} tool calls failed")
+    failed = outcomes.get(FAILED, 0) + outcomes.get("unprocessed", 0)
+    if failed:
+        problems.append(f"{failed} emails failed or were not processed")
+    return {
+        "valid": not problems,
+        "problems": problems,
+        "emails": len(messages),
+        "workers": workers,
+        "elapsed_seconds": round(elapsed, 3),
+        "emails_per_second": round(len(messages) / elapsed, 2) if elapsed else 0.0,
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "latency_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "api_round_trips_per_email": round(recorder.round_trips / count, 2),
+        "api_calls_per_email": round(sum(recorder.calls.values()) / count, 2),
+        "api_retries": retries,
+        "model_calls_per_email": round(model.calls / count, 2),
+        "prompt_tokens_per_email": round(tokens["prompt"] / count, 1),
+        "completion_tokens_per_email": round(tokens["completion"] / count, 1),
+        "api_calls": dict(sorted(recorder.calls.items())),
+        "outcomes": dict(sorted(outcomes.items())),
+        "queued_for_retry": queue["queued"],
+        "dead_letters": queue["dead"],
+        "drafts_created": len(gmail.created_drafts),
+        "events_created": len(calendar.events_by_id),
+        "log_format": log_format,
+        "log_events_per_email": round(logged["events"] / count, 1),
+        "log_kb_per_email": round(logged["bytes"] / 1024 / count, 2),
+        "log_sampled_out": logged["sampled_out"],
+        "log_truncated_fields": logged["truncated_fields"],
+        "log_dropped": logged["dropped"],
+        "log_flush_ms": round(log_flush_seconds * 1000, 1),
+    }
@@ -0,0 +1,146 @@
+"""Deterministic chat model that plays the assistant's part without calling Gemini."""
+
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict, PrivateAttr
+from tools.email_preprocessing import CHARS_PER_TOKEN
+
+_FIELD_RE = re.compile(r"^(message_id|thread_id|from|date|subject): ?(.*)$", re.MULTILINE)
+
+
+def email_fields(messages: Sequence[BaseMessage]) -> Dict[str, str]:
+    """Reads the header lines of the first user message (see ``format_email_for_agent``)."""
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            return dict(_FIELD_RE.findall(str(message.content)))
+    return {}
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:40] or "event"
+
+
+def _event_start(date_header: str) -> datetime:
+    try:
+        received = parsedate_to_datetime(date_header)
+    except (TypeError, ValueError):
+        received = datetime.now(timezone.utc)
+    return (received + timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Tool-calling chat model with a fixed script, for offline benchmarks.
+
+    With calendar tools bound it checks for a matching event, then creates
+    the event and the reply draft in one parallel turn; with only
+    ``create_draft`` bound it drafts the reply. Every call sleeps for
+    ``latency_seconds`` and reports token usage estimated from the prompt
+    length, so the numbers resemble a real model run.
+    """
+
+    latency_seconds: float = 0.0
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _calls: int = PrivateAttr(default=0)
+    _call_ids: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    def reset(self) -> None:
+        with self._lock:
+            self._calls = 0
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Any:
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _tool_call(self, name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._call_ids += 1
+            return {"name": name, "args": args, "id": f"call_{self._call_ids}", "type": "tool_call"}
+
+    def _draft_call(self, email: Dict[str, str]) -> Dict[str, Any]:
+        return self._tool_call(
+            "create_draft",
+            {
+                "body": f"Hi,\n\nThanks for your email about \"{email.get('subject', '')}\". I'll get back to you shortly.\n\nBest regards",
+                "sender": email.get("from", ""),
+                "subject": email.get("subject", ""),
+                "thread_id": email.get("thread_id", ""),
+                "original_message_id": email.get("message_id", ""),
+            },
+        )
+
+    def _next_step(self, messages: List[BaseMessage], tool_names: List[str]) -> AIMessage:
+        email = email_fields(messages)
+        called = [m.name for m in messages if isinstance(m, ToolMessage)]
+        if "create_draft" in called:
+            return AIMessage(content="The reply draft is ready.")
+        if "create_calendar_event" not in tool_names:
+            return AIMessage(content="", tool_calls=[self._draft_call(email)])
+
+        subject = email.get("subject", "")
+        start = _event_start(email.get("date", ""))
+        if "find_matching_events" not in called:
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    self._tool_call("find_matching_events", {"summary": subject, "start_time": start.isoformat()})
+                ],
+            )
+        return AIMessage(
+            content="",
+            tool_calls=[
+                self._tool_call(
+                    "create_calendar_event",
+                    {
+                        "summary": subject,
+                        "start_time": start.isoformat(),
+                        "end_time": (start + timedelta(hours=1)).isoformat(),
+                        "timezone": "UTC",
+                        "idempotency_key": f"{email.get('message_id', '')}:{_slug(subject)}",
+                    },
+                ),
+                self._draft_call(email),
+            ],
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        with self._lock:
+            self._calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        tool_names = [tool["function"]["name"] for tool in kwargs.get("tools", [])]
+        message = self._next_step(messages, tool_names)
+        input_tokens = sum(len(str(m.content)) for m in messages) // CHARS_PER_TOKEN
+        output_tokens = (len(str(message.content)) + len(str(message.tool_calls))) // CHARS_PER_TOKEN
+        message.response_metadata = {"model_name": "scripted"}
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
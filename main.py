@@ -1,59 +1,630 @@
+import argparse
+import asyncio
+import os
+import queue
 import schedule
+import structlog
+import threading
 import time
-from tools.gmail_tools import list_recent_emails, get_gmail_service
-from tools.calendar_tools import ensure_valid_creds
-from agents import email_assistant_with_scheduling
-from tools.logger import logger
+from email.utils import parseaddr
+from tools.gmail_messages import get_gmail_service
+from tools.gmail_sync import STATE_PATH, GmailHistorySync
+from tools.import_profile import import_report
+from tools.email_preprocessing import format_email_for_agent
+import models
+from agents import email_assistant_with_scheduling, email_draft_assistant
+from tools.accounts import (
+    DEFAULT_ACCOUNT,
+    AccountLocal,
+    AccountLock,
+    account_path,
+    current_account,
+    discover_accounts,
+    use_account,
+)
+from tools.agent_checkpoints import apending_run, finish_run, pending_run, run_config
+from tools.calendar_cache import event_cache
+from tools.event_loop import event_loop
+from tools.google_clients import client_stats, registry
+from tools.ledger import COMPLETED, DRAFTED, FAILED, LEDGER_PATH, SCHEDULED, SKIPPED, ProcessedLedger
+from tools.logger import LOG_FILE, LOG_FORMAT, configure_logger, log_stats, logger
+from tools.metrics import metrics, start_metrics_dump, start_metrics_server
+from tools.push_ingest import Debouncer, PushNotificationServer, start_watch
+from tools.supervisor import SUPERVISOR_PROCESSES, Supervisor, shard_index
+from tools.thread_store import THREAD_STORE_PATH, ThreadStore
+from tools.triage import DRAFT, SKIP, triage
+from tools.work_queue import QUEUE_PATH, WorkQueue
+from tools.worker_pool import arun_in_order_by_key, run_in_order_by_key
 
-get_gmail_service()
-ensure_valid_creds()
+# Number of emails processed concurrently; emails from the same sender or
+# thread are always processed one after another.
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "4"))
+# Run agents and tools as coroutines on one event loop instead of worker threads
+ASYNC_PROCESSING = os.getenv("EMAIL_ASYNC", "0") == "1"
+# Maximum number of queued emails leased per processing round
+WORK_QUEUE_LEASE_BATCH = int(os.getenv("WORK_QUEUE_LEASE_BATCH", "100"))
+# Let a cheap model triage the emails that the header rules cannot decide
+TRIAGE_WITH_MODEL = os.getenv("TRIAGE_WITH_MODEL", "0") == "1"
+# Let a cheap model condense thread context that exceeds its token budget
+THREAD_SUMMARY_WITH_MODEL = os.getenv("THREAD_SUMMARY_WITH_MODEL", "0") == "1"
+# Pub/Sub topic Gmail publishes inbox changes to in push mode
+GMAIL_PUBSUB_TOPIC = os.getenv("GMAIL_PUBSUB_TOPIC")
+# Safety-net polling interval while push notifications are active
+FALLBACK_POLL_MINUTES = int(os.getenv("FALLBACK_POLL_MINUTES", "30"))
+# Serve Prometheus metrics on this port, and/or dump them as JSON to this file
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_JSON_PATH = os.getenv("METRICS_JSON_PATH")
+METRICS_DUMP_SECONDS = int(os.getenv("METRICS_DUMP_SECONDS", "60"))
 
+# Mailbox accounts served by a supervisor and its worker processes (comma separated,
+# or "auto" for every directory below ACCOUNTS_DIR); unset serves the single default account
+MAILBOX_ACCOUNTS = os.getenv("MAILBOX_ACCOUNTS")
 
-def check_recent_emails():
+# Per-account state: attribute access goes to the current account's instance
+# (see tools/accounts.py), stored in the account's directory
+inbox_sync = AccountLocal(lambda account: GmailHistorySync(account_path(STATE_PATH, account)))
+ledger = AccountLocal(lambda account: ProcessedLedger(account_path(LEDGER_PATH, account)))
+# Fetched emails wait here until processed, so failures and crashes lose nothing
+work_queue = AccountLocal(lambda account: WorkQueue(account_path(QUEUE_PATH, account)))
+thread_store = AccountLocal(
+    lambda account: ThreadStore(
+        account_path(THREAD_STORE_PATH, account),
+        model=models.gemini_2_0_flash if THREAD_SUMMARY_WITH_MODEL else None,
+    )
+)
+# Per-account state dropped when an account moves to another shard
+ACCOUNT_STATE = (inbox_sync, ledger, work_queue, thread_store, event_cache)
+
+# Push-triggered and scheduled checks must not overlap
+check_lock = threading.Lock()
+
+CALENDAR_WRITE_TOOLS = {"create_calendar_event", "update_calendar_event", "delete_calendar_event"}
+
+
+class ToolCallsFailed(RuntimeError):
+    """An agent run ended without the draft or calendar change it set out to make."""
+
+
+def warm_up():
+    """Load, refresh or authorize the current account's Gmail and Calendar credentials up front."""
+    get_gmail_service()
+    registry.get_credentials("calendar")
+
+
+def email_ordering_keys(email):
+    """Emails sharing any of these keys must not be processed concurrently."""
+    sender = parseaddr(email.get("sender", ""))[1].lower() or None
+    return [sender, email.get("thread_id")]
+
+
+def prepare_email(email):
+    """Compact and triage an email; returns the agent and prompt, or None if nothing is left to do."""
+    if not ledger.should_process(email["id"]):
+        logger.info("email_already_processed", message_id=email["id"], status=ledger.status(email["id"]))
+        return None
+
+    logger.info(
+        "processing_email",
+        sender=email.get("sender"),
+        subject=email.get("subject"),
+    )
+    content = format_email_for_agent(email)
+    logger.info(
+        "email_preprocessed",
+        message_id=email["id"],
+        body_chars=len(email.get("body", "")),
+        prompt_chars=len(content),
+    )
+
+    decision = triage(email, content, models.gemini_2_0_flash if TRIAGE_WITH_MODEL else None)
+    logger.info("email_triaged", message_id=email["id"], route=decision.route, reason=decision.reason)
+    thread_context = thread_store.context(email) if decision.route != SKIP else ""
+    # Later messages of the thread see this one as a compact note
+    thread_store.add(email)
+    if decision.route == SKIP:
+        ledger.record(email["id"], email.get("thread_id"), SKIPPED)
+        return None
+    if thread_context:
+        content = format_email_for_agent(email, thread_context=thread_context)
+        logger.info("thread_context_added", message_id=email["id"], context_chars=len(thread_context))
+    # Agents are built on first use, not when main.py is imported
+    agent = email_draft_assistant() if decision.route == DRAFT else email_assistant_with_scheduling()
+    return agent, {"messages": [{"role": "user", "content": f"Email Content:\n{content}"}]}
+
+
+def log_update(update, tools_called, seconds):
+    """Log one streamed agent update with its timing and token usage, and remember the tools it called."""
+    # update will be a dict with node name as key and its output as value
+    for node_name, node_output in update.items():
+        messages = node_output["messages"]
+        note_tool_results(messages, tools_called)
+        metrics.observe("agent_node_seconds", seconds, node=node_name)
+        tokens = {}
+        for message in messages:
+            if message.type == "ai":
+                tokens = metrics.record_usage(message)
+        logger.info(
+            "ai_step",
+            node=node_name,
+            seconds=round(seconds, 3),
+            prompt_tokens=tokens.get("prompt"),
+            completion_tokens=tokens.get("completion"),
+            output=messages[-1].content,
+        )
+
+
+def tool_succeeded(message):
+    """Tool errors come back as ToolMessages, either with status "error" or as an "Error ..." string."""
+    return getattr(message, "status", None) != "error" and not str(message.content).startswith("Error")
+
+
+def note_tool_results(messages, tools_called):
+    """Maps each called tool's name to whether any of its calls succeeded."""
+    for message in messages:
+        if message.type == "tool":
+            tools_called[message.name] = tools_called.get(message.name, False) or tool_succeeded(message)
+
+
+def resume_input(email, state, agent_input, tools_called):
     """
-    Check for new emails in the last 10 minutes and process them.
-    This function will be called every 10 minutes.
+    Agent input for a run: None continues a checkpointed run from its last
+    completed step, whose tool calls then count as already made.
     """
+    if state is None:
+        return agent_input
+    note_tool_results(state.values["messages"], tools_called)
+    logger.info("agent_run_resumed", message_id=email["id"], next=list(state.next), tools_called=sorted(tools_called))
+    return None
+
+
+def failed_writes(tools_called):
+    """
+    Writes whose effect the run lacks at its end: a draft that was never created,
+    or calendar writes of which none succeeded. A failed call the model recovered
+    from, e.g. an update followed by a create, does not count.
+    """
+    failed = set()
+    if tools_called.get("create_draft") is False:
+        failed.add("create_draft")
+    calendar_writes = {name: tools_called[name] for name in CALENDAR_WRITE_TOOLS if name in tools_called}
+    if calendar_writes and not any(calendar_writes.values()):
+        failed.update(calendar_writes)
+    return failed
+
+
+def record_outcome(email, tools_called):
+    """
+    Records the outcome from the tool calls that succeeded. Raises ToolCallsFailed
+    if the run ended without its draft or calendar change, so the email is recorded
+    FAILED and retried; create_draft and create_calendar_event are idempotent, so
+    the retry does not repeat writes that already succeeded.
+    """
+    failed = failed_writes(tools_called)
+    if failed:
+        raise ToolCallsFailed(f"Tool calls failed: {', '.join(sorted(failed))}")
+    succeeded = {name for name, ok in tools_called.items() if ok}
+    if succeeded & CALENDAR_WRITE_TOOLS:
+        outcome = SCHEDULED
+    elif "create_draft" in succeeded:
+        outcome = DRAFTED
+    else:
+        outcome = COMPLETED
+    ledger.record(email["id"], email.get("thread_id"), outcome)
+    logger.info("email_processed", message_id=email["id"], outcome=outcome)
+
+
+def observe_email(email, started):
+    """Record the end-to-end processing time of an email under its ledger outcome."""
+    seconds = time.perf_counter() - started
+    outcome = ledger.status(email["id"]) or "unknown"
+    metrics.observe("email_processing_seconds", seconds, outcome=outcome)
+    logger.info("email_timing", message_id=email["id"], outcome=outcome, seconds=round(seconds, 3))
+
+
+def process_email(email):
+    """Triage a single email, run the matching agent over it and log each step."""
+    started = time.perf_counter()
+    try:
+        _process_email(email)
+    finally:
+        observe_email(email, started)
+
+
+def _process_email(email):
+    prepared = prepare_email(email)
+    if prepared is None:
+        return
+    agent, agent_input = prepared
+
+    tools_called = {}
+    agent_input = resume_input(email, pending_run(agent, email["id"]), agent_input, tools_called)
+    try:
+        step_started = time.perf_counter()
+        for update in agent.stream(agent_input, run_config(email["id"]), stream_mode="updates"):
+            log_update(update, tools_called, time.perf_counter() - step_started)
+            step_started = time.perf_counter()
+        record_outcome(email, tools_called)
+    except Exception as error:
+        if isinstance(error, ToolCallsFailed):
+            # The run itself finished; its retry starts over instead of resuming it
+            finish_run(agent, email["id"])
+        ledger.record(email["id"], email.get("thread_id"), FAILED)
+        raise
+    finish_run(agent, email["id"])
+
+
+async def aprocess_email(email):
+    """Async variant of process_email; tool calls run on the event loop."""
+    started = time.perf_counter()
     try:
-        # Get emails from last 10 minutes
-        recent_emails = list_recent_emails(minutes=10)
+        await _aprocess_email(email)
+    finally:
+        observe_email(email, started)
 
-        if not recent_emails:
-            logger.info("no_new_emails", minutes=10)
+
+async def _aprocess_email(email):
+    # Triage may call a model synchronously, keep it off the event loop
+    prepared = await asyncio.to_thread(prepare_email, email)
+    if prepared is None:
+        return
+    agent, agent_input = prepared
+
+    tools_called = {}
+    agent_input = resume_input(email, await apending_run(agent, email["id"]), agent_input, tools_called)
+    try:
+        step_started = time.perf_counter()
+        async for update in agent.astream(agent_input, run_config(email["id"]), stream_mode="updates"):
+            log_update(update, tools_called, time.perf_counter() - step_started)
+            step_started = time.perf_counter()
+        record_outcome(email, tools_called)
+    except Exception as error:
+        if isinstance(error, ToolCallsFailed):
+            # The run itself finished; its retry starts over instead of resuming it
+            await asyncio.to_thread(finish_run, agent, email["id"])
+        ledger.record(email["id"], email.get("thread_id"), FAILED)
+        raise
+    await asyncio.to_thread(finish_run, agent, email["id"])
+
+
+def job_ordering_keys(job):
+    return email_ordering_keys(job.email)
+
+
+def run_job(job):
+    """Process a leased email, then ack it or record the failure for a later retry."""
+    try:
+        process_email(job.email)
+    except Exception as e:
+        work_queue.fail(job.message_id, repr(e))
+        raise
+    work_queue.ack(job.message_id)
+
+
+async def arun_job(job):
+    """Async variant of run_job."""
+    try:
+        await aprocess_email(job.email)
+    except Exception as e:
+        work_queue.fail(job.message_id, repr(e))
+        raise
+    work_queue.ack(job.message_id)
+
+
+async def aprocess_jobs(jobs):
+    """Process leased jobs as coroutines; the pooled HTTP connections stay open for the next batch."""
+    return await arun_in_order_by_key(jobs, arun_job, job_ordering_keys, max_workers=EMAIL_WORKERS)
+
+
+def drain_queue():
+    """Lease and process queued emails until no job is available."""
+    while True:
+        jobs = work_queue.lease(WORK_QUEUE_LEASE_BATCH)
+        if not jobs:
             return
 
-        logger.info("found_new_emails", count=len(recent_emails))
+        # Process the emails on a bounded worker pool, or as coroutines in async mode
+        if ASYNC_PROCESSING:
+            # One loop for the whole process: clients bound to it stay usable across cycles
+            stats = event_loop.run(aprocess_jobs(jobs))
+        else:
+            stats = run_in_order_by_key(jobs, run_job, job_ordering_keys, max_workers=EMAIL_WORKERS)
+        logger.info(
+            "cycle_completed",
+            emails=stats.items,
+            groups=stats.groups,
+            succeeded=stats.succeeded,
+            failed=stats.failed,
+            queue_depth=stats.max_queue_depth,
+            max_in_flight=stats.max_in_flight,
+            elapsed_seconds=round(stats.elapsed_seconds, 2),
+            emails_per_second=round(stats.items_per_second, 3),
+        )
+
+
+def requeue_dead_letters(message_ids=None):
+    """
+    Move the current account's dead-lettered emails (all, or the given IDs) back
+    into the queue. Their ledger entries are reset, as the ledger would
+    otherwise skip them as failed too often.
+    """
+    requeued = work_queue.requeue_dead_letters(message_ids)
+    ledger.reset(requeued)
+    print(f"{current_account.get()}: requeued {len(requeued)} dead-lettered emails")
+    return requeued
+
+
+def check_recent_emails():
+    """
+    Check for emails added since the last sync, queue them and process the queue.
+    This function is called every 10 minutes, or on push notifications in push mode.
+    """
+    with check_lock:
+        _check_recent_emails()
+
+
+def process_queue():
+    """Retry queued emails whose retry delay has passed, between inbox checks."""
+    with check_lock:
+        try:
+            drain_queue()
+        except Exception as e:
+            logger.exception("work_queue_error", error=str(e))
 
-        # Process each email
-        for email in recent_emails:
-            logger.info(
-                "processing_email",
-                sender=email.get("sender"),
-                subject=email.get("subject"),
-            )
-            for update in email_assistant_with_scheduling.stream(
-                {"messages": [{"role": "user", "content": f"Email Content: {email}"}]},
-                stream_mode="updates",
-            ):
-                # update will be a dict with node name as key and its output as value
-                for node_name, node_output in update.items():
-                    logger.info(
-                        "ai_step",
-                        node=node_name,
-                        output=node_output["messages"][-1].content,
-                    )
 
+def _check_recent_emails():
+    try:
+        # Get emails added since the last committed historyId
+        batch = inbox_sync.poll()
+        if batch.emails:
+            logger.info("found_new_emails", count=len(batch.emails), deferred=len(batch.failed_ids))
+            work_queue.enqueue(batch.emails)
+        else:
+            logger.info("no_new_emails", history_id=batch.history_id, deferred=len(batch.failed_ids))
+        # The emails are durably queued and the unfetched ones are stored with the
+        # checkpoint, so the checkpoint can move on
+        inbox_sync.commit(batch)
     except Exception as e:
         logger.exception("email_check_error", error=str(e))
 
+    try:
+        drain_queue()
+    except Exception as e:
+        logger.exception("work_queue_error", error=str(e))
+
+    logger.info("work_queue_stats", **work_queue.stats())
+    logger.info("google_client_stats", **client_stats())
+    logger.info("llm_cache_stats", **models.llm_cache.stats(reset=True))
+    logger.info("thread_summary_cache_stats", **thread_store.stats(reset=True))
+    logger.info("log_stats", **log_stats.snapshot())
+
+
+def on_push_notification(debouncer, notification):
+    """Trigger a sync unless the notification is older than the stored checkpoint."""
+    if inbox_sync.history_id is not None and notification["historyId"] <= int(inbox_sync.history_id):
+        logger.info("push_notification_stale", history_id=notification["historyId"])
+        return
+    debouncer.trigger()
+
+
+def start_push_ingestion(port):
+    """Start the push endpoint and, when a topic is configured, the Gmail watch."""
+    debouncer = Debouncer(check_recent_emails)
+    server = PushNotificationServer(
+        lambda notification: on_push_notification(debouncer, notification), port=port
+    )
+    server.start()
+    if GMAIL_PUBSUB_TOPIC:
+        def renew_watch():
+            start_watch(get_gmail_service(), GMAIL_PUBSUB_TOPIC)
+
+        renew_watch()
+        schedule.every(1).days.do(renew_watch)
+    else:
+        logger.warning("gmail_watch_not_configured", hint="set GMAIL_PUBSUB_TOPIC")
+    return server
+
+
+def account_report(shard, account, checked_at, check_interval_seconds):
+    """Queue figures of the current account for the supervisor's per-shard lag."""
+    return {
+        "shard": shard,
+        "account": account,
+        "checked_at": checked_at,
+        "check_interval_seconds": check_interval_seconds,
+        **work_queue.stats(),
+    }
+
+
+def latest_assignment(assignments, accounts):
+    """Returns the newest account list sent by the supervisor, waiting for the first one."""
+    block = not accounts
+    try:
+        while True:
+            accounts = assignments.get(block=block, timeout=1 if block else None)
+            block = False
+    except queue.Empty:
+        return accounts
+
+
+def run_shard(shard, assignments, reports, check_interval_minutes=10):
+    """
+    Worker process of the supervisor: checks the inboxes of the accounts
+    assigned to this shard in turn, retries their queued emails every minute,
+    and reports each account's queue after every cycle.
+
+    A newly assigned account is only served once its ``AccountLock`` is free,
+    i.e. once the shard that served it before has finished its cycle and let go.
+    """
+    if LOG_FORMAT == "json":
+        # Rotation is per process, so every shard writes a log file of its own
+        root, extension = os.path.splitext(LOG_FILE)
+        configure_logger(log_file=f"{root}.{shard}{extension}")
+    # The supervisor exports its own metrics on METRICS_PORT, shard N on the port N + 1 above it
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT) + 1 + shard_index(shard))
+    if METRICS_JSON_PATH:
+        root, extension = os.path.splitext(METRICS_JSON_PATH)
+        start_metrics_dump(f"{root}.{shard}{extension}", METRICS_DUMP_SECONDS)
+    check_interval_seconds = check_interval_minutes * 60
+    accounts = []
+    locks = {}
+    checked_at, next_check, next_retry = {}, {}, {}
+    while True:
+        assigned = latest_assignment(assignments, accounts)
+        if assigned != accounts:
+            logger.info("shard_assigned", shard=shard, accounts=len(assigned))
+            for account in set(accounts) - set(assigned):
+                # Another shard moves the account's history cursor and ledger on from here;
+                # the state is closed before the lock lets the new owner start
+                for state in ACCOUNT_STATE:
+                    state.evict(account)
+                locks.pop(account).release()
+            for account in set(assigned) - set(accounts):
+                next_check[account] = 0
+                locks[account] = AccountLock(account)
+            accounts = assigned
+
+        for account in accounts:
+            if not locks[account].held:
+                if not locks[account].acquire():
+                    # The previous owner is still in a cycle of this account
+                    continue
+                logger.info("account_lock_acquired", shard=shard, account=account)
+                with use_account(account):
+                    # Load the ledger, history cursor and queue from disk as the previous owner left them
+                    for state in ACCOUNT_STATE:
+                        state.evict(account)
+                    # Release leases of emails whose process died mid-cycle
+                    work_queue.recover()
+            now = time.time()
+            if now < next_check[account] and now < next_retry.get(account, 0):
+                continue
+            with use_account(account), structlog.contextvars.bound_contextvars(account=account, shard=shard):
+                try:
+                    if now >= next_check[account]:
+                        next_check[account] = now + check_interval_seconds
+                        warm_up()
+                        check_recent_emails()
+                        checked_at[account] = time.time()
+                    else:
+                        process_queue()
+                except Exception as e:
+                    logger.exception("account_cycle_error", error=str(e))
+                next_retry[account] = time.time() + 60
+                reports.put(account_report(shard, account, checked_at.get(account, 0), check_interval_seconds))
+        time.sleep(1)
+
+
+def run_supervisor(accounts, processes, check_interval_minutes):
+    """Shard the accounts over worker processes and keep them running."""
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT))
+    if METRICS_JSON_PATH:
+        start_metrics_dump(METRICS_JSON_PATH, METRICS_DUMP_SECONDS)
+    logger.info("supervisor_started", accounts=len(accounts), processes=processes)
+    Supervisor(accounts, run_shard, processes=processes, target_args=(check_interval_minutes,)).run()
+
+
+def parse_accounts(value):
+    return [account.strip() for account in value.split(",") if account.strip()]
+
 
 def main():
-    # Schedule the email checking function to run every 10 minutes
-    schedule.every(10).minutes.do(check_recent_emails)
+    global ASYNC_PROCESSING
+    parser = argparse.ArgumentParser(description="AI email assistant")
+    parser.add_argument(
+        "--mode",
+        choices=["poll", "push"],
+        default=os.getenv("INGESTION_MODE", "poll"),
+        help="poll every 10 minutes, or react to Gmail push notifications",
+    )
+    parser.add_argument("--port", type=int, default=int(os.getenv("PUSH_PORT", "8080")))
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        default=ASYNC_PROCESSING,
+        help="process emails as coroutines with async Google API calls",
+    )
+    parser.add_argument(
+        "--accounts",
+        default=MAILBOX_ACCOUNTS,
+        help='comma separated accounts to shard across worker processes, or "auto" for all in ACCOUNTS_DIR',
+    )
+    parser.add_argument("--processes", type=int, default=SUPERVISOR_PROCESSES, help="worker processes for --accounts")
+    parser.add_argument(
+        "--requeue-dead-letters",
+        nargs="*",
+        metavar="MESSAGE_ID",
+        help="move dead-lettered emails (all, or the given message IDs) back into the queue, then exit",
+    )
+    parser.add_argument(
+        "--import-time",
+        action="store_true",
+        help="print how long importing this module and building the agents takes, then exit",
+    )
+    args = parser.parse_args()
+    ASYNC_PROCESSING = args.use_async
+
+    if args.import_time:
+        print(
+            import_report(
+                "main",
+                warm={
+                    "email_draft_assistant()": email_draft_assistant,
+                    "email_assistant_with_scheduling()": email_assistant_with_scheduling,
+                },
+            )
+        )
+        return
+
+    if args.requeue_dead_letters is not None:
+        accounts = [DEFAULT_ACCOUNT]
+        if args.accounts:
+            accounts = discover_accounts() if args.accounts == "auto" else parse_accounts(args.accounts)
+        for account in accounts:
+            with use_account(account):
+                requeue_dead_letters(args.requeue_dead_letters or None)
+        return
+
+    if args.accounts:
+        if args.mode == "push":
+            parser.error("--accounts supports poll mode only")
+        if args.accounts == "auto":
+            accounts = discover_accounts()
+        else:
+            accounts = parse_accounts(args.accounts)
+        run_supervisor(accounts, args.processes, check_interval_minutes=10)
+        return
+
+    warm_up()
+
+    if args.mode == "push":
+        start_push_ingestion(args.port)
+        # Polling stays on as a fallback for missed notifications
+        check_interval = FALLBACK_POLL_MINUTES
+    else:
+        check_interval = 10
+
+    # Schedule the email checking function
+    schedule.every(check_interval).minutes.do(check_recent_emails)
+    # Failed emails are retried from the queue between checks
+    schedule.every(1).minutes.do(process_queue)
+
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT))
+    if METRICS_JSON_PATH:
+        schedule.every(METRICS_DUMP_SECONDS).seconds.do(metrics.dump_json, METRICS_JSON_PATH)
 
-    logger.info("assistant_started", check_interval_minutes=10)
+    logger.info(
+        "assistant_started",
+        mode=args.mode,
+        async_processing=ASYNC_PROCESSING,
+        check_interval_minutes=check_interval,
+    )
 
-    # Run the first check immediately
+    # Resume work left behind by a crashed run, then check immediately
+    work_queue.recover()
     check_recent_emails()
 
     # Keep the script running
@@ -1,12 +1,57 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+import threading
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
-gemini_2_5_pro_exp = ChatGoogleGenerativeAI(
-    model="gemini-2.5-pro-exp-03-25",
-)
+# Module attribute -> Gemini model; each model is built on first access, so
+# importing this module does not import langchain-google-genai
+MODEL_IDS = {
+    "gemini_2_5_pro_exp": "gemini-2.5-pro-exp-03-25",
+    "gemini_2_5_pro_preview": "gemini-2.5-pro-preview-03-25",
+    # Cheap model used to triage emails the header rules cannot decide
+    "gemini_2_0_flash": "gemini-2.0-flash",
+}
+
+_models = {}
+_llm_cache = None
+_models_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Returns the exact-match response cache shared by all models; see tools/llm_cache.py."""
+    global _llm_cache
+    if _llm_cache is None:
+        with _models_lock:
+            if _llm_cache is None:
+                from tools.llm_cache import SQLiteLLMCache
+
+                _llm_cache = SQLiteLLMCache()
+    return _llm_cache
+
+
+def get_model(name):
+    """Returns the named model from MODEL_IDS, building it on first use."""
+    model = _models.get(name)
+    if model is None:
+        cache = get_llm_cache()
+        with _models_lock:
+            model = _models.get(name)
+            if model is None:
+                from tools.gemini_model import RateLimitedChatGoogleGenerativeAI
+
+                model = _models[name] = RateLimitedChatGoogleGenerativeAI(model=MODEL_IDS[name], cache=cache)
+    return model
+
+
+def __getattr__(name):
+    # ``models.gemini_2_5_pro_exp``, ``models.llm_cache`` and ``from models import ...`` keep working
+    if name in MODEL_IDS:
+        return get_model(name)
+    if name == "llm_cache":
+        return get_llm_cache()
+    if name == "RateLimitedChatGoogleGenerativeAI":
+        from tools.gemini_model import RateLimitedChatGoogleGenerativeAI
 
-gemini_2_5_pro_preview = ChatGoogleGenerativeAI(
-    model="gemini-2.5-pro-preview-03-25"
-)
\ No newline at end of file
+        return RateLimitedChatGoogleGenerativeAI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
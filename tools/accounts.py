@@ -0,0 +1,160 @@
+"""Per-account contexts, so one process can serve several mailboxes."""
+
+import os
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import IO, Callable, Dict, Generic, Iterator, List, Optional, TypeVar
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+T = TypeVar("T")
+
+# The single-account setup keeps its token and state files in the working directory
+DEFAULT_ACCOUNT = "default"
+# Other accounts get a directory of their own below this one
+ACCOUNTS_DIR = os.getenv("ACCOUNTS_DIR", "accounts")
+# Held by the one process serving an account, see AccountLock
+ACCOUNT_LOCK_FILE = "account.lock"
+
+_ACCOUNT_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.@+-]*$")
+
+# Account whose credentials and state the current thread or task works with
+current_account: ContextVar[str] = ContextVar("current_account", default=DEFAULT_ACCOUNT)
+
+
+def validate_account(account: str) -> str:
+    """Rejects account IDs that are not usable as a directory name."""
+    if not _ACCOUNT_RE.match(account or "") or ".." in account:
+        raise ValueError(f"Invalid account ID: {account!r}")
+    return account
+
+
+def account_dir(account: Optional[str] = None) -> str:
+    """Returns (and creates) the directory holding an account's tokens and state."""
+    account = account or current_account.get()
+    if account == DEFAULT_ACCOUNT:
+        return "."
+    path = os.path.join(ACCOUNTS_DIR, validate_account(account))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def account_path(filename: str, account: Optional[str] = None) -> str:
+    """Returns the path of an account's token or state file."""
+    return os.path.join(account_dir(account), filename)
+
+
+@contextmanager
+def use_account(account: str) -> Iterator[None]:
+    """Makes ``account`` the current account for the ``with`` block."""
+    token = current_account.set(validate_account(account))
+    try:
+        yield
+    finally:
+        current_account.reset(token)
+
+
+def discover_accounts(root: str = ACCOUNTS_DIR) -> List[str]:
+    """Lists the accounts that have a directory below ``root``."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)) and _ACCOUNT_RE.match(name)
+    )
+
+
+class AccountLock:
+    """
+    Exclusive lock on an account's directory, held by the process serving the account.
+
+    ``acquire`` does not block, so a process taking over an account keeps
+    serving its other accounts until the previous owner lets go. The
+    operating system releases the lock when its process exits.
+    """
+
+    def __init__(self, account: str):
+        self.account = account
+        self._file: Optional[IO[str]] = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        """Takes the lock if no other process holds it; returns whether this instance holds it."""
+        if self._file is not None:
+            return True
+        lock_file = open(account_path(ACCOUNT_LOCK_FILE, self.account), "a+", encoding="utf-8")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self) -> None:
+        if self._file is None:
+            return
+        if fcntl is None:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        # Closing the file releases the flock
+        self._file.close()
+        self._file = None
+
+
+class AccountLocal(Generic[T]):
+    """
+    One instance of a stateful component per account, created on first use.
+
+    Attribute reads and writes are forwarded to the current account's
+    instance, so module-level singletons such as the ledger keep their call
+    sites while every account gets its own state. ``get`` returns the
+    instance itself and ``evict`` drops it, so the next use reloads the
+    account's state from disk.
+    """
+
+    def __init__(self, factory: Callable[[str], T]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instances", {})
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def get(self, account: Optional[str] = None) -> T:
+        account = account or current_account.get()
+        instances: Dict[str, T] = self._instances
+        instance = instances.get(account)
+        if instance is None:
+            with self._lock:
+                instance = instances.get(account)
+                if instance is None:
+                    instance = instances[account] = self._factory(account)
+        return instance
+
+    def evict(self, account: str) -> None:
+        """Closes (if it has a ``close`` method) and drops the instance of ``account``."""
+        with self._lock:
+            instance = self._instances.pop(account, None)
+        close = getattr(instance, "close", None)
+        if close is not None:
+            close()
+
+    def accounts(self) -> List[str]:
+        """Lists the accounts an instance was created for."""
+        return sorted(self._instances)
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self.get(), name, value)
@@ -0,0 +1,106 @@
+"""Optional SQLite checkpointing of agent runs, keyed by Gmail message ID."""
+
+import asyncio
+import functools
+import os
+import sqlite3
+from typing import Any, AsyncIterator, Dict, Optional
+
+from tools.accounts import DEFAULT_ACCOUNT, current_account
+from tools.logger import logger
+
+CHECKPOINT_PATH = "agent_checkpoints.sqlite3"
+# Persist every agent step so an interrupted run resumes instead of starting over
+AGENT_CHECKPOINTS = os.getenv("AGENT_CHECKPOINTS", "0") == "1"
+
+
+def run_config(message_id: str) -> Dict[str, Any]:
+    """Returns the LangGraph config addressing the checkpoint thread of an email."""
+    account = current_account.get()
+    thread_id = message_id if account == DEFAULT_ACCOUNT else f"{account}:{message_id}"
+    return {"configurable": {"thread_id": thread_id}}
+
+
+@functools.lru_cache(maxsize=None)
+def _saver_class():
+    # Imported when checkpoints are opened, keeping langgraph out of module import
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    class LocalCheckpointSaver(SqliteSaver):
+        """
+        SqliteSaver usable from ``astream`` as well.
+
+        The async methods run the synchronous ones on a worker thread, which
+        the saver's lock and ``check_same_thread=False`` connection allow, so
+        both processing modes share one checkpoint file without aiosqlite.
+        """
+
+        async def aget_tuple(self, config):
+            return await asyncio.to_thread(self.get_tuple, config)
+
+        async def alist(self, config, *, filter=None, before=None, limit=None) -> AsyncIterator[Any]:
+            checkpoints = await asyncio.to_thread(
+                lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+            )
+            for checkpoint in checkpoints:
+                yield checkpoint
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, task_path=""):
+            return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+        def delete_thread(self, thread_id: str) -> None:
+            """Drops all checkpoints and pending writes of a finished run."""
+            with self.cursor() as cursor:
+                cursor.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                cursor.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    return LocalCheckpointSaver
+
+
+def open_checkpointer(path: str = CHECKPOINT_PATH) -> Optional["LocalCheckpointSaver"]:
+    """
+    Opens the checkpoint database, or returns None if the SQLite saver is not installed.
+
+    Returns:
+        Optional[LocalCheckpointSaver]: Checkpointer to pass to ``create_react_agent``
+    """
+    try:
+        saver_class = _saver_class()
+    except ImportError:  # optional: pip install langgraph-checkpoint-sqlite
+        logger.warning("agent_checkpoints_unavailable", hint="pip install langgraph-checkpoint-sqlite")
+        return None
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    saver = saver_class(conn)
+    saver.setup()
+    return saver
+
+
+def pending_run(agent: Any, message_id: str) -> Optional[Any]:
+    """
+    Returns the saved state of an unfinished run of ``agent`` over an email.
+
+    Returns:
+        Optional[StateSnapshot]: The last checkpoint, or None if the run must start from scratch
+    """
+    if agent.checkpointer is None:
+        return None
+    state = agent.get_state(run_config(message_id))
+    return state if state.values else None
+
+
+async def apending_run(agent: Any, message_id: str) -> Optional[Any]:
+    """Async variant of ``pending_run``."""
+    if agent.checkpointer is None:
+        return None
+    state = await agent.aget_state(run_config(message_id))
+    return state if state.values else None
+
+
+def finish_run(agent: Any, message_id: str) -> None:
+    """Deletes the checkpoints of a completed run; the ledger records the outcome from here on."""
+    if agent.checkpointer is not None:
+        agent.checkpointer.delete_thread(run_config(message_id)["configurable"]["thread_id"])
@@ -0,0 +1,175 @@
+"""Shared asyncio HTTP client for the Gmail and Calendar REST APIs."""
+
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+import httpx
+import httplib2
+from googleapiclient.errors import HttpError
+from tools.google_clients import registry
+from tools.metrics import metrics
+from tools.rate_limit import rate_limiter
+
+API_BASE_URLS = {
+    "gmail": "https://gmail.googleapis.com/gmail/v1/users/me",
+    "calendar": "https://www.googleapis.com/calendar/v3",
+}
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", "20"))
+ASYNC_HTTP_TIMEOUT_SECONDS = float(os.getenv("ASYNC_HTTP_TIMEOUT_SECONDS", "30"))
+
+
+def call_installed(
+    service: Any,
+    api: str,
+    method: str,
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    body: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Sends a REST request through the equivalent call of a discovery-style service.
+
+    Covers the endpoints the async tools use; services pinned with
+    ``registry.install`` (e.g. the benchmark's fakes) serve async calls this way.
+    """
+    params = {k: v for k, v in (params or {}).items() if v is not None}
+    parts = [unquote(part) for part in path.strip("/").split("/")]
+    with_body = {"body": body} if body is not None else {}
+    if api == "gmail" and parts == ["drafts"] and method == "POST":
+        request = service.users().drafts().create(userId="me", body=body, **params)
+    elif api == "gmail" and len(parts) == 2 and parts[0] == "threads" and method == "GET":
+        request = service.users().threads().get(userId="me", id=parts[1], **params)
+    elif api == "calendar" and len(parts) in (3, 4) and parts[0] == "calendars" and parts[2] == "events":
+        events = service.events()
+        if len(parts) == 3 and method in ("GET", "POST"):
+            call = events.list if method == "GET" else events.insert
+            request = call(calendarId=parts[1], **with_body, **params)
+        elif len(parts) == 4 and method in ("GET", "PUT", "DELETE"):
+            call = {"GET": events.get, "PUT": events.update, "DELETE": events.delete}[method]
+            request = call(calendarId=parts[1], eventId=parts[3], **with_body, **params)
+        else:
+            raise ValueError(f"Unsupported {api} request: {method} {path}")
+    else:
+        raise ValueError(f"Unsupported {api} request: {method} {path}")
+    return request.execute() or {}
+
+
+class AsyncGoogleClient:
+    """
+    Thin async wrapper over the Google REST endpoints used by the tools.
+
+    One pooled ``httpx.AsyncClient`` with keep-alive connections is shared by
+    every coroutine on an event loop. Access tokens come from the shared
+    client registry, so sync and async tools use the same credentials; a
+    service pinned in the registry serves the request on a worker thread.
+    Failed responses raise ``googleapiclient.errors.HttpError`` like the
+    synchronous client does.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = ASYNC_HTTP_MAX_CONNECTIONS,
+        timeout_seconds: float = ASYNC_HTTP_TIMEOUT_SECONDS,
+    ):
+        self.max_connections = max_connections
+        self.timeout_seconds = timeout_seconds
+        self._clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+    def _client(self) -> httpx.AsyncClient:
+        # httpx connection pools are bound to the loop they were opened on
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            for stale in [other for other in self._clients if other.is_closed()]:
+                del self._clients[stale]
+            client = self._clients[loop] = httpx.AsyncClient(
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return client
+
+    async def request(
+        self,
+        api: str,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        body: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Sends an authorized request to a Google REST API.
+
+        Args:
+            api: Registry key of the API, "gmail" or "calendar"
+            method: HTTP method
+            path: Path below the API's base URL, e.g. "/drafts"
+            params: Query parameters (optional)
+            body: JSON request body (optional)
+
+        Returns:
+            Dict[str, Any]: Decoded JSON response, empty for 204 responses
+
+        Raises:
+            googleapiclient.errors.HttpError: If the API returns an error status that
+            is not retryable, or retries ran out
+        """
+        service = registry.installed(api)
+        if service is not None:
+            return await asyncio.to_thread(call_installed, service, api, method, path, params, body)
+        url = API_BASE_URLS[api] + path
+        label = f"{api}.{method.lower()}"
+
+        async def send():
+            # A token refresh, or the OAuth flow, must not block the event loop
+            creds = await asyncio.to_thread(registry.get_credentials, api)
+            with metrics.track_api_call(label):
+                response = await self._client().request(
+                    method,
+                    url,
+                    params={k: v for k, v in (params or {}).items() if v is not None},
+                    json=body,
+                    headers={"Authorization": f"Bearer {creds.token}"},
+                )
+                if response.status_code >= 400:
+                    resp = httplib2.Response({"status": response.status_code, **response.headers})
+                    resp.reason = response.reason_phrase
+                    raise HttpError(resp, response.content, uri=url)
+            return response
+
+        response = await rate_limiter.acall(label, send)
+        if not response.content:
+            return {}
+        return response.json()
+
+    async def list_all(
+        self, api: str, path: str, params: Optional[Dict[str, Any]] = None, items_key: str = "items"
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Follows nextPageToken through every page of a list endpoint.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Dict[str, Any]]: All items and the last page's response
+        """
+        params = dict(params or {})
+        items: List[Dict[str, Any]] = []
+        while True:
+            response = await self.request(api, "GET", path, params=params)
+            items.extend(response.get(items_key, []))
+            if not response.get("nextPageToken"):
+                return items, response
+            params["pageToken"] = response["nextPageToken"]
+
+    async def aclose(self) -> None:
+        """Closes the pooled client of the running event loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+async_client = AsyncGoogleClient()
+
@@ -0,0 +1,372 @@
+"""Local Google Calendar event store kept in sync through syncToken."""
+
+import bisect
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from googleapiclient.errors import HttpError
+from tools.accounts import AccountLocal
+from tools.logger import logger
+
+# How far back the initial full sync reaches; older ranges go to the API
+HORIZON_DAYS = 30
+# Minimum delay between two incremental syncs with the Calendar API
+SYNC_INTERVAL_SECONDS = int(os.getenv("CALENDAR_SYNC_INTERVAL_SECONDS", "60"))
+
+# Width of the time buckets used to find events around a given start time
+BUCKET_SECONDS = 6 * 60 * 60
+# Start times further apart than this contribute nothing to a match score
+MATCH_WINDOW_SECONDS = 24 * 60 * 60
+TITLE_WEIGHT = 0.7
+MIN_MATCH_SCORE = 0.35
+
+IDEMPOTENCY_PROPERTY = "idempotencyKey"
+
+_STOPWORDS = {
+    "a", "an", "and", "at", "for", "fw", "fwd", "in", "of", "on", "re", "the", "to", "with",
+}
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def summary_tokens(summary: str) -> List[str]:
+    """Lower-cases a summary and splits it into tokens without punctuation or stopwords."""
+    return [token for token in _TOKEN_RE.findall((summary or "").lower()) if token not in _STOPWORDS]
+
+
+def idempotency_key(event: Dict[str, Any]) -> Optional[str]:
+    """Returns the idempotency key stored in an event's private extended properties."""
+    return event.get("extendedProperties", {}).get("private", {}).get(IDEMPOTENCY_PROPERTY)
+
+
+def parse_event_time(value: Any) -> float:
+    """
+    Converts an ISO timestamp, date or datetime into a UTC epoch timestamp.
+
+    Naive values are treated as UTC.
+    """
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def event_bounds(event: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """Returns the (start, end) epoch timestamps of a Calendar event resource."""
+    try:
+        start = event["start"].get("dateTime") or event["start"]["date"]
+        end = event["end"].get("dateTime") or event["end"]["date"]
+        return parse_event_time(start), parse_event_time(end)
+    except (KeyError, ValueError):
+        return None
+
+
+class CalendarEventCache:
+    """
+    In-memory copy of a calendar's events, indexed by start time.
+
+    The first ``refresh`` performs a full sync from ``HORIZON_DAYS`` ago and
+    stores the returned ``nextSyncToken``; later refreshes only fetch changes.
+    Events are kept in a list sorted by start time together with the longest
+    event duration seen, which bounds how far back an overlapping event can
+    start, so range queries are a bisect plus a short scan. Normalized title
+    tokens, start-time buckets and idempotency keys are indexed as well for
+    duplicate detection.
+    """
+
+    def __init__(
+        self,
+        calendar_id: str = "primary",
+        horizon_days: int = HORIZON_DAYS,
+        sync_interval_seconds: int = SYNC_INTERVAL_SECONDS,
+    ):
+        self.calendar_id = calendar_id
+        self.horizon_days = horizon_days
+        self.sync_interval_seconds = sync_interval_seconds
+        self._lock = threading.RLock()
+        # Counts write-throughs; an async sync fetched before one of them is stale
+        self._write_seq = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self._events: Dict[str, Dict[str, Any]] = {}
+        self._bounds: Dict[str, Tuple[float, float]] = {}
+        self._index: List[Tuple[float, str]] = []
+        self._tokens: Dict[str, Set[str]] = {}
+        self._buckets: Dict[int, Set[str]] = {}
+        self._idempotency: Dict[str, str] = {}
+        self._max_duration = 0.0
+        self._sync_token: Optional[str] = None
+        self._synced_at = 0.0
+        self._horizon_start: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    @staticmethod
+    def _discard(index: Dict[Any, Set[str]], keys: Iterable[Any], event_id: str) -> None:
+        for key in keys:
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(event_id)
+                if not ids:
+                    del index[key]
+
+    def _remove(self, event_id: str) -> None:
+        event = self._events.pop(event_id, None)
+        bounds = self._bounds.pop(event_id, None)
+        if bounds is not None:
+            position = bisect.bisect_left(self._index, (bounds[0], event_id))
+            if position < len(self._index) and self._index[position] == (bounds[0], event_id):
+                del self._index[position]
+            self._discard(self._buckets, [int(bounds[0] // BUCKET_SECONDS)], event_id)
+        if event is not None:
+            self._discard(self._tokens, summary_tokens(event.get("summary")), event_id)
+            key = idempotency_key(event)
+            if key is not None and self._idempotency.get(key) == event_id:
+                del self._idempotency[key]
+
+    def _upsert(self, event: Dict[str, Any]) -> None:
+        self._remove(event["id"])
+        if event.get("status") == "cancelled":
+            return
+        bounds = event_bounds(event)
+        if bounds is None:
+            return
+        self._events[event["id"]] = event
+        self._bounds[event["id"]] = bounds
+        bisect.insort(self._index, (bounds[0], event["id"]))
+        self._max_duration = max(self._max_duration, bounds[1] - bounds[0])
+        self._buckets.setdefault(int(bounds[0] // BUCKET_SECONDS), set()).add(event["id"])
+        for token in summary_tokens(event.get("summary")):
+            self._tokens.setdefault(token, set()).add(event["id"])
+        key = idempotency_key(event)
+        if key is not None:
+            self._idempotency[key] = event["id"]
+
+    def _list_all(self, service: Any, **params: Any) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        events = service.events()
+        request = events.list(calendarId=self.calendar_id, singleEvents=True, maxResults=2500, **params)
+        items: List[Dict[str, Any]] = []
+        sync_token = None
+        while request is not None:
+            response = request.execute()
+            items.extend(response.get("items", []))
+            sync_token = response.get("nextSyncToken", sync_token)
+            request = events.list_next(request, response)
+        return items, sync_token
+
+    def _horizon(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(days=self.horizon_days)
+
+    def _stale(self, write_seq: Optional[int]) -> bool:
+        """Tells whether events were written through since a sync started fetching at ``write_seq``."""
+        if write_seq is None or write_seq == self._write_seq:
+            return False
+        # The next refresh fetches again; _synced_at is left as is, so it is due
+        logger.info("calendar_cache_stale_sync_discarded")
+        return True
+
+    def _apply_full_sync(
+        self,
+        horizon: datetime,
+        items: List[Dict[str, Any]],
+        sync_token: Optional[str],
+        write_seq: Optional[int] = None,
+    ) -> None:
+        with self._lock:
+            if self._stale(write_seq):
+                return
+            self._reset()
+            for event in items:
+                self._upsert(event)
+            self._sync_token = sync_token
+            self._horizon_start = horizon.timestamp()
+            self._synced_at = time.monotonic()
+        logger.info("calendar_cache_full_sync", events=len(self._events))
+
+    def _apply_incremental_sync(
+        self, items: List[Dict[str, Any]], sync_token: Optional[str], write_seq: Optional[int] = None
+    ) -> None:
+        with self._lock:
+            if self._stale(write_seq):
+                return
+            for event in items:
+                self._upsert(event)
+            self._sync_token = sync_token or self._sync_token
+            self._synced_at = time.monotonic()
+        if items:
+            logger.info("calendar_cache_incremental_sync", changes=len(items))
+
+    def _due(self, force: bool) -> bool:
+        return force or time.monotonic() - self._synced_at >= self.sync_interval_seconds
+
+    def refresh(self, service: Any, force: bool = False) -> None:
+        """
+        Brings the cache up to date unless it was synced very recently.
+
+        Args:
+            service: Calendar API service instance
+            force: Sync even if the last sync is within the sync interval
+
+        Raises:
+            googleapiclient.errors.HttpError: If the API request fails
+        """
+        with self._lock:
+            if not self._due(force):
+                return
+            if self._sync_token is not None:
+                try:
+                    self._apply_incremental_sync(
+                        *self._list_all(service, syncToken=self._sync_token)
+                    )
+                    return
+                except HttpError as error:
+                    # 410 Gone: the sync token expired and a full sync is required
+                    if error.resp.status != 410:
+                        raise
+                    logger.warning("calendar_sync_token_expired")
+            horizon = self._horizon()
+            self._apply_full_sync(horizon, *self._list_all(service, timeMin=horizon.isoformat()))
+
+    async def arefresh(self, client: Any, force: bool = False) -> None:
+        """
+        Async variant of ``refresh`` using an ``AsyncGoogleClient``.
+
+        The cache lock is only held while applying the fetched changes, never
+        across network awaits. A sync during which an insert, update or delete
+        was written through is discarded rather than applied, as it may predate
+        that write (a full sync would drop the event just created); the next
+        refresh fetches again.
+        """
+        if not self._due(force):
+            return
+        write_seq = self._write_seq
+        path = f"/calendars/{self.calendar_id}/events"
+        params = {"singleEvents": True, "maxResults": 2500}
+        sync_token = self._sync_token
+        if sync_token is not None:
+            try:
+                items, last_page = await client.list_all(
+                    "calendar", path, {**params, "syncToken": sync_token}
+                )
+                self._apply_incremental_sync(items, last_page.get("nextSyncToken"), write_seq)
+                return
+            except HttpError as error:
+                if error.resp.status != 410:
+                    raise
+                logger.warning("calendar_sync_token_expired")
+        horizon = self._horizon()
+        items, last_page = await client.list_all(
+            "calendar", path, {**params, "timeMin": horizon.isoformat()}
+        )
+        self._apply_full_sync(horizon, items, last_page.get("nextSyncToken"), write_seq)
+
+    def covers(self, start: float) -> bool:
+        """Tells whether ranges starting at ``start`` can be served from the cache."""
+        return self._horizon_start is not None and start >= self._horizon_start
+
+    def query(self, start: float, end: float, max_results: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the cached events overlapping ``[start, end)``, ordered by start time.
+
+        Args:
+            start: Range start as an epoch timestamp
+            end: Range end as an epoch timestamp
+            max_results: Maximum number of events to return (optional)
+        """
+        with self._lock:
+            low = bisect.bisect_left(self._index, (start - self._max_duration, ""))
+            high = bisect.bisect_left(self._index, (end, ""))
+            events = []
+            for _, event_id in self._index[low:high]:
+                if self._bounds[event_id][1] > start:
+                    events.append(self._events[event_id])
+                    if max_results is not None and len(events) >= max_results:
+                        break
+            return events
+
+    def find_matches(
+        self, summary: str, start: Optional[float] = None, limit: int = 5
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Scores cached events as possible duplicates of the described event.
+
+        Candidates are events sharing a title token or starting in a time bucket
+        near ``start``. Each is scored by fuzzy title similarity and, when a
+        start time is given, by how close its start is.
+
+        Args:
+            summary: Title of the event being looked for
+            start: Expected start as an epoch timestamp (optional)
+            limit: Maximum number of candidates to return
+
+        Returns:
+            List[Tuple[float, Dict[str, Any]]]: (score, event) pairs, best first
+        """
+        tokens = summary_tokens(summary)
+        normalized = " ".join(tokens)
+        with self._lock:
+            candidates: Set[str] = set()
+            for token in tokens:
+                candidates |= self._tokens.get(token, set())
+            if start is not None:
+                first = int((start - MATCH_WINDOW_SECONDS) // BUCKET_SECONDS)
+                last = int((start + MATCH_WINDOW_SECONDS) // BUCKET_SECONDS)
+                for bucket in range(first, last + 1):
+                    candidates |= self._buckets.get(bucket, set())
+
+            matches = []
+            for event_id in candidates:
+                event = self._events[event_id]
+                event_tokens = summary_tokens(event.get("summary"))
+                shared = len(set(tokens) & set(event_tokens))
+                union = len(set(tokens) | set(event_tokens)) or 1
+                title_score = max(
+                    shared / union,
+                    SequenceMatcher(None, normalized, " ".join(event_tokens)).ratio(),
+                )
+                if start is None:
+                    score = title_score
+                else:
+                    distance = abs(self._bounds[event_id][0] - start)
+                    time_score = max(0.0, 1 - distance / MATCH_WINDOW_SECONDS)
+                    score = TITLE_WEIGHT * title_score + (1 - TITLE_WEIGHT) * time_score
+                if score >= MIN_MATCH_SCORE:
+                    matches.append((round(score, 3), event))
+
+        matches.sort(key=lambda match: (-match[0], self._bounds[match[1]["id"]][0]))
+        return matches[:limit]
+
+    def find_by_idempotency_key(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached event created with the given idempotency key, if any."""
+        with self._lock:
+            event_id = self._idempotency.get(key)
+            return self._events.get(event_id) if event_id else None
+
+    @property
+    def synced(self) -> bool:
+        """Tells whether the cache holds a full copy of the calendar."""
+        return self._sync_token is not None
+
+    def upsert(self, event: Dict[str, Any]) -> None:
+        """Writes an event returned by an insert/update call through to the cache."""
+        with self._lock:
+            self._write_seq += 1
+            if self._sync_token is not None:
+                self._upsert(event)
+
+    def remove(self, event_id: str) -> None:
+        """Drops a deleted event from the cache."""
+        with self._lock:
+            self._write_seq += 1
+            self._remove(event_id)
+
+
+# One cache per account; attribute access goes to the current account's cache
+event_cache: CalendarEventCache = AccountLocal(lambda account: CalendarEventCache())
@@ -1,44 +1,256 @@
 """Google Calendar API tools for managing calendar events."""
 
-import os
+import base64
 import datetime
-from typing import Dict, List, Union, Annotated
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import hashlib
+from typing import Any, Dict, List, Union, Annotated
+from urllib.parse import quote
 from googleapiclient.errors import HttpError
-import pickle
 from langchain_core.tools import tool
+from tools.async_google import async_client
+from tools.calendar_cache import IDEMPOTENCY_PROPERTY, event_cache, parse_event_time
+from tools.google_clients import CALENDAR_SCOPES, registry
 from tools.logger import logger
 
-SCOPES = ["https://www.googleapis.com/auth/calendar"]
-token_path = "calendar_token.pickle"
-credentials_path = "credentials.json"
-creds = None
-service = None
+SCOPES = CALENDAR_SCOPES
+
+# Columns returned by get_calendar_events, and the partial response that fills them
+EVENT_TABLE_HEADER = "id | summary | start | end | attendees"
+EVENT_LIST_FIELDS = "nextPageToken,items(id,summary,start,end,attendees(email))"
+# get_calendar_events cursors served from the local event cache are offsets with this prefix
+CACHE_CURSOR_PREFIX = "cache:"
+# Returned for a cache cursor the cache can no longer serve, instead of restarting at page 1
+CURSOR_EXPIRED = "Error: cursor expired; request the range again without a cursor"
+
+
+def _event_path(event_id: str) -> str:
+    """REST path of a primary-calendar event; the ID comes from the model, so it is escaped."""
+    return f"/calendars/primary/events/{quote(event_id, safe='')}"
+
+
+def idempotent_event_id(key: str) -> str:
+    """
+    Event ID derived from an idempotency key.
+
+    Calendar event IDs use the base32hex alphabet (0-9, a-v), so a hash of the
+    key is a valid ID. Inserting a second event under the same ID fails with
+    409, which makes concurrent creates with the same key safe.
+    """
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return base64.b32hexencode(digest).decode("ascii").rstrip("=").lower()
+
+
+def _is_conflict(error: HttpError) -> bool:
+    return getattr(error.resp, "status", None) == 409
+
+
+def _find_event_by_idempotency_key(service: Any, key: str) -> Dict | None:
+    """Looks up an event by idempotency key, in the local cache first."""
+    event_cache.refresh(service)
+    if event_cache.synced:
+        return event_cache.find_by_idempotency_key(key)
+    events_result = (
+        service.events()
+        .list(
+            calendarId="primary",
+            privateExtendedProperty=f"{IDEMPOTENCY_PROPERTY}={key}",
+            singleEvents=True,
+            maxResults=1,
+        )
+        .execute()
+    )
+    items = events_result.get("items", [])
+    return items[0] if items else None
+
+
+async def _afind_event_by_idempotency_key(key: str) -> Dict | None:
+    """Async variant of _find_event_by_idempotency_key."""
+    await event_cache.arefresh(async_client)
+    if event_cache.synced:
+        return event_cache.find_by_idempotency_key(key)
+    events_result = await async_client.request(
+        "calendar",
+        "GET",
+        "/calendars/primary/events",
+        params={
+            "privateExtendedProperty": f"{IDEMPOTENCY_PROPERTY}={key}",
+            "singleEvents": True,
+            "maxResults": 1,
+        },
+    )
+    items = events_result.get("items", [])
+    return items[0] if items else None
+
+
+def _build_event(
+    summary, start_time, end_time, description, location, attendees, recurrence, timezone, idempotency_key
+) -> Dict:
+    """Builds the Calendar event resource for create_calendar_event."""
+    # Convert datetime objects to ISO format if needed
+    if isinstance(start_time, datetime.datetime):
+        start_time = start_time.isoformat()
+    if isinstance(end_time, datetime.datetime):
+        end_time = end_time.isoformat()
+
+    event = {
+        "summary": summary,
+        "start": {
+            "dateTime": start_time,
+            "timeZone": timezone,
+        },
+        "end": {
+            "dateTime": end_time,
+            "timeZone": timezone,
+        },
+    }
+
+    if description:
+        event["description"] = description
+    if location:
+        event["location"] = location
+    if attendees:
+        event["attendees"] = [{"email": email} for email in attendees]
+    if recurrence:
+        event["recurrence"] = recurrence
+    if idempotency_key:
+        event["id"] = idempotent_event_id(idempotency_key)
+        event["extendedProperties"] = {"private": {IDEMPOTENCY_PROPERTY: idempotency_key}}
+    return event
+
+
+def _apply_event_changes(
+    event, summary, start_time, end_time, description, location, attendees, timezone
+) -> Dict:
+    """Applies the fields passed to update_calendar_event to an event resource."""
+    # Update the fields that are provided
+    if summary:
+        event["summary"] = summary
+    if description:
+        event["description"] = description
+    if location:
+        event["location"] = location
+    if attendees:
+        event["attendees"] = [{"email": email} for email in attendees]
+    if start_time:
+        if isinstance(start_time, datetime.datetime):
+            start_time = start_time.isoformat()
+        event["start"] = {"dateTime": start_time, "timeZone": timezone}
+    if end_time:
+        if isinstance(end_time, datetime.datetime):
+            end_time = end_time.isoformat()
+        event["end"] = {"dateTime": end_time, "timeZone": timezone}
+    return event
+
+
+def _normalize_range(start_time, end_time) -> tuple:
+    """Converts the range passed to get_calendar_events into ISO strings."""
+    # If no time_min specified, use current time
+    if not start_time:
+        start_time = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    elif isinstance(start_time, datetime.datetime):
+        start_time = start_time.isoformat()
+
+    # Convert time_max to ISO format if it's a datetime
+    if end_time and isinstance(end_time, datetime.datetime):
+        end_time = end_time.isoformat()
+    return start_time, end_time
+
+
+def _format_matches(matches: List) -> List[Dict] | str:
+    """Renders find_matches results for the model."""
+    if not matches:
+        return "No matching events found"
+    return [
+        {
+            "id": event["id"],
+            "summary": event.get("summary", ""),
+            "start": event["start"].get("dateTime") or event["start"].get("date"),
+            "end": event["end"].get("dateTime") or event["end"].get("date"),
+            "score": score,
+        }
+        for score, event in matches
+    ]
+
+
+def _event_row(event: Dict) -> str:
+    """Projects an event onto the id, summary, start, end and attendee count columns."""
+    summary = " ".join(event.get("summary", "").replace("|", "/").split())
+    start = event.get("start", {})
+    end = event.get("end", {})
+    return " | ".join(
+        [
+            event["id"],
+            summary,
+            start.get("dateTime") or start.get("date", ""),
+            end.get("dateTime") or end.get("date", ""),
+            str(len(event.get("attendees", []))),
+        ]
+    )
+
+
+def _format_event_page(events: List[Dict], next_cursor: str = None) -> str:
+    """Renders one page of events as a compact table for the model."""
+    if not events:
+        return "No events found"
+    lines = [EVENT_TABLE_HEADER] + [_event_row(event) for event in events]
+    if next_cursor:
+        lines.append(f"next_cursor: {next_cursor}")
+    return "\n".join(lines)
+
+
+def _is_cache_cursor(cursor: str | None) -> bool:
+    return bool(cursor) and cursor.startswith(CACHE_CURSOR_PREFIX)
+
+
+def _cached_event_page(start_time: str, end_time: str, page_size: int, cursor: str) -> str | None:
+    """Serves a page from the local event cache, or returns None if the cache cannot answer."""
+    if cursor and not _is_cache_cursor(cursor):
+        return None
+    range_start = parse_event_time(start_time)
+    if not event_cache.covers(range_start):
+        return None
+    offset = int(cursor[len(CACHE_CURSOR_PREFIX):]) if cursor else 0
+    events = event_cache.query(range_start, parse_event_time(end_time), offset + page_size + 1)
+    page = events[offset : offset + page_size]
+    more = len(events) > offset + page_size
+    return _format_event_page(page, f"{CACHE_CURSOR_PREFIX}{offset + page_size}" if more else None)
+
+
+def _event_list_params(start_time, end_time, page_size, timezone, cursor) -> Dict:
+    """Builds the events.list parameters for one page of get_calendar_events."""
+    params = {
+        "timeMin": start_time,
+        "timeMax": end_time,
+        "maxResults": page_size,
+        "singleEvents": True,
+        "orderBy": "startTime",
+        "timeZone": timezone,
+        # Partial response: only the projected fields travel over the wire
+        "fields": EVENT_LIST_FIELDS,
+    }
+    if cursor and not _is_cache_cursor(cursor):
+        params["pageToken"] = cursor
+    return params
+
 
 def ensure_valid_creds() -> None:
-    global creds, service
-    if os.path.exists(token_path):
-        with open(token_path, "rb") as token:
-            creds = pickle.load(token)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            if not os.path.exists(credentials_path):
-                raise FileNotFoundError(
-                    f"Google credentials file not found at {credentials_path}. "
-                    "Please download it from Google Cloud Console."
-                )
-            flow = InstalledAppFlow.from_client_secrets_file(credentials_path, SCOPES)
-            creds = flow.run_local_server(port=0)
-
-        # Save the credentials for future use
-        with open(token_path, "wb") as token:
-            pickle.dump(creds, token)
-
-    service = build("calendar", "v3", credentials=creds)
+    """
+    Makes sure the Calendar credentials are loaded and valid.
+
+    Runs the OAuth flow on first use and refreshes the in-memory token when it
+    is close to expiry. Cheap to call repeatedly.
+    """
+    registry.get_credentials("calendar")
+
+
+def get_calendar_service() -> Any:
+    """
+    Gets the Calendar API service instance from the shared client registry.
+
+    Returns:
+        Resource: Calendar API service instance that can be used to make API calls.
+    """
+    return registry.get_service("calendar")
 
 
 @tool
@@ -55,6 +267,9 @@ def create_calendar_event(
     attendees: Annotated[List[str], "List of attendee email addresses"] = None,
     recurrence: Annotated[List[str], "List of recurrence rules (RRULE)"] = None,
     timezone: Annotated[str, "Timezone for the event"] = "Asia/Kolkata",
+    idempotency_key: Annotated[
+        str, "Unique key for this event; retrying with the same key never creates a second event"
+    ] = None,
 ) -> str:
     """
     Create a new calendar event.
@@ -68,42 +283,42 @@ def create_calendar_event(
         attendees: List of attendee email addresses (optional)
         recurrence: List of recurrence rules (optional)
         timezone: Timezone for the event (default: Asia/Kolkata)
+        idempotency_key: Unique key stored in the event's private extended
+            properties, from which the event ID is derived; if an event with this
+            key exists, it is not created again (optional)
 
     Returns:
         str: "Calendar event created successfully" or error message
     """
-    ensure_valid_creds()
-    # Convert datetime objects to ISO format if needed
-    if isinstance(start_time, datetime.datetime):
-        start_time = start_time.isoformat()
-    if isinstance(end_time, datetime.datetime):
-        end_time = end_time.isoformat()
-
-    event = {
-        "summary": summary,
-        "start": {
-            "dateTime": start_time,
-            "timeZone": timezone,
-        },
-        "end": {
-            "dateTime": end_time,
-            "timeZone": timezone,
-        },
-    }
+    service = get_calendar_service()
+    if idempotency_key:
+        try:
+            existing = _find_event_by_idempotency_key(service, idempotency_key)
+        except HttpError as error:
+            logger.error("calendar_event_creation_error", error=str(error))
+            return f"Error creating calendar event: {str(error)}"
+        if existing is not None:
+            logger.info("calendar_event_already_exists", event_id=existing["id"])
+            return f"Calendar event already exists (id: {existing['id']})"
 
-    if description:
-        event["description"] = description
-    if location:
-        event["location"] = location
-    if attendees:
-        event["attendees"] = [{"email": email} for email in attendees]
-    if recurrence:
-        event["recurrence"] = recurrence
+    event = _build_event(
+        summary, start_time, end_time, description, location, attendees, recurrence, timezone, idempotency_key
+    )
 
     try:
-        event = service.events().insert(calendarId="primary", body=event).execute()
+        try:
+            event = service.events().insert(calendarId="primary", body=event).execute()
+        except HttpError as error:
+            if not (idempotency_key and _is_conflict(error)):
+                raise
+            # A concurrent or earlier call with the same key created it first
+            event = service.events().get(calendarId="primary", eventId=event["id"]).execute()
+            event_cache.upsert(event)
+            logger.info("calendar_event_already_exists", event_id=event["id"])
+            return f"Calendar event already exists (id: {event['id']})"
+        event_cache.upsert(event)
         logger.info("calendar_event_created", event_id=event['id'])
-        return "Calendar event created successfully"
+        return f"Calendar event created successfully (id: {event['id']})"
     except HttpError as error:
         logger.error("calendar_event_creation_error", error=str(error))
         return f"Error creating calendar event: {str(error)}"
@@ -117,54 +332,92 @@ def get_calendar_events(
     end_time: Annotated[
         str, "End time for fetching events in UTC format. For eg. 2025-03-05T23:59:59.0000+00:00"
     ],
-    max_results: Annotated[int, "Maximum number of events to return"] = 50,
+    max_results: Annotated[int, "Maximum number of events per page"] = 50,
     timezone: Annotated[str, "Timezone for the events"] = "Asia/Kolkata",
-) ->  List[Dict] | str:
+    cursor: Annotated[str, "next_cursor of the previous page, to fetch the next page"] = None,
+) -> str:
     """
-    Get a list of calendar events.
+    Get a page of calendar events as a table with one event per line.
+
+    Ranges inside the local event cache's horizon are answered from memory;
+    the cache is kept current through incremental syncToken syncs. Other
+    ranges are fetched with a partial response holding only the columns.
 
     Args:
-        max_results: Maximum number of events to return (default: 10)
-        time_min: Start time for fetching events (optional)
-        time_max: End time for fetching events (optional)
-        query: Free text search terms (optional)
+        start_time: Start time for fetching events
+        end_time: End time for fetching events
+        max_results: Maximum number of events per page (default: 50)
         timezone: Timezone for the events (default: Asia/Kolkata)
+        cursor: next_cursor of the previous page (optional)
 
     Returns:
-        List of events or error message
+        str: "id | summary | start | end | attendees" rows, followed by a
+        "next_cursor: ..." line when more events remain, or an error message (also when
+        a cursor served from the local cache has expired)
     """
-    ensure_valid_creds()
-    # If no time_min specified, use current time
-    if not start_time:
-        start_time = datetime.datetime.now(datetime.timezone.utc).isoformat()
-    elif isinstance(start_time, datetime.datetime):
-        start_time = start_time.isoformat()
+    service = get_calendar_service()
+    start_time, end_time = _normalize_range(start_time, end_time)
 
-    # Convert time_max to ISO format if it's a datetime
-    if end_time and isinstance(end_time, datetime.datetime):
-        end_time = end_time.isoformat()
+    # Serve the range from the local event cache when it covers it
+    try:
+        event_cache.refresh(service)
+        page = _cached_event_page(start_time, end_time, max_results, cursor)
+        if page is not None:
+            return page
+    except HttpError as error:
+        logger.warning("calendar_cache_sync_error", error=str(error))
+    except (TypeError, ValueError) as error:
+        logger.warning("calendar_events_invalid_range", error=str(error))
+    if _is_cache_cursor(cursor):
+        logger.warning("calendar_events_cursor_expired", cursor=cursor)
+        return CURSOR_EXPIRED
 
     try:
-        events_result = (
-            service.events()
-            .list(
-                calendarId="primary",
-                timeMin=start_time,
-                timeMax=end_time,
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy="startTime",
-                timeZone=timezone,
-            )
-            .execute()
-        )
-        results = events_result.get("items", "No events found")
-        return results
+        params = _event_list_params(start_time, end_time, max_results, timezone, cursor)
+        events_result = service.events().list(calendarId="primary", **params).execute()
+        return _format_event_page(events_result.get("items", []), events_result.get("nextPageToken"))
     except HttpError as error:
         logger.error("calendar_events_fetch_error", error=str(error))
         return "Error fetching calendar events"
 
 
+@tool
+def find_matching_events(
+    summary: Annotated[str, "Title of the event to look for"],
+    start_time: Annotated[
+        str, "Expected start time in ISO format, for eg. 2025-03-05T10:00:00+05:30"
+    ] = None,
+    max_results: Annotated[int, "Maximum number of candidates to return"] = 5,
+) -> List[Dict] | str:
+    """
+    Find existing calendar events that likely describe the same event.
+
+    Summaries are normalized and fuzzy-matched against an index of cached
+    events; the expected start time, when given, narrows the candidates to
+    nearby time buckets and contributes to the score.
+
+    Args:
+        summary: Title of the event to look for
+        start_time: Expected start time (optional)
+        max_results: Maximum number of candidates to return (default: 5)
+
+    Returns:
+        List of candidate events with their id, summary, start, end and a
+        score between 0 and 1 (best first), or a message if nothing matches
+    """
+    service = get_calendar_service()
+    try:
+        event_cache.refresh(service)
+        start = parse_event_time(start_time) if start_time else None
+    except HttpError as error:
+        logger.error("calendar_events_fetch_error", error=str(error))
+        return "Error fetching calendar events"
+    except ValueError as error:
+        return f"Invalid start time: {str(error)}"
+
+    return _format_matches(event_cache.find_matches(summary, start, max_results))
+
+
 @tool
 def update_calendar_event(
     event_id: Annotated[str, "ID of the event to update"],
@@ -192,32 +445,17 @@ def update_calendar_event(
     Returns:
         str: "Calendar event updated successfully" or error message
     """
-    ensure_valid_creds()
+    service = get_calendar_service()
     try:
         # First get the existing event
         event = (
             service.events().get(calendarId="primary", eventId=event_id).execute()
         )
 
-        # Update the fields that are provided
-        if summary:
-            event["summary"] = summary
-        if description:
-            event["description"] = description
-        if location:
-            event["location"] = location
-        if attendees:
-            event["attendees"] = [{"email": email} for email in attendees]
-        if start_time:
-            if isinstance(start_time, datetime.datetime):
-                start_time = start_time.isoformat()
-            event["start"] = {"dateTime": start_time, "timeZone": timezone}
-        if end_time:
-            if isinstance(end_time, datetime.datetime):
-                end_time = end_time.isoformat()
-            event["end"] = {"dateTime": end_time, "timeZone": timezone}
-
-        service.events().update(calendarId="primary", eventId=event_id, body=event).execute()
+        _apply_event_changes(event, summary, start_time, end_time, description, location, attendees, timezone)
+
+        event = service.events().update(calendarId="primary", eventId=event_id, body=event).execute()
+        event_cache.upsert(event)
         logger.info("calendar_event_updated", event_id=event_id)
         return "Calendar event updated successfully"
     except HttpError as error:
@@ -238,11 +476,152 @@ def delete_calendar_event(
     Returns:
         str: "Calendar event deleted successfully" or error message
     """
-    ensure_valid_creds()
+    service = get_calendar_service()
     try:
         service.events().delete(calendarId="primary", eventId=event_id).execute()
+        event_cache.remove(event_id)
         logger.info("calendar_event_deleted", event_id=event_id)
         return "Calendar event deleted successfully"
     except HttpError as error:
         logger.error("calendar_event_deletion_error", event_id=event_id, error=str(error))
         return f"Error deleting calendar event: {str(error)}"
+
+
+# Async variants, attached to the tools above so that agents driven through
+# ainvoke/astream run them on the event loop instead of a worker thread.
+
+
+async def acreate_calendar_event(
+    summary: str,
+    start_time: Union[str, datetime.datetime],
+    end_time: Union[str, datetime.datetime],
+    description: str = None,
+    location: str = None,
+    attendees: List[str] = None,
+    recurrence: List[str] = None,
+    timezone: str = "Asia/Kolkata",
+    idempotency_key: str = None,
+) -> str:
+    """Async variant of create_calendar_event."""
+    if idempotency_key:
+        try:
+            existing = await _afind_event_by_idempotency_key(idempotency_key)
+        except HttpError as error:
+            logger.error("calendar_event_creation_error", error=str(error))
+            return f"Error creating calendar event: {str(error)}"
+        if existing is not None:
+            logger.info("calendar_event_already_exists", event_id=existing["id"])
+            return f"Calendar event already exists (id: {existing['id']})"
+
+    event = _build_event(
+        summary, start_time, end_time, description, location, attendees, recurrence, timezone, idempotency_key
+    )
+    try:
+        try:
+            event = await async_client.request("calendar", "POST", "/calendars/primary/events", body=event)
+        except HttpError as error:
+            if not (idempotency_key and _is_conflict(error)):
+                raise
+            event = await async_client.request("calendar", "GET", _event_path(event["id"]))
+            event_cache.upsert(event)
+            logger.info("calendar_event_already_exists", event_id=event["id"])
+            return f"Calendar event already exists (id: {event['id']})"
+        event_cache.upsert(event)
+        logger.info("calendar_event_created", event_id=event["id"])
+        return f"Calendar event created successfully (id: {event['id']})"
+    except HttpError as error:
+        logger.error("calendar_event_creation_error", error=str(error))
+        return f"Error creating calendar event: {str(error)}"
+
+
+async def aget_calendar_events(
+    start_time: str,
+    end_time: str,
+    max_results: int = 50,
+    timezone: str = "Asia/Kolkata",
+    cursor: str = None,
+) -> str:
+    """Async variant of get_calendar_events."""
+    start_time, end_time = _normalize_range(start_time, end_time)
+
+    try:
+        await event_cache.arefresh(async_client)
+        page = _cached_event_page(start_time, end_time, max_results, cursor)
+        if page is not None:
+            return page
+    except HttpError as error:
+        logger.warning("calendar_cache_sync_error", error=str(error))
+    except (TypeError, ValueError) as error:
+        logger.warning("calendar_events_invalid_range", error=str(error))
+    if _is_cache_cursor(cursor):
+        logger.warning("calendar_events_cursor_expired", cursor=cursor)
+        return CURSOR_EXPIRED
+
+    try:
+        params = _event_list_params(start_time, end_time, max_results, timezone, cursor)
+        events_result = await async_client.request("calendar", "GET", "/calendars/primary/events", params=params)
+        return _format_event_page(events_result.get("items", []), events_result.get("nextPageToken"))
+    except HttpError as error:
+        logger.error("calendar_events_fetch_error", error=str(error))
+        return "Error fetching calendar events"
+
+
+async def afind_matching_events(
+    summary: str,
+    start_time: str = None,
+    max_results: int = 5,
+) -> List[Dict] | str:
+    """Async variant of find_matching_events."""
+    try:
+        await event_cache.arefresh(async_client)
+        start = parse_event_time(start_time) if start_time else None
+    except HttpError as error:
+        logger.error("calendar_events_fetch_error", error=str(error))
+        return "Error fetching calendar events"
+    except ValueError as error:
+        return f"Invalid start time: {str(error)}"
+
+    return _format_matches(event_cache.find_matches(summary, start, max_results))
+
+
+async def aupdate_calendar_event(
+    event_id: str,
+    summary: str = None,
+    start_time: Union[str, datetime.datetime] = None,
+    end_time: Union[str, datetime.datetime] = None,
+    description: str = None,
+    location: str = None,
+    attendees: List[str] = None,
+    timezone: str = "Asia/Kolkata",
+) -> str:
+    """Async variant of update_calendar_event."""
+    path = _event_path(event_id)
+    try:
+        event = await async_client.request("calendar", "GET", path)
+        _apply_event_changes(event, summary, start_time, end_time, description, location, attendees, timezone)
+        event = await async_client.request("calendar", "PUT", path, body=event)
+        event_cache.upsert(event)
+        logger.info("calendar_event_updated", event_id=event_id)
+        return "Calendar event updated successfully"
+    except HttpError as error:
+        logger.error("calendar_event_update_error", event_id=event_id, error=str(error))
+        return f"Error updating calendar event: {str(error)}"
+
+
+async def adelete_calendar_event(event_id: str) -> str:
+    """Async variant of delete_calendar_event."""
+    try:
+        await async_client.request("calendar", "DELETE", _event_path(event_id))
+        event_cache.remove(event_id)
+        logger.info("calendar_event_deleted", event_id=event_id)
+        return "Calendar event deleted successfully"
+    except HttpError as error:
+        logger.error("calendar_event_deletion_error", event_id=event_id, error=str(error))
+        return f"Error deleting calendar event: {str(error)}"
+
+
+create_calendar_event.coroutine = acreate_calendar_event
+get_calendar_events.coroutine = aget_calendar_events
+find_matching_events.coroutine = afind_matching_events
+update_calendar_event.coroutine = aupdate_calendar_event
+delete_calendar_event.coroutine = adelete_calendar_event
@@ -0,0 +1,153 @@
+"""Compacts fetched emails before they are handed to the agents."""
+
+import os
+import re
+from typing import Any, Dict, List
+
+# Upper bound for the email body in the agent prompt, in (approximate) tokens
+EMAIL_TOKEN_BUDGET = int(os.getenv("EMAIL_TOKEN_BUDGET", "1000"))
+# Rough chars-per-token ratio for English text with Gemini tokenizers
+CHARS_PER_TOKEN = 4
+
+# A line that starts quoted reply history; everything from it onwards is dropped
+_QUOTE_HEADER_RE = re.compile(
+    r"^\s*(On .{0,200}wrote:?"
+    r"|-{2,}\s*Original Message\s*-{2,}"
+    r"|-{2,}\s*Forwarded message\s*-{2,}"
+    r"|_{10,})\s*$",
+    re.IGNORECASE,
+)
+# Outlook-style quoted header block: "From:" followed by "Sent:"/"Date:" and "To:" lines
+_HEADER_LINE_RE = re.compile(r"^\s*\*?(From|Sent|Date|To|Cc|Subject)\*?:\s*(.*)$", re.IGNORECASE)
+QUOTED_HEADER_LINES = 5
+# A line that starts a signature or legal footer; legal notices only count as whole
+# footer phrases, so "Disclaimer: numbers are preliminary" stays part of the message
+_SIGNATURE_RE = re.compile(
+    r"^\s*(--|Sent from my \w+.*|Get Outlook for \w+.*"
+    r"|(LEGAL )?DISCLAIMER:?"
+    r"|CONFIDENTIALITY (NOTICE|NOTE|STATEMENT)\b.*"
+    r"|PRIVILEGED (AND|&) CONFIDENTIAL\b.*"
+    r"|This (e-?mail|message) (and any attachments? )?(is|are|may be|contains?) (confidential|intended).*)\s*$",
+    re.IGNORECASE,
+)
+# A signature or footer ends the message: at most this many non-blank lines may follow its marker
+SIGNATURE_MAX_LINES = 10
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_INLINE_SPACE_RE = re.compile(r"[ \t\u00a0]+")
+
+
+def _starts_header_block(lines: List[str], index: int) -> bool:
+    """Tells whether a "From:" line opens a quoted header block rather than being part of the message."""
+    match = _HEADER_LINE_RE.match(lines[index])
+    if not match or match.group(1).lower() != "from" or not match.group(2):
+        return False
+    names = set()
+    for line in lines[index + 1 : index + QUOTED_HEADER_LINES]:
+        header = _HEADER_LINE_RE.match(line)
+        if not header:
+            break
+        names.add(header.group(1).lower())
+    return "to" in names and bool(names & {"sent", "date"})
+
+
+def _starts_quote(lines: List[str], index: int) -> bool:
+    """Tells whether a line opens quoted history, also when "On ... wrote:" is wrapped onto the next line."""
+    line = lines[index]
+    if _QUOTE_HEADER_RE.match(line) or _starts_header_block(lines, index):
+        return True
+    # Gmail wraps long attribution lines, e.g. before the sender's "<address> wrote:"
+    if line.lstrip().lower().startswith("on ") and index + 1 < len(lines):
+        return bool(_QUOTE_HEADER_RE.match(f"{line.rstrip()} {lines[index + 1].strip()}"))
+    return False
+
+
+def strip_quoted_history(body: str) -> str:
+    """Removes quoted reply chains (``> ...`` lines and everything after "On ... wrote:")."""
+    lines: List[str] = []
+    body_lines = body.splitlines()
+    for index, line in enumerate(body_lines):
+        if _starts_quote(body_lines, index):
+            break
+        if line.lstrip().startswith(">"):
+            continue
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def strip_signature(body: str) -> str:
+    """Removes the signature block and legal footer, if one can be recognised at the end of the body."""
+    lines = body.splitlines()
+    for index, line in enumerate(lines):
+        # Ignore signature markers in the first lines, they are more likely content
+        if index < 2 or not _SIGNATURE_RE.match(line):
+            continue
+        # A marker followed by a longer text is content, not the trailing footer
+        if sum(1 for rest in lines[index + 1 :] if rest.strip()) <= SIGNATURE_MAX_LINES:
+            return "\n".join(lines[:index])
+    return body
+
+
+def collapse_whitespace(body: str) -> str:
+    """Collapses runs of spaces and blank lines and trims every line."""
+    lines = [_INLINE_SPACE_RE.sub(" ", line).strip() for line in body.splitlines()]
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def truncate_to_budget(text: str, token_budget: int = EMAIL_TOKEN_BUDGET) -> str:
+    """Truncates text to roughly ``token_budget`` tokens, cutting at a word boundary."""
+    max_chars = token_budget * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[: cut if cut > max_chars // 2 else max_chars].rstrip() + " [truncated]"
+
+
+def clean_body(body: str, token_budget: int = EMAIL_TOKEN_BUDGET) -> str:
+    """
+    Runs the full cleaning pipeline over an email body.
+
+    Args:
+        body: Plain text email body
+        token_budget: Approximate maximum number of tokens to keep
+
+    Returns:
+        str: Body without quoted history, signature or redundant whitespace
+    """
+    body = body.replace("\r\n", "\n")
+    body = strip_quoted_history(body)
+    body = strip_signature(body)
+    return truncate_to_budget(collapse_whitespace(body), token_budget)
+
+
+def format_email_for_agent(
+    email: Dict[str, Any], token_budget: int = EMAIL_TOKEN_BUDGET, thread_context: str = ""
+) -> str:
+    """
+    Renders an email as the compact message passed to the agents.
+
+    Args:
+        email: Email dict as returned by ``parse_message``
+        token_budget: Approximate maximum number of tokens for the body
+        thread_context: Notes on earlier messages of the thread, see ``ThreadStore.context``
+
+    Returns:
+        str: One "key: value" line per header (and attachment list), the thread context if any,
+        followed by the cleaned body
+    """
+    lines = [
+        f"message_id: {email.get('id', '')}",
+        f"thread_id: {email.get('thread_id', '')}",
+        f"from: {email.get('sender', '')}",
+        f"date: {email.get('date', '')}",
+        f"subject: {email.get('subject', '')}",
+    ]
+    if email.get("attachments"):
+        attachments = ", ".join(
+            f"{a['filename'] or 'unnamed'} ({a['mime_type']}, {a['size']} bytes)"
+            for a in email["attachments"]
+        )
+        lines.append(f"attachments: {attachments}")
+    if thread_context:
+        lines += ["thread_context (earlier messages, oldest first):", thread_context]
+    lines += ["body:", clean_body(email.get("body", ""), token_budget)]
+    return "\n".join(lines)
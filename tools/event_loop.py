@@ -0,0 +1,74 @@
+"""Long-lived asyncio event loop for the async processing mode."""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class BackgroundEventLoop:
+    """
+    One event loop on a daemon thread, shared by every async batch of the process.
+
+    Clients that bind to the loop they are first used on (the Gemini client's
+    async session, pooled httpx connections, waiters parked in the rate
+    limiter) stay valid across cycles, which a fresh ``asyncio.run`` per batch
+    would break. ``run`` blocks the calling thread until the coroutine is done.
+    """
+
+    def __init__(self, name: str = "event-loop"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _running_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """
+        Runs ``coro`` on the shared loop and returns its result.
+
+        The coroutine sees the caller's context variables, e.g. the current account.
+        """
+        loop = self._running_loop()
+        result: "concurrent.futures.Future[T]" = concurrent.futures.Future()
+
+        def start() -> None:
+            # Runs in the caller's context, which create_task copies into the task
+            task = loop.create_task(coro)
+
+            def done(task: "asyncio.Task[T]") -> None:
+                if task.cancelled():
+                    result.cancel()
+                elif task.exception() is not None:
+                    result.set_exception(task.exception())
+                else:
+                    result.set_result(task.result())
+
+            task.add_done_callback(done)
+
+        loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+        return result.result()
+
+    def stop(self) -> None:
+        """Stops and closes the loop; a later ``run`` starts a new one."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+
+event_loop = BackgroundEventLoop()
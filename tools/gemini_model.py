@@ -0,0 +1,22 @@
+"""Gemini chat model that goes through the shared rate limiter."""
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+from tools.rate_limit import rate_limiter
+
+
+class RateLimitedChatGoogleGenerativeAI(ChatGoogleGenerativeAI):
+    """
+    Gemini chat model whose API calls go through the shared rate limiter.
+
+    Requests count against GEMINI_REQUESTS_PER_MINUTE and hold one of the
+    concurrency slots shared with the Google API tools. Cache hits are
+    answered before ``_generate`` is reached and are not limited.
+    """
+
+    def _generate(self, *args, **kwargs):
+        with rate_limiter.limit("gemini.generate"):
+            return super()._generate(*args, **kwargs)
+
+    async def _agenerate(self, *args, **kwargs):
+        async with rate_limiter.alimit("gemini.generate"):
+            return await super()._agenerate(*args, **kwargs)
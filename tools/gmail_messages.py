@@ -0,0 +1,389 @@
+"""Gmail reads: authenticated service, message listing, batched fetches and parsing."""
+
+from typing import List, Dict, Any, Annotated, Iterator, Tuple
+from datetime import datetime, timedelta
+from html.parser import HTMLParser
+import base64
+import re
+import time
+from tools.google_clients import GMAIL_SCOPES, registry
+from tools.logger import logger
+from tools.metrics import metrics
+from tools.rate_limit import GMAIL_METHOD_COSTS, backoff_delay, is_retryable, rate_limiter
+
+SCOPES = GMAIL_SCOPES
+
+
+def get_gmail_service() -> Any:
+    """
+    Gets Gmail API service instance with proper authentication.
+
+    The service is built once per thread by the shared client registry and its
+    credentials are kept in memory, so repeated calls are cheap.
+
+    Returns:
+        Resource: Gmail API service instance that can be used to make API calls.
+
+    Raises:
+        OSError: If credentials.json file is not found
+        google.auth.exceptions.RefreshError: If token refresh fails
+    """
+    return registry.get_service("gmail")
+
+
+# Gmail accepts up to 100 calls in a single batch HTTP request
+BATCH_SIZE = 100
+# Largest page messages.list returns
+MAX_LIST_PAGE_SIZE = 500
+MAX_FETCH_RETRIES = 5
+# Extra headers kept on parsed emails, used to triage them
+TRIAGE_HEADERS = ("List-Unsubscribe", "List-Id", "Precedence", "Auto-Submitted")
+# Fields of a MIME part that parse_message reads
+_PART_FIELDS = "mimeType,filename,headers(name,value),body(size,data,attachmentId)"
+# Nesting levels of MIME parts narrowed to _PART_FIELDS; parts nested deeper come back in full
+MIME_FIELD_DEPTH = 4
+
+
+def _part_selector(depth: int) -> str:
+    nested = f"parts({_part_selector(depth - 1)})" if depth else "parts"
+    return f"{_PART_FIELDS},{nested}"
+
+
+# Partial response with only what parse_message reads; drops snippet,
+# sizeEstimate, historyId and the like from every fetched message and its parts
+MESSAGE_FIELDS = f"id,threadId,labelIds,payload({_part_selector(MIME_FIELD_DEPTH)})"
+
+
+def list_message_ids(
+    service: Any, query: str = None, label_ids: List[str] = None, max_results: int = None
+) -> List[str]:
+    """
+    Lists the IDs of all messages matching a query, following every result page.
+
+    Args:
+        service: Gmail API service instance
+        query: Gmail search query (optional)
+        label_ids: Only return messages with all of these labels (optional)
+        max_results: Stop after this many IDs instead of reading every page (optional)
+
+    Returns:
+        List[str]: Message IDs in the order returned by Gmail (newest first)
+
+    Raises:
+        googleapiclient.errors.HttpError: If the API request fails
+    """
+    messages = service.users().messages()
+    page_size = {"maxResults": min(max_results, MAX_LIST_PAGE_SIZE)} if max_results else {}
+    request = messages.list(userId="me", labelIds=label_ids, q=query, **page_size)
+    message_ids = []
+    while request is not None:
+        response = request.execute()
+        message_ids.extend(m["id"] for m in response.get("messages", []))
+        if max_results and len(message_ids) >= max_results:
+            return message_ids[:max_results]
+        request = messages.list_next(request, response)
+    return message_ids
+
+
+def fetch_messages(
+    service: Any,
+    message_ids: List[str],
+    format: str = "full",
+    fields: str = MESSAGE_FIELDS,
+) -> List[Dict[str, Any]]:
+    """
+    Fetches messages in batches through the Gmail batch HTTP endpoint.
+
+    Items that fail with a rate limit or server error are retried with
+    exponential backoff; other failures are logged and skipped. Use
+    ``fetch_messages_reporting_failures`` to learn which IDs were not fetched.
+
+    Args:
+        service: Gmail API service instance
+        message_ids: IDs of the messages to fetch
+        format: Gmail message format to request. Defaults to "full".
+        fields: Partial response selector. Defaults to the fields parse_message reads.
+
+    Returns:
+        List[Dict[str, Any]]: Raw Gmail message resources in the order of ``message_ids``
+    """
+    return fetch_messages_reporting_failures(service, message_ids, format, fields)[0]
+
+
+def fetch_messages_reporting_failures(
+    service: Any,
+    message_ids: List[str],
+    format: str = "full",
+    fields: str = MESSAGE_FIELDS,
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Like ``fetch_messages``, also returning the IDs that could not be fetched.
+
+    Messages that no longer exist (404) are not reported as failed, as
+    fetching them again cannot succeed.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], List[str]]: Raw message resources in the order of
+        ``message_ids``, and the IDs that failed or ran out of retries
+    """
+    message_ids = list(dict.fromkeys(message_ids))
+    fetched: Dict[str, Dict[str, Any]] = {}
+    failed: List[str] = []
+    pending = message_ids
+    attempt = 0
+
+    while pending:
+        retry = []
+        answered = set()
+
+        def on_response(request_id, response, exception):
+            answered.add(request_id)
+            if exception is None:
+                fetched[request_id] = response
+                return
+            if is_retryable(exception):
+                retry.append(request_id)
+            else:
+                logger.warning("gmail_message_fetch_failed", message_id=request_id, error=str(exception))
+                if getattr(getattr(exception, "resp", None), "status", None) != 404:
+                    failed.append(request_id)
+
+        for start in range(0, len(pending), BATCH_SIZE):
+            chunk = pending[start : start + BATCH_SIZE]
+
+            def execute_batch(chunk=chunk):
+                # A retried batch only asks for the messages the failed attempt did not answer
+                batch = service.new_batch_http_request(callback=on_response)
+                for message_id in chunk:
+                    if message_id not in answered:
+                        batch.add(
+                            service.users()
+                            .messages()
+                            .get(userId="me", id=message_id, format=format, fields=fields),
+                            request_id=message_id,
+                        )
+                with metrics.track_api_call("gmail.batch"):
+                    batch.execute()
+
+            # The batch is billed per contained request, but is a single HTTP request
+            cost = GMAIL_METHOD_COSTS["messages.get"] * len(chunk)
+            try:
+                # Transport errors and 5xx responses of the batch endpoint itself are retried
+                rate_limiter.call("gmail.batch", execute_batch, cost=cost)
+            except Exception as error:
+                if not is_retryable(error):
+                    raise
+                unanswered = [message_id for message_id in chunk if message_id not in answered]
+                logger.error("gmail_batch_fetch_gave_up", count=len(unanswered), error=str(error))
+                failed.extend(unanswered)
+
+        if not retry:
+            break
+        attempt += 1
+        if attempt > MAX_FETCH_RETRIES:
+            logger.error("gmail_message_fetch_gave_up", message_ids=retry)
+            failed.extend(retry)
+            break
+        delay = backoff_delay(attempt - 1)
+        logger.warning("gmail_message_fetch_retry", count=len(retry), attempt=attempt, delay=delay)
+        time.sleep(delay)
+        # Keep the original relative order for the retried items
+        retry_set = set(retry)
+        pending = [message_id for message_id in pending if message_id in retry_set]
+
+    return [fetched[message_id] for message_id in message_ids if message_id in fetched], failed
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """Collects the visible text of an HTML document, one block per line."""
+
+    BLOCK_TAGS = {"br", "p", "div", "tr", "li", "h1", "h2", "h3", "h4", "h5", "h6", "table"}
+    SKIP_TAGS = {"script", "style", "head", "title"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chunks: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.chunks.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """Converts an HTML email body into plain text."""
+    extractor = _HTMLTextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return "".join(extractor.chunks)
+
+
+def iter_mime_parts(payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the leaf parts of a Gmail message payload, depth first.
+
+    Nested containers such as ``multipart/alternative`` inside
+    ``multipart/mixed`` are walked lazily, so callers can stop early.
+    """
+    if payload.get("parts"):
+        for part in payload["parts"]:
+            yield from iter_mime_parts(part)
+    else:
+        yield payload
+
+
+def _header(part: Dict[str, Any], name: str) -> str:
+    name = name.lower()
+    return next((h["value"] for h in part.get("headers", []) if h["name"].lower() == name), "")
+
+
+def is_attachment(part: Dict[str, Any]) -> bool:
+    """Tells whether a leaf MIME part is an attachment rather than body text."""
+    return bool(
+        part.get("filename")
+        or part.get("body", {}).get("attachmentId")
+        or _header(part, "Content-Disposition").lower().startswith("attachment")
+    )
+
+
+def decode_part(part: Dict[str, Any]) -> str:
+    """Decodes the inline data of a text MIME part using its declared charset."""
+    data = part.get("body", {}).get("data")
+    if not data:
+        return ""
+    match = re.search(r'charset="?([\w.-]+)', _header(part, "Content-Type"), re.IGNORECASE)
+    charset = match.group(1) if match else "utf-8"
+    raw = base64.urlsafe_b64decode(data)
+    try:
+        return raw.decode(charset, errors="replace")
+    except LookupError:
+        return raw.decode("utf-8", errors="replace")
+
+
+def extract_body(
+    payload: Dict[str, Any], include_attachment_text: bool = False
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Extracts the readable body and the attachment metadata of a message payload.
+
+    Plain text parts are preferred; HTML parts are converted to text only when
+    the message has no plain text. Attachments are never decoded unless
+    ``include_attachment_text`` is set and they are inline text.
+
+    Args:
+        payload: Gmail message payload
+        include_attachment_text: Append the text of inline text/* attachments
+
+    Returns:
+        Tuple[str, List[Dict[str, Any]]]: Body text and one dict per attachment
+        with its filename, mime_type and size
+    """
+    plain_parts: List[Dict[str, Any]] = []
+    html_parts: List[Dict[str, Any]] = []
+    attachments: List[Dict[str, Any]] = []
+
+    for part in iter_mime_parts(payload):
+        mime_type = part.get("mimeType", "")
+        if is_attachment(part):
+            attachments.append(
+                {
+                    "filename": part.get("filename", ""),
+                    "mime_type": mime_type,
+                    "size": part.get("body", {}).get("size", 0),
+                }
+            )
+            if include_attachment_text and mime_type.startswith("text/"):
+                plain_parts.append(part)
+        elif mime_type == "text/plain":
+            plain_parts.append(part)
+        elif mime_type == "text/html":
+            html_parts.append(part)
+
+    if plain_parts:
+        body = "\n".join(decode_part(part) for part in plain_parts)
+    else:
+        body = "\n".join(html_to_text(decode_part(part)) for part in html_parts)
+    return body, attachments
+
+
+def parse_message(msg: Dict[str, Any], include_attachment_text: bool = False) -> Dict[str, Any]:
+    """
+    Converts a Gmail message resource into the email dict used by the agents.
+
+    Args:
+        msg: Gmail message resource fetched with format="full"
+        include_attachment_text: Append the text of inline text/* attachments to the body
+
+    Returns:
+        Dict[str, Any]: Email details, see ``list_recent_emails``
+    """
+    payload = msg["payload"]
+    subject = _header(payload, "Subject")
+    sender = _header(payload, "From")
+    date = _header(payload, "Date")
+    body, attachments = extract_body(payload, include_attachment_text)
+    headers = {name.lower(): _header(payload, name) for name in TRIAGE_HEADERS}
+
+    return {
+        "id": msg["id"],
+        "thread_id": msg.get("threadId", ""),
+        "labels": msg.get("labelIds", []),
+        "headers": {name: value for name, value in headers.items() if value},
+        "subject": subject,
+        "sender": sender,
+        "date": date,
+        "body": body,
+        "attachments": attachments,
+    }
+
+
+def list_recent_emails(
+    minutes: Annotated[int, "Number of minutes to look back for fetching emails"] = 10,
+) -> List[Dict[str, Any]]:
+    """
+    Lists emails from the last specified minutes from the user's Gmail inbox.
+
+    All result pages are followed and message bodies are fetched through
+    batched requests, so a cycle costs a handful of round trips at most.
+
+    Args:
+        minutes: Number of minutes to look back for emails. Defaults to 10.
+
+    Returns:
+        List[Dict[str, Any]]: List of email details with the following structure:
+            {
+                'id': str,           # Gmail message ID
+                'thread_id': str,    # Gmail thread ID
+                'labels': list,      # Gmail label IDs, e.g. CATEGORY_UPDATES
+                'headers': dict,     # Lower-cased triage headers such as list-unsubscribe
+                'subject': str,      # Email subject
+                'sender': str,       # Sender's email address
+                'date': str,         # Email timestamp
+                'body': str,         # Full email body in plain text
+                'attachments': list  # Attachment filename, mime_type and size
+            }
+
+    Raises:
+        googleapiclient.errors.HttpError: If the API request fails
+    """
+    service = get_gmail_service()
+
+    # Calculate the timestamp for N minutes ago
+    now = datetime.now()
+    time_n_minutes_ago = now - timedelta(minutes=minutes)
+    query = f"after:{int(time_n_minutes_ago.timestamp())}"
+
+    message_ids = list_message_ids(service, query=query, label_ids=["INBOX"])
+    return [parse_message(msg) for msg in fetch_messages(service, message_ids)]
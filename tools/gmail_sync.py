@@ -0,0 +1,175 @@
+"""Incremental Gmail inbox sync based on the mailbox historyId."""
+
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+from tools.gmail_messages import (
+    fetch_messages_reporting_failures,
+    get_gmail_service,
+    list_message_ids,
+    parse_message,
+)
+from tools.logger import logger
+
+STATE_PATH = "gmail_sync_state.json"
+# Look-back used on the very first run, matching the old polling window
+INITIAL_LOOKBACK_MINUTES = 10
+# Bounds of the full resync performed when the stored historyId has expired
+RESYNC_LOOKBACK_MINUTES = 24 * 60
+RESYNC_MAX_MESSAGES = 100
+# Messages whose fetch failed are retried on this many later polls before they are given up
+MAX_FETCH_POLLS = 5
+
+
+@dataclass
+class SyncBatch:
+    """New inbox emails together with the history checkpoint they lead up to."""
+
+    emails: List[Dict[str, Any]] = field(default_factory=list)
+    history_id: Optional[str] = None
+    full_resync: bool = False
+    # message ID -> polls so far, for messages that could not be fetched yet
+    failed_ids: Dict[str, int] = field(default_factory=dict)
+
+
+class GmailHistorySync:
+    """
+    Fetches only the inbox messages added since the last committed historyId.
+
+    ``poll`` never advances the stored checkpoint by itself: callers process the
+    returned emails and then ``commit`` the batch, so a crash mid-cycle replays
+    the same messages instead of losing them. Messages that could not be
+    fetched are stored with the checkpoint and fetched again on the next poll.
+    """
+
+    def __init__(
+        self,
+        state_path: str = STATE_PATH,
+        initial_lookback_minutes: int = INITIAL_LOOKBACK_MINUTES,
+        resync_lookback_minutes: int = RESYNC_LOOKBACK_MINUTES,
+        resync_max_messages: int = RESYNC_MAX_MESSAGES,
+    ):
+        self.state_path = state_path
+        self.initial_lookback_minutes = initial_lookback_minutes
+        self.resync_lookback_minutes = resync_lookback_minutes
+        self.resync_max_messages = resync_max_messages
+        state = self._load_state()
+        self.history_id = state.get("history_id")
+        self.pending_ids: Dict[str, int] = state.get("pending_ids", {})
+
+    def _load_state(self) -> Dict[str, Any]:
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, "r", encoding="utf-8") as state_file:
+            return json.load(state_file)
+
+    def _save_state(self) -> None:
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as state_file:
+            json.dump({"history_id": self.history_id, "pending_ids": self.pending_ids}, state_file)
+        os.replace(tmp_path, self.state_path)
+
+    def _history_message_ids(self, service: Any) -> Optional[Tuple[List[str], str]]:
+        history = service.users().history()
+        request = history.list(
+            userId="me",
+            startHistoryId=self.history_id,
+            historyTypes=["messageAdded"],
+            labelId="INBOX",
+        )
+        message_ids: List[str] = []
+        history_id = self.history_id
+        try:
+            while request is not None:
+                response = request.execute()
+                for record in response.get("history", []):
+                    for added in record.get("messagesAdded", []):
+                        message = added["message"]
+                        if "INBOX" in message.get("labelIds", []):
+                            message_ids.append(message["id"])
+                history_id = response.get("historyId", history_id)
+                request = history.list_next(request, response)
+        except HttpError as error:
+            if error.resp.status == 404:
+                logger.warning("gmail_history_expired", history_id=self.history_id)
+                return None
+            raise
+        return message_ids, history_id
+
+    def _full_resync(self, service: Any, lookback_minutes: int) -> Tuple[List[str], str]:
+        # Read the checkpoint before listing so nothing arriving meanwhile is missed
+        history_id = service.users().getProfile(userId="me").execute()["historyId"]
+        since = datetime.now() - timedelta(minutes=lookback_minutes)
+        message_ids = list_message_ids(
+            service,
+            query=f"after:{int(since.timestamp())}",
+            label_ids=["INBOX"],
+            max_results=self.resync_max_messages,
+        )
+        # messages.list is newest first, history is oldest first
+        message_ids.reverse()
+        return message_ids, history_id
+
+    def poll(self) -> SyncBatch:
+        """
+        Returns the inbox emails added since the last committed checkpoint.
+
+        Falls back to a bounded full resync on the first run and whenever
+        Gmail reports the stored historyId as expired. Messages that failed to
+        be fetched on earlier polls are fetched again first.
+
+        Returns:
+            SyncBatch: Parsed emails (oldest first), the historyId to commit and the
+            IDs of the messages to fetch again on the next poll
+
+        Raises:
+            googleapiclient.errors.HttpError: If the API request fails
+        """
+        service = get_gmail_service()
+        synced = None
+        if self.history_id is not None:
+            synced = self._history_message_ids(service)
+        full_resync = synced is None
+        if full_resync:
+            lookback = (
+                self.initial_lookback_minutes
+                if self.history_id is None
+                else self.resync_lookback_minutes
+            )
+            synced = self._full_resync(service, lookback)
+            logger.info("gmail_full_resync", lookback_minutes=lookback, count=len(synced[0]))
+
+        message_ids, history_id = synced
+        # Messages left over from earlier polls come first, they are the oldest
+        message_ids = list(self.pending_ids) + message_ids
+        messages, failed = fetch_messages_reporting_failures(service, message_ids)
+        failed_ids = {}
+        for message_id in failed:
+            polls = self.pending_ids.get(message_id, 0) + 1
+            if polls < MAX_FETCH_POLLS:
+                failed_ids[message_id] = polls
+            else:
+                logger.error("gmail_sync_fetch_gave_up", message_id=message_id, polls=polls)
+        if failed_ids:
+            logger.warning("gmail_sync_fetch_deferred", count=len(failed_ids))
+        emails = [parse_message(msg) for msg in messages]
+        return SyncBatch(emails=emails, history_id=history_id, full_resync=full_resync, failed_ids=failed_ids)
+
+    def commit(self, batch: SyncBatch) -> None:
+        """
+        Persists the batch's historyId once its emails have been handled,
+        together with the IDs of the messages it could not fetch.
+
+        Args:
+            batch: Batch previously returned by ``poll``
+        """
+        history_id = batch.history_id or self.history_id
+        if history_id == self.history_id and batch.failed_ids == self.pending_ids:
+            return
+        self.history_id = history_id
+        self.pending_ids = batch.failed_ids
+        self._save_state()
@@ -1,134 +1,90 @@
 """Tools for interacting with Gmail API."""
 
-from typing import List, Dict, Any, Annotated
-from datetime import datetime, timedelta
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-import os
+from typing import Any, Dict, Annotated
 import base64
 from email.mime.text import MIMEText
-import pickle
 from langchain_core.tools import tool
+from tools.async_google import async_client
+
+# Read helpers live in tools.gmail_messages, which does not import LangChain;
+# they are re-exported here for existing callers
+from tools.gmail_messages import (  # noqa: F401
+    BATCH_SIZE,
+    MAX_FETCH_RETRIES,
+    MESSAGE_FIELDS,
+    SCOPES,
+    TRIAGE_HEADERS,
+    decode_part,
+    extract_body,
+    fetch_messages,
+    get_gmail_service,
+    html_to_text,
+    is_attachment,
+    iter_mime_parts,
+    list_message_ids,
+    list_recent_emails,
+    parse_message,
+)
+
+
+def _build_draft_body(
+    body: str, sender: str, subject: str, thread_id: str, original_message_id: str
+) -> Dict[str, Any]:
+    """Builds the drafts.create request body for a reply to ``sender``."""
+    message = MIMEText(body)
 
-# If modifying these scopes, delete the token.pickle file.
-SCOPES = [
-    "https://www.googleapis.com/auth/gmail.readonly",
-    "https://www.googleapis.com/auth/gmail.compose",
-    "https://www.googleapis.com/auth/gmail.modify",
-]
+    # Extract original message details
+    to = sender.split("<")
+    if len(to) > 1:
+        to = to[1].rstrip(">")
+    else:
+        to = sender
 
+    if not subject.startswith("Re: "):
+        subject = f"Re: {subject}"
 
-def get_gmail_service() -> Any:
-    """
-    Gets Gmail API service instance with proper authentication.
+    # Get thread ID and message ID for proper threading
+    references = original_message_id
 
-    Returns:
-        Resource: Gmail API service instance that can be used to make API calls.
+    # Set headers for reply
+    message["to"] = to
+    message["subject"] = subject
+    if references:
+        message["In-Reply-To"] = _reply_header(references)
+        message["References"] = _reply_header(references)
 
-    Raises:
-        OSError: If credentials.json file is not found
-        google.auth.exceptions.RefreshError: If token refresh fails
-    """
-    creds = None
-    # The file token.pickle stores the user's access and refresh tokens
-    if os.path.exists("gmail_token.pickle"):
-        with open("gmail_token.pickle", "rb") as token:
-            creds = pickle.load(token)
-
-    # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-            creds = flow.run_local_server(port=0)
-        # Save the credentials for the next run
-        with open("gmail_token.pickle", "wb") as token:
-            pickle.dump(creds, token)
-
-    return build("gmail", "v1", credentials=creds)
-
-
-def list_recent_emails(
-    minutes: Annotated[int, "Number of minutes to look back for fetching emails"] = 10,
-) -> List[Dict[str, str]]:
-    """
-    Lists emails from the last specified minutes from the user's Gmail inbox.
+    encoded_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
 
-    Args:
-        minutes: Number of minutes to look back for emails. Defaults to 10.
+    return {"message": {"raw": encoded_message, "threadId": thread_id}}
 
-    Returns:
-        List[Dict[str, str]]: List of email details with the following structure:
-            {
-                'id': str,           # Gmail message ID
-                'subject': str,      # Email subject
-                'sender': str,       # Sender's email address
-                'date': str,         # Email timestamp
-                'body': str          # Full email body in plain text
-            }
 
-    Raises:
-        googleapiclient.errors.HttpError: If the API request fails
+def _reply_header(original_message_id: str) -> str:
+    return f"<{original_message_id}@mail.gmail.com>"
+
+
+# Only the labels and In-Reply-To header of the thread's messages are needed
+THREAD_DRAFT_PARAMS = {
+    "format": "metadata",
+    "metadataHeaders": ["In-Reply-To"],
+    "fields": "messages(id,labelIds,payload/headers)",
+}
+
+
+def _has_reply_draft(thread: Dict[str, Any], original_message_id: str) -> bool:
     """
-    service = get_gmail_service()
+    Tells whether the thread already holds a draft replying to ``original_message_id``.
 
-    # Calculate the timestamp for N minutes ago
-    now = datetime.now()
-    time_n_minutes_ago = now - timedelta(minutes=minutes)
-    query = f"after:{int(time_n_minutes_ago.timestamp())}"
-
-    results = (
-        service.users()
-        .messages()
-        .list(userId="me", labelIds=["INBOX"], q=query)
-        .execute()
-    )
-
-    messages = results.get("messages", [])
-    emails = []
-
-    for message in messages:
-        msg = (
-            service.users()
-            .messages()
-            .get(userId="me", id=message["id"], format="full")
-            .execute()
-        )
-
-        headers = msg["payload"]["headers"]
-        subject = next((h["value"] for h in headers if h["name"] == "Subject"), "")
-        sender = next((h["value"] for h in headers if h["name"] == "From"), "")
-        date = next((h["value"] for h in headers if h["name"] == "Date"), "")
-
-        # Get email body
-        body = ""
-        if "parts" in msg["payload"]:
-            parts = msg["payload"]["parts"]
-            for part in parts:
-                if part["mimeType"] == "text/plain":
-                    if "data" in part["body"]:
-                        body = base64.urlsafe_b64decode(part["body"]["data"]).decode(
-                            "utf-8"
-                        )
-                    break
-        elif "body" in msg["payload"] and "data" in msg["payload"]["body"]:
-            body = base64.urlsafe_b64decode(msg["payload"]["body"]["data"]).decode(
-                "utf-8"
-            )
-
-        emails.append(
-            {
-                "id": msg["id"],
-                "subject": subject,
-                "sender": sender,
-                "date": date,
-                "body": body,
-            }
-        )
-
-    return emails
+    A retried or replayed agent run thereby creates at most one draft per
+    message, as Gmail drafts cannot be created under a caller-chosen ID.
+    """
+    reply_to = _reply_header(original_message_id)
+    for message in thread.get("messages", []):
+        if "DRAFT" not in message.get("labelIds", []):
+            continue
+        headers = message.get("payload", {}).get("headers", [])
+        if any(h["name"].lower() == "in-reply-to" and h["value"] == reply_to for h in headers):
+            return True
+    return False
 
 
 @tool
@@ -146,6 +102,9 @@ def create_draft(
     """
     Creates a draft email in Gmail, optionally as a reply to an existing message.
 
+    If the thread already holds a draft replying to the original message, no
+    second draft is created, so a retried email does not duplicate its reply.
+
     Args:
         body: str - Email body content
         sender: str - Original sender's email address (will be used as 'to' for reply)
@@ -161,33 +120,32 @@ def create_draft(
         googleapiclient.errors.HttpError: If the API request fails
     """
     service = get_gmail_service()
+    if thread_id and original_message_id:
+        thread = service.users().threads().get(userId="me", id=thread_id, **THREAD_DRAFT_PARAMS).execute()
+        if _has_reply_draft(thread, original_message_id):
+            return "Email draft already exists"
+    draft_body = _build_draft_body(body, sender, subject, thread_id, original_message_id)
+    service.users().drafts().create(userId="me", body=draft_body).execute()
 
-    message = MIMEText(body)
-
-    # Extract original message details
-    to = sender.split("<")
-    if len(to) > 1:
-        to = to[1].rstrip(">")
-    else:
-        to = sender
-
-    if not subject.startswith("Re: "):
-        subject = f"Re: {subject}"
-
-    # Get thread ID and message ID for proper threading
-    references = original_message_id
+    return "Email draft created successfully"
 
-    # Set headers for reply
-    message["to"] = to
-    message["subject"] = subject
-    if references:
-        message["In-Reply-To"] = f"<{references}@mail.gmail.com>"
-        message["References"] = f"<{references}@mail.gmail.com>"
 
-    encoded_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+async def acreate_draft(
+    body: str,
+    sender: str,
+    subject: str,
+    thread_id: str,
+    original_message_id: str,
+) -> str:
+    """Async variant of create_draft, used when the agent runs through ainvoke/astream."""
+    if thread_id and original_message_id:
+        thread = await async_client.request("gmail", "GET", f"/threads/{thread_id}", params=THREAD_DRAFT_PARAMS)
+        if _has_reply_draft(thread, original_message_id):
+            return "Email draft already exists"
+    draft_body = _build_draft_body(body, sender, subject, thread_id, original_message_id)
+    await async_client.request("gmail", "POST", "/drafts", body=draft_body)
 
-    draft_body = {"message": {"raw": encoded_message, "threadId": thread_id}}
+    return "Email draft created successfully"
 
-    service.users().drafts().create(userId="me", body=draft_body).execute()
 
-    return "Email draft created successfully"
+create_draft.coroutine = acreate_draft
@@ -0,0 +1,287 @@
+"""Process-wide registry of authenticated Google API service clients."""
+
+import datetime
+import json
+import os
+import pickle
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import HttpRequest
+from tools.accounts import account_path, current_account
+from tools.logger import logger
+from tools.metrics import metrics
+from tools.rate_limit import rate_limiter
+
+# If modifying these scopes, delete the matching token pickle file.
+GMAIL_SCOPES = [
+    "https://www.googleapis.com/auth/gmail.readonly",
+    "https://www.googleapis.com/auth/gmail.compose",
+    "https://www.googleapis.com/auth/gmail.modify",
+]
+CALENDAR_SCOPES = ["https://www.googleapis.com/auth/calendar"]
+
+CREDENTIALS_PATH = "credentials.json"
+
+# Refresh access tokens this long before they expire so that no tool call
+# ever goes out with a token that lapses mid-request.
+REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+
+@dataclass(frozen=True)
+class ServiceSpec:
+    """Static description of a Google API the registry can build."""
+
+    name: str
+    version: str
+    token_path: str
+    scopes: List[str]
+
+
+SERVICE_SPECS: Dict[str, ServiceSpec] = {
+    "gmail": ServiceSpec("gmail", "v1", "gmail_token.pickle", GMAIL_SCOPES),
+    "calendar": ServiceSpec("calendar", "v3", "calendar_token.pickle", CALENDAR_SCOPES),
+}
+
+
+class InstrumentedHttpRequest(HttpRequest):
+    """
+    HttpRequest that goes through the shared rate limiter and records the
+    latency and status of every attempt.
+    """
+
+    def execute(self, http=None, num_retries=0):
+        method = self.methodId or "unknown"
+
+        def send():
+            with metrics.track_api_call(method):
+                return HttpRequest.execute(self, http=http, num_retries=num_retries)
+
+        return rate_limiter.call(method, send)
+
+
+class GoogleClientRegistry:
+    """
+    Builds each Google API service once and keeps its credentials in memory.
+
+    Credentials are loaded from the token pickle on first use, refreshed
+    proactively under a per-API lock and written back to disk only when the
+    token actually changed. The parsed discovery document is shared by all
+    threads, while the service object itself is kept per thread because the
+    underlying ``httplib2`` transport is not thread-safe.
+
+    Credentials and services are kept per account: calls use the current
+    account (see ``tools/accounts.py``), whose token pickles live in the
+    account's directory.
+    """
+
+    def __init__(
+        self,
+        specs: Optional[Dict[str, ServiceSpec]] = None,
+        credentials_path: str = CREDENTIALS_PATH,
+        refresh_margin: datetime.timedelta = REFRESH_MARGIN,
+    ):
+        self.specs = dict(specs or SERVICE_SPECS)
+        self.credentials_path = credentials_path
+        self.refresh_margin = refresh_margin
+        # Keyed by (account, api)
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._creds: Dict[Tuple[str, str], Any] = {}
+        self._generation: Dict[Tuple[str, str], int] = {}
+        self._persisted: Dict[Tuple[str, str], Tuple] = {}
+        self._documents: Dict[str, Optional[dict]] = {}
+        self._installed: Dict[str, Tuple[Any, Any]] = {}
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "refreshes": 0, "token_writes": 0}
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Returns a snapshot of the hit/miss/refresh/token-write counters."""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _spec(self, api: str) -> ServiceSpec:
+        try:
+            return self.specs[api]
+        except KeyError:
+            raise ValueError(f"Unknown Google API: {api}") from None
+
+    def install(self, api: str, service: Any, credentials: Any = None) -> None:
+        """
+        Pins a ready-made service object (and credentials) for an API.
+
+        Every thread gets the same instance and no token file or OAuth flow
+        is touched; the offline benchmark uses this to swap in fake services.
+        """
+        self._spec(api)
+        self._installed[api] = (service, credentials)
+
+    def installed(self, api: str) -> Any:
+        """Returns the service pinned with ``install`` for an API, or None."""
+        pinned = self._installed.get(api)
+        return pinned[0] if pinned else None
+
+    def _lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _needs_refresh(self, creds: Any) -> bool:
+        if not creds.valid:
+            return True
+        if creds.expiry is None:
+            return False
+        # google-auth stores expiry as a naive UTC datetime
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return creds.expiry - now < self.refresh_margin
+
+    @staticmethod
+    def _fingerprint(creds: Any) -> Tuple:
+        return (creds.token, getattr(creds, "refresh_token", None), creds.expiry)
+
+    def _load(self, spec: ServiceSpec, account: str) -> Any:
+        token_path = account_path(spec.token_path, account)
+        if not os.path.exists(token_path):
+            return None
+        with open(token_path, "rb") as token:
+            creds = pickle.load(token)
+        self._persisted[(account, spec.name)] = self._fingerprint(creds)
+        return creds
+
+    def _persist(self, spec: ServiceSpec, account: str, creds: Any) -> None:
+        fingerprint = self._fingerprint(creds)
+        if self._persisted.get((account, spec.name)) == fingerprint:
+            return
+        with open(account_path(spec.token_path, account), "wb") as token:
+            pickle.dump(creds, token)
+        self._persisted[(account, spec.name)] = fingerprint
+        self._count("token_writes")
+
+    def _authorize(self, spec: ServiceSpec, account: str) -> Any:
+        if not os.path.exists(self.credentials_path):
+            raise FileNotFoundError(
+                f"Google credentials file not found at {self.credentials_path}. "
+                "Please download it from Google Cloud Console."
+            )
+        # The OAuth client libraries are imported only when a flow actually runs
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
+        logger.info("google_oauth_flow_started", api=spec.name, account=account)
+        flow = InstalledAppFlow.from_client_secrets_file(self.credentials_path, spec.scopes)
+        return flow.run_local_server(port=0)
+
+    def get_credentials(self, api: str, account: Optional[str] = None) -> Any:
+        """
+        Returns valid in-memory credentials for the given API.
+
+        Args:
+            api: Registry key of the API, e.g. "gmail" or "calendar"
+            account: Account to authenticate as (default: the current account)
+
+        Returns:
+            google.oauth2.credentials.Credentials: Credentials that stay valid for
+            at least ``refresh_margin``
+
+        Raises:
+            FileNotFoundError: If an OAuth flow is required and credentials.json is missing
+            google.auth.exceptions.RefreshError: If token refresh fails
+        """
+        spec = self._spec(api)
+        if api in self._installed:
+            return self._installed[api][1]
+        account = account or current_account.get()
+        key = (account, api)
+        creds = self._creds.get(key)
+        if creds is not None and not self._needs_refresh(creds):
+            return creds
+
+        with self._lock(key):
+            # Another thread may have refreshed while we waited for the lock
+            creds = self._creds.get(key)
+            if creds is None:
+                creds = self._load(spec, account)
+            if creds is None or self._needs_refresh(creds):
+                if creds is not None and creds.refresh_token:
+                    from google.auth.transport.requests import Request
+
+                    creds.refresh(Request())
+                    self._count("refreshes")
+                    logger.info("google_credentials_refreshed", api=api, account=account)
+                else:
+                    creds = self._authorize(spec, account)
+                self._persist(spec, account, creds)
+            if self._creds.get(key) is not creds:
+                self._creds[key] = creds
+                self._generation[key] = self._generation.get(key, 0) + 1
+            return creds
+
+    def _document(self, spec: ServiceSpec) -> Optional[dict]:
+        if spec.name not in self._documents:
+            document = get_static_doc(spec.name, spec.version)
+            self._documents[spec.name] = json.loads(document) if document else None
+        return self._documents[spec.name]
+
+    def get_service(self, api: str, account: Optional[str] = None) -> Any:
+        """
+        Returns the calling thread's service client for the given API.
+
+        The client is built on first use from the packaged discovery document
+        and reused for every later call until the credentials object changes.
+
+        Args:
+            api: Registry key of the API, e.g. "gmail" or "calendar"
+            account: Account to act for (default: the current account)
+
+        Returns:
+            Resource: Google API service instance that can be used to make API calls
+        """
+        spec = self._spec(api)
+        if api in self._installed:
+            self._count("hits")
+            return self._installed[api][0]
+        account = account or current_account.get()
+        key = (account, api)
+        creds = self.get_credentials(api, account)
+        generation = self._generation[key]
+
+        services = getattr(self._local, "services", None)
+        if services is None:
+            services = self._local.services = {}
+        cached = services.get(key)
+        if cached is not None and cached[0] == generation:
+            self._count("hits")
+            return cached[1]
+
+        self._count("misses")
+        document = self._document(spec)
+        if document is not None:
+            service = build_from_document(
+                document, credentials=creds, requestBuilder=InstrumentedHttpRequest
+            )
+        else:
+            service = build(
+                spec.name,
+                spec.version,
+                credentials=creds,
+                static_discovery=False,
+                cache_discovery=False,
+                requestBuilder=InstrumentedHttpRequest,
+            )
+        services[key] = (generation, service)
+        logger.info("google_service_built", api=api, account=account, thread=threading.current_thread().name)
+        return service
+
+
+registry = GoogleClientRegistry()
+
+
+def client_stats() -> Dict[str, int]:
+    """Returns the hit/miss/refresh counters of the shared client registry."""
+    return registry.stats()
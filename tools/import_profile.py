@@ -0,0 +1,74 @@
+"""Import-time profile of the assistant, parsed from ``python -X importtime``."""
+
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class ImportTiming:
+    """One line of ``-X importtime`` output; times in microseconds."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportTiming]:
+    """Parses the stderr of ``python -X importtime`` into timings, in import order."""
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            indent = len(name) - len(name.lstrip(" "))
+            timings.append(ImportTiming(name.strip(), int(self_us), int(cumulative_us), (indent - 1) // 2))
+        except ValueError:
+            continue
+    return timings
+
+
+def profile_import(module: str = "main") -> List[ImportTiming]:
+    """Imports ``module`` in a fresh interpreter, so nothing is cached in ``sys.modules``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def import_report(
+    module: str = "main",
+    top: int = 15,
+    warm: Optional[Dict[str, Callable[[], object]]] = None,
+) -> str:
+    """
+    Formats the import cost of ``module`` as a plain-text report.
+
+    Lists the total, the heaviest direct imports of ``module`` and the heaviest
+    modules overall by self time. ``warm`` maps a label to a callable whose
+    first call is timed as well, e.g. building an agent.
+    """
+    timings = profile_import(module)
+    root = next((timing for timing in reversed(timings) if timing.module == module), None)
+    total_ms = root.cumulative_us / 1000 if root else 0.0
+    direct = sorted((t for t in timings if t.depth == 1), key=lambda t: t.cumulative_us, reverse=True)
+    by_self = sorted(timings, key=lambda t: t.self_us, reverse=True)
+
+    lines = [f"import {module}: {total_ms:.1f} ms ({len(timings)} modules)", "", "direct imports (cumulative):"]
+    lines += [f"  {t.cumulative_us / 1000:>8.1f} ms  {t.module}" for t in direct[:top]]
+    lines += ["", "modules (self):"]
+    lines += [f"  {t.self_us / 1000:>8.1f} ms  {t.module}" for t in by_self[:top]]
+    if warm:
+        lines += ["", "first use:"]
+        for label, build in warm.items():
+            started = time.perf_counter()
+            build()
+            lines.append(f"  {(time.perf_counter() - started) * 1000:>8.1f} ms  {label}")
+    return "\n".join(lines)
@@ -0,0 +1,163 @@
+"""Persistent ledger of the Gmail messages the assistant has already handled."""
+
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from tools.logger import logger
+
+LEDGER_PATH = "processed_ledger.sqlite3"
+RETENTION_DAYS = 30
+# Failed messages are retried on later cycles until they reach this many attempts
+MAX_ATTEMPTS = 3
+# Prune expired entries after this many writes
+PRUNE_EVERY = 500
+
+DRAFTED = "drafted"
+SCHEDULED = "scheduled"
+COMPLETED = "completed"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+class ProcessedLedger:
+    """
+    SQLite-backed record of processed message IDs with an in-memory index.
+
+    Every entry is loaded into a dict on start-up, so lookups never touch the
+    database; writes go to both. Entries older than the retention period are
+    pruned on start-up and periodically afterwards.
+    """
+
+    def __init__(
+        self,
+        path: str = LEDGER_PATH,
+        retention_days: int = RETENTION_DAYS,
+        max_attempts: int = MAX_ATTEMPTS,
+    ):
+        self.retention_seconds = retention_days * 24 * 60 * 60
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS processed (
+                message_id TEXT PRIMARY KEY,
+                thread_id TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        # message_id -> (status, attempts)
+        self._entries: Dict[str, Tuple[str, int]] = {}
+        self.prune()
+        self._entries = {
+            message_id: (status, attempts)
+            for message_id, status, attempts in self._conn.execute(
+                "SELECT message_id, status, attempts FROM processed"
+            )
+        }
+
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def status(self, message_id: str) -> Optional[str]:
+        """Returns the recorded outcome of a message, or None if it was never seen."""
+        entry = self._entries.get(message_id)
+        return entry[0] if entry else None
+
+    def should_process(self, message_id: str) -> bool:
+        """
+        Tells whether a message still needs to go through the agent.
+
+        A "no" from the in-memory index is confirmed against the database,
+        where another process may have reset the entry (see ``reset``).
+
+        Args:
+            message_id: Gmail message ID
+
+        Returns:
+            bool: True for unseen messages and for failures with attempts left
+        """
+        if self._entries.get(message_id) is not None:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT status, attempts FROM processed WHERE message_id = ?", (message_id,)
+                ).fetchone()
+                if row is None:
+                    self._entries.pop(message_id, None)
+                else:
+                    self._entries[message_id] = tuple(row)
+        entry = self._entries.get(message_id)
+        if entry is None:
+            return True
+        status, attempts = entry
+        return status == FAILED and attempts < self.max_attempts
+
+    def reset(self, message_ids: List[str]) -> None:
+        """Forgets messages, e.g. requeued dead letters, so they are processed with fresh attempts."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM processed WHERE message_id = ?", [(m,) for m in message_ids])
+            self._conn.commit()
+            for message_id in message_ids:
+                self._entries.pop(message_id, None)
+
+    def record(self, message_id: str, thread_id: Optional[str], status: str) -> None:
+        """
+        Records the outcome of processing a message.
+
+        Args:
+            message_id: Gmail message ID
+            thread_id: Gmail thread ID (optional)
+            status: One of DRAFTED, SCHEDULED, COMPLETED, SKIPPED or FAILED
+        """
+        with self._lock:
+            attempts = self._entries.get(message_id, (None, 0))[1] + 1
+            self._entries[message_id] = (status, attempts)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?, ?)",
+                (message_id, thread_id, status, attempts, time.time()),
+            )
+            self._conn.commit()
+            self._writes += 1
+            prune_due = self._writes % PRUNE_EVERY == 0
+        if prune_due:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Deletes entries older than the retention period.
+
+        Returns:
+            int: Number of entries removed
+        """
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT message_id FROM processed WHERE updated_at < ?", (cutoff,)
+                )
+            ]
+            if expired:
+                self._conn.execute("DELETE FROM processed WHERE updated_at < ?", (cutoff,))
+                self._conn.commit()
+                for message_id in expired:
+                    self._entries.pop(message_id, None)
+        if expired:
+            logger.info("ledger_pruned", count=len(expired))
+        return len(expired)
+
+    def close(self) -> None:
+        """Closes the database connection; the instance is unusable afterwards."""
+        with self._lock:
+            self._conn.close()
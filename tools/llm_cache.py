@@ -0,0 +1,204 @@
+"""Persistent exact-match response cache for the chat models."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from tools.logger import logger
+
+LLM_CACHE_PATH = "llm_cache.sqlite3"
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+# langchain_core.load.loads is flagged as beta but is the supported way to
+# deserialize the generations written with dumps
+warnings.filterwarnings("ignore", message="The function `loads` is in beta")
+
+# Messages with this name, e.g. the current time of day, are left out of the cache key
+UNCACHED_MESSAGE_NAME = "uncached_context"
+
+# Message fields that differ between two runs over the same conversation
+_VOLATILE_MESSAGE_FIELDS = {"id", "tool_call_id", "response_metadata", "usage_metadata"}
+
+
+def _is_uncached(message: Any) -> bool:
+    return isinstance(message, dict) and (message.get("kwargs") or {}).get("name") == UNCACHED_MESSAGE_NAME
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        normalized = {}
+        for key, item in value.items():
+            if key == "kwargs" and isinstance(item, dict):
+                item = {k: v for k, v in item.items() if k not in _VOLATILE_MESSAGE_FIELDS}
+            elif key == "tool_calls" and isinstance(item, list):
+                item = [
+                    {k: v for k, v in call.items() if k != "id"} if isinstance(call, dict) else call
+                    for call in item
+                ]
+            normalized[key] = _normalize(item)
+        return normalized
+    if isinstance(value, list):
+        return [_normalize(item) for item in value if not _is_uncached(item)]
+    return value
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """
+    Hashes a serialized message history and model configuration into a cache key.
+
+    Message and tool call IDs and messages named ``UNCACHED_MESSAGE_NAME``
+    are dropped first, so replaying the same conversation produces the same key.
+    """
+    try:
+        prompt = json.dumps(_normalize(json.loads(prompt)), sort_keys=True)
+    except ValueError:
+        pass
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def _has_tool_calls(generations: Sequence[Any]) -> bool:
+    return any(getattr(getattr(generation, "message", None), "tool_calls", None) for generation in generations)
+
+
+def _usage(generations: Sequence[Any]) -> Dict[str, int]:
+    usage = {"input_tokens": 0, "output_tokens": 0, "cache_read_tokens": 0}
+    for generation in generations:
+        metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+        usage["input_tokens"] += metadata.get("input_tokens", 0)
+        usage["output_tokens"] += metadata.get("output_tokens", 0)
+        usage["cache_read_tokens"] += metadata.get("input_token_details", {}).get("cache_read", 0)
+    return usage
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    LangChain cache storing model responses in SQLite with TTL and LRU eviction.
+
+    Entries expire ``ttl_seconds`` after they were written. Once the table
+    grows past ``max_entries``, the least recently used tenth is evicted.
+    Hit, miss and token counters are kept for per-cycle reporting.
+
+    Responses that call tools are deliberately not stored, so a cached email
+    turn only saves its final, tool-free answer. Replaying a tool call is not
+    safe: ``update_calendar_event`` and ``delete_calendar_event`` are not
+    idempotent, and the arguments were chosen against a calendar and drafts
+    folder that may have changed since. Emails that need no action (e.g.
+    newsletters) are still answered from the cache in full.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)"
+        )
+        self._conn.commit()
+        self._stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, int]:
+        return {
+            "hits": 0,
+            "misses": 0,
+            "skipped_tool_calls": 0,
+            "tokens_saved": 0,
+            "prefix_cache_read_tokens": 0,
+        }
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        generations = loads(row[0])
+        usage = _usage(generations)
+        with self._lock:
+            self._stats["hits"] += 1
+            self._stats["tokens_saved"] += usage["input_tokens"] + usage["output_tokens"]
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if _has_tool_calls(return_val):
+            with self._lock:
+                self._stats["prefix_cache_read_tokens"] += _usage(return_val)["cache_read_tokens"]
+                self._stats["skipped_tool_calls"] += 1
+            return
+        key = cache_key(prompt, llm_string)
+        value = dumps(list(return_val))
+        now = time.time()
+        with self._lock:
+            self._stats["prefix_cache_read_tokens"] += _usage(return_val)["cache_read_tokens"]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)", (key, value, now, now)
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            if count > self.max_entries:
+                self._evict(now, count - self.max_entries + self.max_entries // 10)
+            self._conn.commit()
+
+    def _evict(self, now: float, count: int) -> None:
+        self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN "
+            "(SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+            (count,),
+        )
+        logger.info("llm_cache_evicted", count=count)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self, reset: bool = False) -> Dict[str, Any]:
+        """
+        Returns the cache counters, optionally resetting them.
+
+        Args:
+            reset: Start counting from zero again, e.g. at the end of a cycle
+
+        Returns:
+            Dict[str, Any]: hits, misses, hit_rate, tokens_saved, skipped_tool_calls
+            (responses not stored because they call tools) and the number
+            of prompt tokens Gemini served from its implicit prefix cache
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            if reset:
+                self._stats = self._empty_stats()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
@@ -1,32 +1,223 @@
 """Logger configuration for the application."""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+from typing import Any, Dict, Optional
+
+import orjson
 import structlog
 from rich.console import Console
-import logging
 
 console = Console()
 
-def configure_logger():
-    """Configure structlog with rich console output.
-    
+# console: colored output for development; json: JSON lines written to LOG_FILE by a background thread
+LOG_FORMAT = os.getenv("LOG_FORMAT", "console")
+LOG_FILE = os.getenv("LOG_FILE", os.path.join("logs", "assistant.jsonl"))
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+# Events are dropped, not waited for, when the writer falls this far behind
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Longer string fields, e.g. model output, are cut to this many characters (0: no limit)
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "2000"))
+# Share of info/debug events kept per event name, e.g. "ai_step=0.1,thread_context=0.5"
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+# Fields never truncated: the event name and rendered tracebacks
+UNTRUNCATED_FIELDS = ("event", "exception")
+SAMPLED_LEVELS = ("debug", "info")
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parses ``event=rate`` pairs separated by commas."""
+    rates = {}
+    for pair in spec.split(","):
+        if "=" in pair:
+            event, rate = pair.split("=", 1)
+            rates[event.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class LogStats:
+    """Counters of emitted, sampled-out, truncated, written and dropped log events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {"events": 0, "sampled_out": 0, "truncated_fields": 0, "written": 0, "dropped": 0, "bytes": 0}
+
+    def add(self, key: str, value: int = 1) -> None:
+        with self._lock:
+            self._counts[key] += value
+
+    def snapshot(self, reset: bool = False) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._counts)
+            if reset:
+                self._counts = dict.fromkeys(self._counts, 0)
+            return counts
+
+
+log_stats = LogStats()
+
+
+class EventSampler:
+    """Processor keeping only a share of the info/debug events named in ``rates``."""
+
+    def __init__(self, rates: Dict[str, float]):
+        self.rates = rates
+
+    def __call__(self, logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        rate = self.rates.get(event_dict.get("event"))
+        if rate is not None and method_name in SAMPLED_LEVELS and random.random() >= rate:
+            log_stats.add("sampled_out")
+            raise structlog.DropEvent
+        log_stats.add("events")
+        return event_dict
+
+
+class FieldTruncator:
+    """Processor cutting string fields longer than ``max_chars``, noting the original length."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+
+    def __call__(self, logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.max_chars:
+            return event_dict
+        for key, value in event_dict.items():
+            if isinstance(value, str) and len(value) > self.max_chars and key not in UNTRUNCATED_FIELDS:
+                event_dict[key] = f"{value[: self.max_chars]}... [{len(value)} chars]"
+                log_stats.add("truncated_fields")
+        return event_dict
+
+
+class QueueLogWriter:
+    """
+    Background thread writing event dicts as JSON lines to a rotating file.
+
+    Callers only put the event dict on a bounded queue; orjson rendering and
+    file I/O happen on the writer thread. When the queue is full the event is
+    dropped and counted instead of blocking the caller.
+    """
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int, queue_size: int = LOG_QUEUE_SIZE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, event_dict: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(event_dict)
+        except queue.Full:
+            log_stats.add("dropped")
+
+    def _run(self) -> None:
+        while True:
+            event_dict = self._queue.get()
+            try:
+                if event_dict is None:
+                    return
+                line = orjson.dumps(event_dict, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+                self._handler.emit(logging.makeLogRecord({"msg": line}))
+                log_stats.add("written")
+                log_stats.add("bytes", len(line) + 1)
+            except Exception:  # a broken event must not stop the writer
+                log_stats.add("dropped")
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Blocks until every queued event is written."""
+        self._queue.join()
+        self._handler.flush()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+        self._handler.close()
+
+
+class QueueLogger:
+    """structlog logger handing the event dict to the current ``QueueLogWriter``."""
+
+    def msg(self, **event_dict: Any) -> None:
+        writer = _writer
+        if writer is not None:
+            writer.put(event_dict)
+
+    log = debug = info = warn = warning = err = error = critical = exception = fatal = msg
+
+
+_writer: Optional[QueueLogWriter] = None
+
+
+def flush_logs() -> None:
+    """Waits until the background writer has written every queued event (no-op for console output)."""
+    if _writer is not None:
+        _writer.flush()
+
+
+def _close_writer() -> None:
+    global _writer
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+
+
+atexit.register(_close_writer)
+
+
+def configure_logger(log_format: str = LOG_FORMAT, level: int = logging.INFO, log_file: str = LOG_FILE):
+    """Configure structlog with rich console output, or JSON lines through the background writer.
+
     Args:
-        min_level: Minimum log level (default: structlog default level)
+        log_format: "console" for colored development output, "json" for the rotating JSON lines file
+        level: Minimum log level (default: INFO)
+        log_file: Path of the JSON lines file
     """
-    structlog.configure(
-        processors=[
-            structlog.processors.add_log_level,
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.StackInfoRenderer(),
+    global _writer
+    processors = [
+        # Fields bound with structlog.contextvars, e.g. the account a shard works on
+        structlog.contextvars.merge_contextvars,
+        structlog.processors.add_log_level,
+        EventSampler(parse_sample_rates(LOG_SAMPLE_RATES)),
+        FieldTruncator(LOG_MAX_FIELD_CHARS),
+        structlog.processors.TimeStamper(fmt="iso"),
+        structlog.processors.StackInfoRenderer(),
+    ]
+    _close_writer()
+    if log_format == "json":
+        _writer = QueueLogWriter(log_file, LOG_MAX_BYTES, LOG_BACKUP_COUNT)
+        # Tracebacks are rendered now; the writer thread only serializes
+        processors.append(structlog.processors.format_exc_info)
+        logger_factory = lambda *args: QueueLogger()  # noqa: E731
+    else:
+        processors.append(
             structlog.dev.ConsoleRenderer(
                 colors=True,
                 exception_formatter=structlog.dev.plain_traceback,
-            ),
-        ],
+            )
+        )
+        logger_factory = structlog.PrintLoggerFactory()
+    structlog.configure(
+        processors=processors,
         context_class=dict,
-        logger_factory=structlog.PrintLoggerFactory(),
-        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+        logger_factory=logger_factory,
+        wrapper_class=structlog.make_filtering_bound_logger(level),
         cache_logger_on_first_use=True,
     )
-    
+
     return structlog.get_logger()
 
 logger = configure_logger()
@@ -0,0 +1,264 @@
+"""In-process metrics with Prometheus text and JSON export."""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from tools.logger import logger
+
+METRICS_PREFIX = "email_assistant_"
+METRICS_PATH = "/metrics"
+# Histogram buckets in seconds, from a cached API call up to a long agent run
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+METRIC_HELP = {
+    "email_processing_seconds": ("histogram", "End-to-end processing time per email, by outcome"),
+    "agent_node_seconds": ("histogram", "Wall time of each LangGraph node step, by agent node"),
+    "tool_call_seconds": ("histogram", "Wall time of each agent tool call, by tool and status"),
+    "google_api_call_seconds": ("histogram", "Latency of Google API requests, by API method, calling tool and status"),
+    "rate_limit_wait_seconds": ("histogram", "Time requests waited for quota, by API"),
+    "api_retries_total": ("counter", "Retried Google API and model requests, by API and status"),
+    "model_tokens_total": ("counter", "Model tokens reported in response metadata, by model and token type"),
+    "shard_up": ("gauge", "Whether the worker process of a shard is running"),
+    "shard_accounts": ("gauge", "Mailbox accounts assigned to a shard"),
+    "shard_lag_seconds": ("gauge", "How far the most delayed account of a shard is behind schedule"),
+    "shard_restarts_total": ("counter", "Restarts of a shard's worker process"),
+}
+
+# Name of the agent tool being executed, used to attribute Google API calls
+current_tool: ContextVar[str] = ContextVar("current_tool", default="none")
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    """
+    Thread-safe counters, gauges and histograms keyed by name and labels.
+
+    Everything stays in memory; ``render_prometheus`` serves the Prometheus
+    text exposition format and ``snapshot`` a JSON-friendly dict.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._gauges: Dict[Tuple[str, LabelKey], float] = {}
+        # name, labels -> [per-bucket counts..., sum, count]
+        self._histograms: Dict[Tuple[str, LabelKey], List[float]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        """Observes the wall time of the ``with`` block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    @contextmanager
+    def track_api_call(self, method: str) -> Iterator[None]:
+        """Times a Google API request and records its status and calling tool."""
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except Exception as error:
+            status = str(getattr(getattr(error, "resp", None), "status", None) or "error")
+            raise
+        finally:
+            self.observe(
+                "google_api_call_seconds",
+                time.perf_counter() - started,
+                method=method,
+                tool=current_tool.get(),
+                status=status,
+            )
+
+    def record_usage(self, message: Any) -> Dict[str, int]:
+        """
+        Counts the tokens reported on a model response message.
+
+        Returns:
+            Dict[str, int]: The prompt, completion and cache_read token counts
+        """
+        usage = getattr(message, "usage_metadata", None) or {}
+        tokens = {
+            "prompt": usage.get("input_tokens", 0),
+            "completion": usage.get("output_tokens", 0),
+            "cache_read": (usage.get("input_token_details") or {}).get("cache_read", 0),
+        }
+        model = (getattr(message, "response_metadata", None) or {}).get("model_name", "unknown")
+        for token_type, count in tokens.items():
+            if count:
+                self.inc("model_tokens_total", count, model=model, type=token_type)
+        return tokens
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns all series as {name: [{"labels": ..., ...}]}, with histogram count, sum and percentiles."""
+        with self._lock:
+            counters = dict(self._counters)
+            counters.update(self._gauges)
+            histograms = {key: list(value) for key, value in self._histograms.items()}
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        for (name, labels), value in sorted(counters.items()):
+            result.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), histogram in sorted(histograms.items()):
+            count = histogram[-1]
+            result.setdefault(name, []).append(
+                {
+                    "labels": dict(labels),
+                    "count": count,
+                    "sum": round(histogram[-2], 6),
+                    "p50": self._quantile(histogram, 0.5),
+                    "p95": self._quantile(histogram, 0.95),
+                }
+            )
+        return result
+
+    def _quantile(self, histogram: List[float], q: float) -> Optional[float]:
+        # Upper bound of the bucket holding the quantile, like histogram_quantile
+        count = histogram[-1]
+        if not count:
+            return None
+        for index, bound in enumerate(self.buckets):
+            if histogram[index] >= q * count:
+                return bound
+        return float("inf")
+
+    def render_prometheus(self) -> str:
+        """Renders all series in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: list(value) for key, value in self._histograms.items()}
+        lines: List[str] = []
+        described = set()
+
+        def describe(name: str, kind: str) -> None:
+            if name not in described:
+                described.add(name)
+                help_text = METRIC_HELP.get(name, (kind, name))[1]
+                lines.append(f"# HELP {METRICS_PREFIX}{name} {help_text}")
+                lines.append(f"# TYPE {METRICS_PREFIX}{name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            describe(name, "counter")
+            lines.append(f"{METRICS_PREFIX}{name}{_format_labels(labels)} {value}")
+        for (name, labels), value in sorted(gauges.items()):
+            describe(name, "gauge")
+            lines.append(f"{METRICS_PREFIX}{name}{_format_labels(labels)} {value}")
+        for (name, labels), histogram in sorted(histograms.items()):
+            describe(name, "histogram")
+            full_name = METRICS_PREFIX + name
+            for index, bound in enumerate(self.buckets):
+                lines.append(f"{full_name}_bucket{_format_labels(labels, (('le', str(bound)),))} {histogram[index]}")
+            lines.append(f"{full_name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {histogram[-1]}")
+            lines.append(f"{full_name}_sum{_format_labels(labels)} {histogram[-2]}")
+            lines.append(f"{full_name}_count{_format_labels(labels)} {histogram[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def dump_json(self, path: str) -> None:
+        """Atomically writes ``snapshot`` to ``path``."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as metrics_file:
+            json.dump({"timestamp": time.time(), "metrics": self.snapshot()}, metrics_file, indent=2)
+        os.replace(tmp_path, path)
+
+
+metrics = Metrics()
+
+
+def start_metrics_dump(path: str, interval_seconds: float, registry: Metrics = metrics) -> threading.Thread:
+    """
+    Writes ``registry`` to ``path`` as JSON every ``interval_seconds`` on a background thread.
+
+    Returns:
+        threading.Thread: The daemon thread doing the writes
+    """
+
+    def dump_forever() -> None:
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                registry.dump_json(path)
+            except OSError as error:
+                logger.warning("metrics_dump_failed", path=path, error=str(error))
+
+    thread = threading.Thread(target=dump_forever, name="metrics-dump", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0", registry: Metrics = metrics) -> ThreadingHTTPServer:
+    """
+    Serves ``registry`` at ``GET /metrics`` on a background thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call ``shutdown`` to stop it
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != METRICS_PATH:
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=httpd.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info("metrics_server_started", port=httpd.server_address[1], path=METRICS_PATH)
+    return httpd
@@ -0,0 +1,245 @@
+"""Event-driven ingestion from Gmail push notifications (users.watch + Pub/Sub)."""
+
+import argparse
+import base64
+import json
+import os
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from tools.logger import logger
+
+PUSH_PATH = "/gmail/push"
+PUSH_PORT = int(os.getenv("PUSH_PORT", "8080"))
+# Shared secret expected as ?token=... on the Pub/Sub push endpoint URL
+PUSH_VERIFICATION_TOKEN = os.getenv("PUSH_VERIFICATION_TOKEN")
+# Quiet period and upper bound used to coalesce bursts of notifications
+DEBOUNCE_SECONDS = float(os.getenv("PUSH_DEBOUNCE_SECONDS", "2"))
+MAX_DEBOUNCE_WAIT_SECONDS = float(os.getenv("PUSH_MAX_WAIT_SECONDS", "10"))
+
+
+class Debouncer:
+    """
+    Coalesces bursts of triggers into single callback runs.
+
+    The callback runs on a background thread once no trigger arrived for
+    ``quiet_seconds``, or ``max_wait_seconds`` after the first pending trigger
+    at the latest. Triggers arriving while the callback runs schedule exactly
+    one more run afterwards.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[], Any],
+        quiet_seconds: float = DEBOUNCE_SECONDS,
+        max_wait_seconds: float = MAX_DEBOUNCE_WAIT_SECONDS,
+    ):
+        self.callback = callback
+        self.quiet_seconds = quiet_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self._condition = threading.Condition()
+        self._first_pending: Optional[float] = None
+        self._last_pending: Optional[float] = None
+        self._coalesced = 0
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="push-debouncer", daemon=True)
+        self._thread.start()
+
+    def trigger(self) -> None:
+        """Requests a callback run."""
+        with self._condition:
+            now = time.monotonic()
+            if self._first_pending is None:
+                self._first_pending = now
+            self._last_pending = now
+            self._coalesced += 1
+            self._condition.notify()
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopped and self._first_pending is None:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                deadline = min(
+                    self._last_pending + self.quiet_seconds,
+                    self._first_pending + self.max_wait_seconds,
+                )
+                if now < deadline:
+                    self._condition.wait(deadline - now)
+                    continue
+                coalesced = self._coalesced
+                self._first_pending = self._last_pending = None
+                self._coalesced = 0
+            logger.info("push_sync_triggered", notifications=coalesced)
+            try:
+                self.callback()
+            except Exception as e:
+                logger.exception("push_sync_error", error=str(e))
+
+
+def decode_notification(envelope: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extracts the Gmail notification from a Pub/Sub push request body.
+
+    Args:
+        envelope: JSON body of the push request, {"message": {"data": <base64>, ...}, ...}
+
+    Returns:
+        Dict[str, Any]: {"emailAddress": str, "historyId": int}
+
+    Raises:
+        ValueError: If the body is not a Gmail push notification
+    """
+    try:
+        data = json.loads(base64.b64decode(envelope["message"]["data"]))
+        return {"emailAddress": data["emailAddress"], "historyId": int(data["historyId"])}
+    except (KeyError, TypeError, ValueError) as error:
+        raise ValueError(f"Invalid Gmail push notification: {error}") from error
+
+
+class PushNotificationServer:
+    """
+    Small HTTP endpoint receiving Gmail push notifications from Pub/Sub.
+
+    Every valid notification is handed to ``on_notification`` and
+    acknowledged immediately with 204; the actual sync runs elsewhere.
+    """
+
+    def __init__(
+        self,
+        on_notification: Callable[[Dict[str, Any]], Any],
+        port: int = PUSH_PORT,
+        host: str = "0.0.0.0",
+        verification_token: Optional[str] = PUSH_VERIFICATION_TOKEN,
+    ):
+        self.on_notification = on_notification
+        self.verification_token = verification_token
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                url = urlparse(self.path)
+                if url.path != PUSH_PATH:
+                    self.send_error(404)
+                    return
+                token = parse_qs(url.query).get("token", [None])[0]
+                if server.verification_token and token != server.verification_token:
+                    self.send_error(403)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    notification = decode_notification(json.loads(self.rfile.read(length)))
+                except ValueError as error:
+                    logger.warning("push_notification_invalid", error=str(error))
+                    # Acknowledge anyway so Pub/Sub does not redeliver a bad message forever
+                    self.send_response(204)
+                    self.end_headers()
+                    return
+                self.send_response(204)
+                self.end_headers()
+                server.on_notification(notification)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="push-server", daemon=True
+        )
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    def start(self) -> None:
+        self._thread.start()
+        logger.info("push_server_started", port=self.port, path=PUSH_PATH)
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def start_watch(service: Any, topic_name: str) -> Dict[str, Any]:
+    """
+    Asks Gmail to publish INBOX changes to a Pub/Sub topic.
+
+    A watch expires after seven days; Google recommends renewing it daily.
+
+    Args:
+        service: Gmail API service instance
+        topic_name: Full topic name, e.g. projects/my-project/topics/gmail
+
+    Returns:
+        Dict[str, Any]: The watch response with historyId and expiration
+
+    Raises:
+        googleapiclient.errors.HttpError: If the API request fails
+    """
+    response = (
+        service.users()
+        .watch(
+            userId="me",
+            body={"topicName": topic_name, "labelIds": ["INBOX"], "labelFilterBehavior": "include"},
+        )
+        .execute()
+    )
+    logger.info("gmail_watch_started", topic=topic_name, expiration=response.get("expiration"))
+    return response
+
+
+def simulate_notification(
+    url: str, history_id: int, email_address: str = "me@example.com"
+) -> int:
+    """
+    Posts a fake Pub/Sub push notification, for testing without Google Cloud.
+
+    Args:
+        url: Push endpoint URL, including ?token=... if one is configured
+        history_id: historyId to announce
+        email_address: Mailbox the notification is for
+
+    Returns:
+        int: HTTP status code returned by the endpoint
+    """
+    data = json.dumps({"emailAddress": email_address, "historyId": history_id}).encode()
+    envelope = {
+        "message": {
+            "data": base64.b64encode(data).decode(),
+            "messageId": str(time.time_ns()),
+            "publishTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "subscription": "projects/local/subscriptions/fake",
+    }
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(envelope).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request) as response:
+        return response.status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send simulated Gmail push notifications")
+    parser.add_argument("--url", default=f"http://localhost:{PUSH_PORT}{PUSH_PATH}")
+    parser.add_argument("--history-id", type=int, default=int(time.time()))
+    parser.add_argument("--count", type=int, default=1, help="Notifications to send in a burst")
+    args = parser.parse_args()
+    for offset in range(args.count):
+        status = simulate_notification(args.url, args.history_id + offset)
+        print(f"historyId={args.history_id + offset} -> HTTP {status}")
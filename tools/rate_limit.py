@@ -0,0 +1,314 @@
+"""Quota-aware rate limiting and retries shared by Google API and model calls."""
+
+import asyncio
+import collections
+import json
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+from tools.logger import logger
+from tools.metrics import metrics
+
+T = TypeVar("T")
+
+# Per-user quotas; Gmail counts quota units, Calendar and Gemini count requests
+GMAIL_QUOTA_UNITS_PER_MINUTE = int(os.getenv("GMAIL_QUOTA_UNITS_PER_MINUTE", "15000"))
+CALENDAR_REQUESTS_PER_MINUTE = int(os.getenv("CALENDAR_REQUESTS_PER_MINUTE", "600"))
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+# Requests (Google API and model) in flight at the same time, across all tools
+API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "8"))
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "5"))
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 32.0
+
+# Gmail quota units per method, matched against the end of the method ID
+GMAIL_METHOD_COSTS = {
+    "messages.get": 5,
+    "messages.list": 5,
+    "history.list": 2,
+    "drafts.create": 10,
+    "threads.get": 10,
+    "getProfile": 1,
+    "watch": 100,
+}
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+
+@dataclass(frozen=True)
+class ApiQuota:
+    """Per-minute quota of one API and the cost of its methods in quota units."""
+
+    per_minute: float
+    default_cost: float = 1
+    costs: Dict[str, float] = field(default_factory=dict)
+
+    def cost(self, method: str) -> float:
+        for suffix, cost in self.costs.items():
+            if method.endswith(suffix):
+                return cost
+        return self.default_cost
+
+
+DEFAULT_QUOTAS = {
+    "gmail": ApiQuota(GMAIL_QUOTA_UNITS_PER_MINUTE, default_cost=5, costs=GMAIL_METHOD_COSTS),
+    "calendar": ApiQuota(CALENDAR_REQUESTS_PER_MINUTE),
+    "gemini": ApiQuota(GEMINI_REQUESTS_PER_MINUTE),
+}
+
+
+class TokenBucket:
+    """
+    Token bucket handing out reservations.
+
+    ``reserve`` takes the tokens immediately, possibly into debt, and returns
+    how long the caller has to wait before using them; callers therefore get
+    served in arrival order and never spin. ``pause`` holds every caller back,
+    e.g. for a server-provided Retry-After.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate, self._paused_until - now)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class ConcurrencySlots:
+    """
+    Cap on requests in flight, shared by threads and coroutines.
+
+    Waiters are served first come, first served: a released slot is handed
+    straight to the oldest waiter, a thread through its event and a
+    coroutine through a future resolved on its own event loop, so nobody
+    polls for a free slot.
+    """
+
+    def __init__(self, slots: int):
+        self._lock = threading.Lock()
+        self._free = slots
+        self._waiters: "collections.deque[Any]" = collections.deque()
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return
+            future = loop.create_future()
+            self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                waiting = future in self._waiters
+                if waiting:
+                    self._waiters.remove(future)
+            # A slot handed over before the cancellation is passed on; if the
+            # future itself was cancelled, _hand_over passes it on instead
+            if not waiting and not future.cancelled():
+                self.release()
+            raise
+
+    def _hand_over(self, future: "asyncio.Future[None]") -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                try:
+                    waiter.get_loop().call_soon_threadsafe(self._hand_over, waiter)
+                    return
+                except RuntimeError:  # the waiter's event loop is closed
+                    continue
+            self._free += 1
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given (0-based) retry attempt."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempt + 1)))
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Reads the Retry-After header of an HttpError, in seconds."""
+    value = (getattr(error, "resp", None) or {}).get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def error_reason(error: Exception) -> Optional[str]:
+    """Returns the first ``errors[].reason`` of a Google API error response."""
+    try:
+        content = json.loads(getattr(error, "content", b"") or b"{}")
+        return content["error"]["errors"][0]["reason"]
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Tells whether a failed Google API request may succeed when retried."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        # Dropped or timed-out connections, raised by httplib2 before any response
+        return True
+    status = getattr(getattr(error, "resp", None), "status", None)
+    if status in RETRYABLE_STATUSES:
+        return True
+    return status == 403 and error_reason(error) in RATE_LIMIT_REASONS
+
+
+class RateLimiter:
+    """
+    Shared limiter for every outgoing Google API and model request.
+
+    Each API has a token bucket sized from its per-minute quota (burst of a
+    quarter minute), and all APIs share one cap on requests in flight.
+    Failed requests that are rate limited or transient are retried with
+    jittered exponential backoff; a Retry-After pauses the whole API's
+    bucket, so concurrent callers back off together instead of piling on.
+    """
+
+    def __init__(
+        self,
+        quotas: Optional[Dict[str, ApiQuota]] = None,
+        max_concurrency: int = API_MAX_CONCURRENCY,
+        max_retries: int = API_MAX_RETRIES,
+    ):
+        self.quotas = dict(quotas or DEFAULT_QUOTAS)
+        self.max_retries = max_retries
+        self._buckets = {
+            api: TokenBucket(quota.per_minute / 60, max(1.0, quota.per_minute / 4))
+            for api, quota in self.quotas.items()
+        }
+        self._slots = ConcurrencySlots(max(1, max_concurrency))
+
+    def _reserve(self, method: str, cost: Optional[float]) -> float:
+        api = method.split(".")[0]
+        bucket = self._buckets.get(api)
+        if bucket is None:
+            return 0.0
+        wait = bucket.reserve(self.quotas[api].cost(method) if cost is None else cost)
+        if wait:
+            metrics.observe("rate_limit_wait_seconds", wait, api=api)
+        return wait
+
+    @contextmanager
+    def limit(self, method: str, cost: Optional[float] = None) -> Iterator[None]:
+        """Waits for quota and a free concurrency slot, holding the slot for the ``with`` block."""
+        wait = self._reserve(method, cost)
+        if wait:
+            time.sleep(wait)
+        self._slots.acquire()
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def alimit(self, method: str, cost: Optional[float] = None):
+        """Async variant of ``limit``; waits without blocking the event loop."""
+        wait = self._reserve(method, cost)
+        if wait:
+            await asyncio.sleep(wait)
+        await self._slots.aacquire()
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def _retry_delay(self, method: str, error: Exception, attempt: int) -> Optional[float]:
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        api = method.split(".")[0]
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, BACKOFF_BASE_SECONDS)
+            if api in self._buckets:
+                self._buckets[api].pause(delay)
+        else:
+            delay = backoff_delay(attempt)
+        status = getattr(getattr(error, "resp", None), "status", None)
+        metrics.inc("api_retries_total", api=api, status=status)
+        logger.warning("api_request_retry", method=method, status=status, attempt=attempt + 1, delay=round(delay, 2))
+        return delay
+
+    def call(self, method: str, fn: Callable[[], T], cost: Optional[float] = None) -> T:
+        """
+        Runs ``fn`` within the quota of ``method``'s API, retrying retryable failures.
+
+        Args:
+            method: API method ID, e.g. "gmail.users.messages.get"; the API is its first component
+            fn: Performs the request
+            cost: Quota units, overriding the method's configured cost
+
+        Raises:
+            Exception: Whatever ``fn`` raised last, once it is not retryable or retries ran out
+        """
+        for attempt in range(self.max_retries + 1):
+            with self.limit(method, cost):
+                try:
+                    return fn()
+                except Exception as error:
+                    delay = self._retry_delay(method, error, attempt)
+                    if delay is None:
+                        raise
+            time.sleep(delay)
+
+    async def acall(self, method: str, fn: Callable[[], Awaitable[T]], cost: Optional[float] = None) -> T:
+        """Async variant of ``call``; ``fn`` returns a new awaitable per attempt."""
+        for attempt in range(self.max_retries + 1):
+            async with self.alimit(method, cost):
+                try:
+                    return await fn()
+                except Exception as error:
+                    delay = self._retry_delay(method, error, attempt)
+                    if delay is None:
+                        raise
+            await asyncio.sleep(delay)
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,258 @@
+"""Supervisor that shards mailbox accounts across worker processes."""
+
+import bisect
+import hashlib
+import multiprocessing
+import os
+import queue
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from tools.logger import logger
+from tools.metrics import metrics
+
+# Worker processes started by the supervisor, one shard each
+SUPERVISOR_PROCESSES = int(os.getenv("SUPERVISOR_PROCESSES", str(os.cpu_count() or 1)))
+# Virtual nodes per shard on the hash ring, smoothing the account distribution
+HASH_REPLICAS = 64
+# A dead shard is restarted after this delay; its accounts are served elsewhere meanwhile
+RESTART_DELAY_SECONDS = int(os.getenv("SUPERVISOR_RESTART_DELAY_SECONDS", "10"))
+STATUS_LOG_SECONDS = 60
+
+
+def shard_index(name: str) -> int:
+    """Returns the number of a shard from its name, e.g. 1 for "shard-1"."""
+    return int(name.rpartition("-")[2])
+
+
+def _hash(key: str) -> int:
+    return int(hashlib.md5(key.encode("utf-8")).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping accounts to shards.
+
+    Each shard owns ``replicas`` points on the ring and an account belongs to
+    the first point at or after its hash, so adding or removing a shard only
+    moves the accounts of that shard.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = HASH_REPLICAS):
+        self.replicas = replicas
+        self._points: List[Tuple[int, str]] = []
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted({node for _, node in self._points})
+
+    def add(self, node: str) -> None:
+        if node in self.nodes:
+            return
+        for replica in range(self.replicas):
+            bisect.insort(self._points, (_hash(f"{node}#{replica}"), node))
+
+    def remove(self, node: str) -> None:
+        self._points = [point for point in self._points if point[1] != node]
+
+    def node_for(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, (_hash(key), "")) % len(self._points)
+        return self._points[index][1]
+
+    def assign(self, keys: Iterable[str]) -> Dict[str, List[str]]:
+        """Returns the sorted keys owned by every node on the ring."""
+        assignment: Dict[str, List[str]] = {node: [] for node in self.nodes}
+        for key in sorted(keys):
+            node = self.node_for(key)
+            if node is not None:
+                assignment[node].append(key)
+        return assignment
+
+
+@dataclass
+class Shard:
+    """A worker process and the accounts it currently serves."""
+
+    name: str
+    process: Any = None
+    inbox: Any = None
+    accounts: List[str] = field(default_factory=list)
+    restarts: int = 0
+    down_since: Optional[float] = None
+    # account -> (received_at, report) of the latest report
+    reports: Dict[str, Tuple[float, Dict[str, Any]]] = field(default_factory=dict)
+    assigned_at: Dict[str, float] = field(default_factory=dict)
+
+
+class Supervisor:
+    """
+    Runs ``target`` in one process per shard and spreads accounts over them.
+
+    ``target`` is called as ``target(shard, inbox, reports, *target_args)``:
+    it reads its list of accounts from ``inbox`` (a new list replaces the old
+    one) and puts a dict per finished account cycle on ``reports``. When a
+    shard dies its node leaves the hash ring, its accounts move to the other
+    shards, and it is restarted after ``restart_delay_seconds``.
+
+    A report holds ``shard``, ``account``, ``checked_at`` (epoch seconds of the last
+    finished inbox check), ``check_interval_seconds`` and
+    ``oldest_queued_seconds``; an account lags by how far its last check is
+    overdue plus the age of its oldest queued email.
+    """
+
+    def __init__(
+        self,
+        accounts: Iterable[str],
+        target: Callable[..., None],
+        processes: int = SUPERVISOR_PROCESSES,
+        target_args: Tuple = (),
+        restart_delay_seconds: float = RESTART_DELAY_SECONDS,
+    ):
+        self.accounts = sorted(set(accounts))
+        self.target = target
+        self.target_args = target_args
+        self.restart_delay_seconds = restart_delay_seconds
+        # Spawned workers do not inherit threads, locks or SQLite connections of the supervisor
+        self._context = multiprocessing.get_context("spawn")
+        self._reports = self._context.Queue()
+        self.shards = {f"shard-{index}": Shard(f"shard-{index}") for index in range(max(1, processes))}
+        self.ring = HashRing()
+        self._last_status_log = 0.0
+
+    def _spawn(self, shard: Shard) -> None:
+        shard.inbox = self._context.Queue()
+        shard.process = self._context.Process(
+            target=self.target,
+            args=(shard.name, shard.inbox, self._reports, *self.target_args),
+            name=shard.name,
+            daemon=True,
+        )
+        shard.process.start()
+        shard.accounts = []
+        shard.down_since = None
+        self.ring.add(shard.name)
+        logger.info("shard_started", shard=shard.name, pid=shard.process.pid, restarts=shard.restarts)
+
+    def start(self) -> None:
+        for shard in self.shards.values():
+            self._spawn(shard)
+        self.rebalance()
+
+    def rebalance(self) -> None:
+        """Sends every live shard its accounts according to the current ring."""
+        assignment = self.ring.assign(self.accounts)
+        moved = 0
+        now = time.time()
+        for name, accounts in assignment.items():
+            shard = self.shards[name]
+            if accounts == shard.accounts:
+                continue
+            moved += len(set(accounts) - set(shard.accounts))
+            shard.assigned_at = {account: shard.assigned_at.get(account, now) for account in accounts}
+            shard.reports = {account: report for account, report in shard.reports.items() if account in accounts}
+            shard.accounts = accounts
+            shard.inbox.put(accounts)
+        logger.info(
+            "shards_rebalanced",
+            moved_accounts=moved,
+            assignment={name: len(accounts) for name, accounts in assignment.items()},
+        )
+
+    def _collect_reports(self) -> None:
+        owners = {account: shard for shard in self.shards.values() for account in shard.accounts}
+        while True:
+            try:
+                report = self._reports.get_nowait()
+            except queue.Empty:
+                return
+            shard = owners.get(report.get("account"))
+            # Reports of a previous owner, sent before a rebalance, are dropped
+            if shard is not None and shard.name == report.get("shard"):
+                shard.reports[report["account"]] = (time.time(), report)
+
+    def account_lag(self, shard: Shard, account: str, now: Optional[float] = None) -> float:
+        now = now or time.time()
+        received = shard.reports.get(account)
+        if received is None:
+            # Never checked by this shard yet: lagging since it was assigned
+            return max(0.0, now - shard.assigned_at.get(account, now))
+        received_at, report = received
+        lag = max(0.0, now - report["checked_at"] - report.get("check_interval_seconds", 0))
+        if report.get("oldest_queued_seconds"):
+            # The oldest queued email has kept aging since the report
+            lag += report["oldest_queued_seconds"] + now - received_at
+        return lag
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Returns liveness, accounts, restarts, queue depth and lag per shard."""
+        now = time.time()
+        result = []
+        for shard in self.shards.values():
+            alive = shard.process is not None and shard.process.is_alive()
+            lags = [self.account_lag(shard, account, now) for account in shard.accounts]
+            result.append(
+                {
+                    "shard": shard.name,
+                    "pid": shard.process.pid if shard.process else None,
+                    "alive": alive,
+                    "accounts": len(shard.accounts),
+                    "restarts": shard.restarts,
+                    "queued": sum(report.get("queued", 0) for _, report in shard.reports.values()),
+                    "dead_letters": sum(report.get("dead", 0) for _, report in shard.reports.values()),
+                    "lag_seconds": round(max(lags, default=0.0), 1),
+                }
+            )
+        return result
+
+    def poll(self) -> None:
+        """Collects reports, replaces dead shards and publishes the shard status."""
+        self._collect_reports()
+        now = time.time()
+        changed = False
+        for shard in self.shards.values():
+            if shard.down_since is None and not shard.process.is_alive():
+                logger.error("shard_died", shard=shard.name, exitcode=shard.process.exitcode)
+                shard.down_since = now
+                shard.accounts = []
+                self.ring.remove(shard.name)
+                changed = True
+            elif shard.down_since is not None and now - shard.down_since >= self.restart_delay_seconds:
+                shard.restarts += 1
+                metrics.inc("shard_restarts_total", shard=shard.name)
+                self._spawn(shard)
+                changed = True
+        if changed:
+            self.rebalance()
+
+        status = self.status()
+        for entry in status:
+            metrics.set_gauge("shard_up", int(entry["alive"]), shard=entry["shard"])
+            metrics.set_gauge("shard_accounts", entry["accounts"], shard=entry["shard"])
+            metrics.set_gauge("shard_lag_seconds", entry["lag_seconds"], shard=entry["shard"])
+        if now - self._last_status_log >= STATUS_LOG_SECONDS:
+            self._last_status_log = now
+            for entry in status:
+                logger.info("shard_status", **entry)
+
+    def run(self, poll_seconds: float = 1.0) -> None:
+        """Starts the shards and supervises them until interrupted."""
+        self.start()
+        try:
+            while True:
+                time.sleep(poll_seconds)
+                self.poll()
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        for shard in self.shards.values():
+            if shard.process is not None and shard.process.is_alive():
+                shard.process.terminate()
+        for shard in self.shards.values():
+            if shard.process is not None:
+                shard.process.join(timeout=10)
@@ -0,0 +1,207 @@
+"""Local store of the Gmail thread history already seen, kept as compact notes."""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from tools.email_preprocessing import CHARS_PER_TOKEN, clean_body, collapse_whitespace, truncate_to_budget
+from tools.logger import logger
+
+THREAD_STORE_PATH = "thread_store.sqlite3"
+RETENTION_DAYS = 30
+# Earlier messages of the same thread added to the agent input
+THREAD_CONTEXT_MESSAGES = int(os.getenv("THREAD_CONTEXT_MESSAGES", "5"))
+# Upper bound for the thread context in the agent input, in (approximate) tokens
+THREAD_CONTEXT_TOKEN_BUDGET = int(os.getenv("THREAD_CONTEXT_TOKEN_BUDGET", "300"))
+# Upper bound for the note kept per message, in (approximate) tokens
+THREAD_NOTE_TOKEN_BUDGET = int(os.getenv("THREAD_NOTE_TOKEN_BUDGET", "60"))
+
+SUMMARY_PROMPT = """Summarize this email thread for an assistant writing the next reply, in at most {words} words.
+Keep names, dates, times, decisions and open questions.
+
+{notes}"""
+
+
+def message_note(email: Dict[str, Any], token_budget: int = THREAD_NOTE_TOKEN_BUDGET) -> str:
+    """
+    Condenses an email into a one-line note: date, sender, subject and the start of the cleaned body.
+
+    Args:
+        email: Email dict as returned by ``parse_message``
+        token_budget: Approximate maximum number of tokens for the body excerpt
+    """
+    excerpt = " ".join(clean_body(email.get("body", ""), token_budget).split())
+    return f"- {email.get('date', '')} | {email.get('sender', '')} | {email.get('subject', '')}: {excerpt}"
+
+
+def _digest(message_ids: List[str]) -> str:
+    return hashlib.sha256("\x00".join(message_ids).encode("utf-8")).hexdigest()
+
+
+class ThreadStore:
+    """
+    SQLite-backed notes of the messages seen per Gmail thread, plus a summary cache.
+
+    ``add`` stores a short note per message instead of its body. ``context``
+    renders the newest earlier notes of a thread within a token budget; the
+    rendering is cached under a digest of the message IDs it covers, so an
+    unchanged thread is never summarized twice. When the notes exceed the
+    budget they are condensed by ``model`` if one is given, and otherwise
+    the oldest notes are dropped.
+    """
+
+    def __init__(
+        self,
+        path: str = THREAD_STORE_PATH,
+        max_messages: int = THREAD_CONTEXT_MESSAGES,
+        token_budget: int = THREAD_CONTEXT_TOKEN_BUDGET,
+        retention_days: int = RETENTION_DAYS,
+        model: Any = None,
+    ):
+        self.max_messages = max_messages
+        self.token_budget = token_budget
+        self.retention_seconds = retention_days * 24 * 60 * 60
+        self.model = model
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "model_summaries": 0}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS thread_messages (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                message_id TEXT NOT NULL UNIQUE,
+                thread_id TEXT NOT NULL,
+                note TEXT NOT NULL,
+                added_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS thread_messages_thread ON thread_messages (thread_id, seq);
+            CREATE TABLE IF NOT EXISTS thread_summaries (
+                thread_id TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+        self.prune()
+
+    def add(self, email: Dict[str, Any]) -> None:
+        """Records a note for an email; emails without a thread or already stored are ignored."""
+        if not email.get("thread_id"):
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO thread_messages (message_id, thread_id, note, added_at) VALUES (?, ?, ?, ?)",
+                (email["id"], email["thread_id"], message_note(email), time.time()),
+            )
+            self._conn.commit()
+
+    def _earlier_notes(self, email: Dict[str, Any]) -> List[Tuple[str, str]]:
+        # Newest notes first from the query, returned oldest first
+        rows = self._conn.execute(
+            "SELECT message_id, note FROM thread_messages WHERE thread_id = ? AND message_id != ? "
+            "AND seq < COALESCE((SELECT seq FROM thread_messages WHERE message_id = ?), 9223372036854775807) "
+            "ORDER BY seq DESC LIMIT ?",
+            (email["thread_id"], email["id"], email["id"], self.max_messages),
+        ).fetchall()
+        return rows[::-1]
+
+    def context(self, email: Dict[str, Any]) -> str:
+        """
+        Returns the bounded context of the messages seen earlier in the email's thread.
+
+        Args:
+            email: Email dict as returned by ``parse_message``
+
+        Returns:
+            str: Notes or summary of earlier messages, or "" for a new thread
+        """
+        if not email.get("thread_id") or self.max_messages <= 0:
+            return ""
+        with self._lock:
+            notes = self._earlier_notes(email)
+            if not notes:
+                return ""
+            digest = _digest([message_id for message_id, _ in notes])
+            row = self._conn.execute(
+                "SELECT summary FROM thread_summaries WHERE thread_id = ? AND digest = ?",
+                (email["thread_id"], digest),
+            ).fetchone()
+            if row is not None:
+                self._stats["hits"] += 1
+                return row[0]
+            self._stats["misses"] += 1
+
+        # Summarize outside the lock, a model call may take seconds
+        summary = self._summarize([note for _, note in notes])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO thread_summaries VALUES (?, ?, ?, ?)",
+                (email["thread_id"], digest, summary, time.time()),
+            )
+            self._conn.commit()
+        return summary
+
+    def _summarize(self, notes: List[str]) -> str:
+        max_chars = self.token_budget * CHARS_PER_TOKEN
+        text = "\n".join(notes)
+        if len(text) <= max_chars:
+            return text
+        if self.model is not None:
+            summary = self._model_summary(text)
+            if summary:
+                return truncate_to_budget(summary, self.token_budget)
+        # Keep the newest notes that fit, at least the last one (truncated)
+        kept: List[str] = []
+        for note in reversed(notes):
+            if kept and len(note) + sum(len(n) + 1 for n in kept) > max_chars:
+                break
+            kept.insert(0, note)
+        return truncate_to_budget("\n".join(kept), self.token_budget)
+
+    def _model_summary(self, notes: str) -> Optional[str]:
+        words = max(20, self.token_budget * 3 // 4)
+        try:
+            answer = self.model.invoke(SUMMARY_PROMPT.format(words=words, notes=notes)).content
+        except Exception as e:
+            logger.warning("thread_summary_model_error", error=str(e))
+            return None
+        with self._lock:
+            self._stats["model_summaries"] += 1
+        return collapse_whitespace(str(answer)) or None
+
+    def prune(self) -> int:
+        """Deletes notes and summaries of threads not seen within the retention period."""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM thread_messages WHERE added_at < ?", (cutoff,)).rowcount
+            self._conn.execute("DELETE FROM thread_summaries WHERE updated_at < ?", (cutoff,))
+            self._conn.commit()
+        if deleted:
+            logger.info("thread_store_pruned", deleted=deleted)
+        return deleted
+
+    def stats(self, reset: bool = False) -> Dict[str, Any]:
+        """
+        Returns the summary cache counters, optionally resetting them.
+
+        Returns:
+            Dict[str, Any]: hits, misses, hit_rate and the number of model summaries
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            if reset:
+                self._stats = {"hits": 0, "misses": 0, "model_summaries": 0}
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        """Closes the database connection; the instance is unusable afterwards."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,106 @@
+"""Concurrent execution of the tool calls an agent emits in a single turn."""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import get_config_list, get_executor_for_config
+from langgraph.prebuilt import ToolNode
+from langgraph.store.base import BaseStore
+from tools.metrics import current_tool, metrics
+from tools.worker_pool import group_by_keys
+
+# Maximum number of tool calls from one turn running at the same time
+TOOL_CALL_WORKERS = int(os.getenv("TOOL_CALL_WORKERS", "4"))
+# Tool arguments naming the calendar event a call touches
+ORDERING_ARGS = ("event_id", "idempotency_key")
+
+
+def tool_call_keys(call: Dict[str, Any]) -> List[Optional[str]]:
+    """Tool calls sharing any of these keys touch the same event and must run in order."""
+    args = call.get("args") or {}
+    return [f"{name}:{args[name]}" if args.get(name) else None for name in ORDERING_ARGS]
+
+
+class OrderedToolNode(ToolNode):
+    """
+    ToolNode that runs the tool calls of one turn concurrently.
+
+    Calls naming the same ``event_id`` (or ``idempotency_key``) run one after
+    another in the order the model emitted them; unrelated calls run in
+    parallel on at most ``max_workers`` threads or coroutines. Results are
+    returned in the original call order. Every call's wall time is recorded
+    as ``tool_call_seconds`` and the Google API requests it makes are
+    attributed to the tool.
+    """
+
+    def __init__(self, tools, *, max_workers: int = TOOL_CALL_WORKERS, **kwargs):
+        super().__init__(tools, **kwargs)
+        self.max_workers = max(1, max_workers)
+
+    def _run_one(self, call: Dict[str, Any], input_type: str, config: RunnableConfig) -> Any:
+        token = current_tool.set(call["name"])
+        started = time.perf_counter()
+        try:
+            output = super()._run_one(call, input_type, config)
+        finally:
+            current_tool.reset(token)
+        self._record(call, output, time.perf_counter() - started)
+        return output
+
+    async def _arun_one(self, call: Dict[str, Any], input_type: str, config: RunnableConfig) -> Any:
+        token = current_tool.set(call["name"])
+        started = time.perf_counter()
+        try:
+            output = await super()._arun_one(call, input_type, config)
+        finally:
+            current_tool.reset(token)
+        self._record(call, output, time.perf_counter() - started)
+        return output
+
+    @staticmethod
+    def _record(call: Dict[str, Any], output: Any, seconds: float) -> None:
+        status = getattr(output, "status", None) or "success"
+        metrics.observe("tool_call_seconds", seconds, tool=call["name"], status=status)
+
+    def _func(
+        self, input: Any, config: RunnableConfig, *, store: Optional[BaseStore]
+    ) -> Any:
+        tool_calls, input_type = self._parse_input(input, store)
+        config_list = get_config_list(config, len(tool_calls))
+        groups = group_by_keys(range(len(tool_calls)), lambda i: tool_call_keys(tool_calls[i]))
+        outputs: List[Any] = [None] * len(tool_calls)
+
+        def run_group(group: List[int]) -> None:
+            for index in group:
+                outputs[index] = self._run_one(tool_calls[index], input_type, config_list[index])
+
+        if len(groups) <= 1:
+            for group in groups:
+                run_group(group)
+        else:
+            with get_executor_for_config(
+                {**config, "max_concurrency": min(self.max_workers, len(groups))}
+            ) as executor:
+                list(executor.map(run_group, groups))
+
+        return self._combine_tool_outputs(outputs, input_type)
+
+    async def _afunc(
+        self, input: Any, config: RunnableConfig, *, store: Optional[BaseStore]
+    ) -> Any:
+        tool_calls, input_type = self._parse_input(input, store)
+        groups = group_by_keys(range(len(tool_calls)), lambda i: tool_call_keys(tool_calls[i]))
+        outputs: List[Any] = [None] * len(tool_calls)
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def run_group(group: List[int]) -> None:
+            for index in group:
+                async with semaphore:
+                    outputs[index] = await self._arun_one(tool_calls[index], input_type, config)
+
+        await asyncio.gather(*(run_group(group) for group in groups))
+
+        return self._combine_tool_outputs(outputs, input_type)
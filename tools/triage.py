@@ -0,0 +1,134 @@
+"""Cheap routing of incoming emails before any Gemini Pro call."""
+
+import os
+import re
+from dataclasses import dataclass
+from email.utils import parseaddr
+from typing import Any, Dict, Optional
+
+from tools.logger import logger
+
+SKIP = "skip"
+DRAFT = "draft"
+SCHEDULE = "schedule"
+ROUTES = (SKIP, DRAFT, SCHEDULE)
+
+# Gmail categories that never need a reply; CATEGORY_UPDATES is left out by default
+# because Gmail files real correspondence (orders, bookings, shared docs) there too
+SKIP_CATEGORIES = set(
+    filter(None, os.getenv("TRIAGE_SKIP_CATEGORIES", "CATEGORY_PROMOTIONS,CATEGORY_SOCIAL,CATEGORY_FORUMS").split(","))
+)
+CALENDAR_MIME_TYPES = {"text/calendar", "application/ics"}
+
+_NO_REPLY_RE = re.compile(
+    r"^(no-?reply|do-?not-?reply|donotreply|notifications?|mailer-daemon|postmaster|bounces?)\b",
+    re.IGNORECASE,
+)
+_SCHEDULING_RE = re.compile(
+    r"\b(meet(ing)?|call|schedul\w*|reschedul\w*|calendar|invit(e|ation)|appointment|"
+    r"deadline|due (on|by)|agenda|webinar|interview|demo|sync|catch up|"
+    r"tomorrow|tonight|next (week|month)|"
+    r"(mon|tues|wednes|thurs|fri|satur|sun)day|mon|tue|wed|thu|fri|sat|sun)\b"
+    r"|\b\d{1,2}(:\d{2})?\s?(am|pm)\b"
+    r"|\b\d{1,2}(st|nd|rd|th)?\s+(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\w*\b",
+    re.IGNORECASE,
+)
+# Scheduling keyword hits needed before routing to the scheduling agent
+SCHEDULING_THRESHOLD = 2
+
+TRIAGE_PROMPT = """Classify the email below for an email assistant. Answer with exactly one word:
+skip - newsletters, marketing, receipts, automated notifications or anything needing no reply
+schedule - meetings, events, deadlines or to-dos that belong in a calendar
+draft - anything else that deserves a reply
+
+{email}"""
+
+
+@dataclass(frozen=True)
+class TriageDecision:
+    """Route chosen for an email and why."""
+
+    route: str
+    reason: str
+
+
+def header_rules(email: Dict[str, Any]) -> Optional[TriageDecision]:
+    """
+    Applies the header based rules.
+
+    Args:
+        email: Email dict as returned by ``parse_message``
+
+    Returns:
+        Optional[TriageDecision]: A decision, or None if the headers are inconclusive
+    """
+    headers = email.get("headers", {})
+    if any(a["mime_type"] in CALENDAR_MIME_TYPES for a in email.get("attachments", [])):
+        return TriageDecision(SCHEDULE, "calendar_invite")
+    if headers.get("auto-submitted", "no").lower() != "no":
+        return TriageDecision(SKIP, "auto_submitted")
+    if headers.get("list-unsubscribe") or headers.get("list-id"):
+        return TriageDecision(SKIP, "mailing_list")
+    if headers.get("precedence", "").lower() in {"bulk", "list", "junk"}:
+        return TriageDecision(SKIP, "bulk_precedence")
+    local_part = parseaddr(email.get("sender", ""))[1].split("@")[0]
+    if _NO_REPLY_RE.match(local_part):
+        return TriageDecision(SKIP, "no_reply_sender")
+    categories = SKIP_CATEGORIES.intersection(email.get("labels", []))
+    if categories:
+        return TriageDecision(SKIP, f"gmail_{min(categories).lower()}")
+    return None
+
+
+def keyword_route(email: Dict[str, Any]) -> TriageDecision:
+    """Chooses between drafting and scheduling from scheduling keywords in the email."""
+    text = f"{email.get('subject', '')}\n{email.get('body', '')}"
+    hits = len(_SCHEDULING_RE.findall(text))
+    if hits >= SCHEDULING_THRESHOLD:
+        return TriageDecision(SCHEDULE, "scheduling_keywords")
+    return TriageDecision(DRAFT, "no_scheduling_keywords")
+
+
+def model_route(email_text: str, model: Any) -> Optional[TriageDecision]:
+    """
+    Asks a small model to classify the email.
+
+    Args:
+        email_text: Compact email as rendered by ``format_email_for_agent``
+        model: LangChain chat model, expected to be much cheaper than Gemini Pro
+
+    Returns:
+        Optional[TriageDecision]: The model's decision, or None if it failed or was unclear
+    """
+    try:
+        answer = model.invoke(TRIAGE_PROMPT.format(email=email_text)).content
+    except Exception as e:
+        logger.warning("triage_model_error", error=str(e))
+        return None
+    route = str(answer).strip().lower().split()[0] if str(answer).strip() else ""
+    route = route.strip(".:*'\"")
+    if route not in ROUTES:
+        logger.warning("triage_model_unclear", answer=str(answer)[:100])
+        return None
+    return TriageDecision(route, "model")
+
+
+def triage(email: Dict[str, Any], email_text: str = None, model: Any = None) -> TriageDecision:
+    """
+    Decides whether an email is skipped, only answered, or fully scheduled.
+
+    Header rules run first. Emails they cannot decide are classified by
+    ``model`` when one is given, and by scheduling keywords otherwise.
+
+    Args:
+        email: Email dict as returned by ``parse_message``
+        email_text: Compact rendering of the email for the model (optional)
+        model: Cheap chat model used for the emails the rules cannot decide (optional)
+
+    Returns:
+        TriageDecision: One of SKIP, DRAFT or SCHEDULE and the reason
+    """
+    decision = header_rules(email)
+    if decision is None and model is not None and email_text:
+        decision = model_route(email_text, model)
+    return decision or keyword_route(email)
@@ -0,0 +1,299 @@
+"""Durable SQLite work queue between inbox ingestion and agent processing."""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from tools.logger import logger
+
+QUEUE_PATH = "work_queue.sqlite3"
+# A leased job becomes visible again if it is not acked or failed within this time
+VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("WORK_QUEUE_VISIBILITY_SECONDS", "600"))
+# Jobs failing this many times are moved to the dead-letter table
+MAX_ATTEMPTS = int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", "3"))
+# Delay before a failed job is retried, doubled on every further attempt
+RETRY_DELAY_SECONDS = int(os.getenv("WORK_QUEUE_RETRY_DELAY_SECONDS", "30"))
+
+QUEUED = "queued"
+LEASED = "leased"
+
+
+@dataclass
+class Job:
+    """A leased email waiting to be acked or failed."""
+
+    message_id: str
+    email: Dict[str, Any]
+    attempts: int
+
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WorkQueue:
+    """
+    Persistent queue of parsed emails with leases and a dead-letter table.
+
+    ``enqueue`` is idempotent per message ID. ``lease`` hands out jobs in
+    arrival order and hides them for ``visibility_timeout_seconds``; a job is
+    then either ``ack``-ed (deleted) or ``fail``-ed, which schedules a retry
+    with exponential delay or, after ``max_attempts``, moves it to the
+    dead-letter table. Jobs leased by a process that died are picked up again
+    once their lease expires, or right away by ``recover``.
+    """
+
+    def __init__(
+        self,
+        path: str = QUEUE_PATH,
+        visibility_timeout_seconds: int = VISIBILITY_TIMEOUT_SECONDS,
+        max_attempts: int = MAX_ATTEMPTS,
+        retry_delay_seconds: int = RETRY_DELAY_SECONDS,
+        owner: Optional[str] = None,
+    ):
+        self.visibility_timeout_seconds = visibility_timeout_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay_seconds = retry_delay_seconds
+        self.owner = owner or default_owner()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                message_id TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                leased_until REAL,
+                last_error TEXT,
+                enqueued_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_available ON jobs (status, available_at);
+            CREATE TABLE IF NOT EXISTS dead_letters (
+                message_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                last_error TEXT,
+                failed_at REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def enqueue(self, emails: Iterable[Dict[str, Any]]) -> int:
+        """
+        Adds parsed emails to the queue, ignoring ones that are already queued.
+
+        Returns:
+            int: Number of newly queued emails
+        """
+        now = time.time()
+        rows = [(email["id"], json.dumps(email), QUEUED, now, now) for email in emails]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs (message_id, payload, status, available_at, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            added = self._conn.total_changes - before
+        if added:
+            logger.info("work_queue_enqueued", count=added)
+        return added
+
+    def lease(self, limit: int = 100) -> List[Job]:
+        """
+        Leases up to ``limit`` available jobs, oldest first.
+
+        Jobs whose retry delay has passed and jobs whose lease expired are
+        both available.
+        """
+        now = time.time()
+        available = (QUEUED, now, LEASED, now)
+        leased = []
+        with self._lock:
+            # Another process (e.g. the previous owner of the account during a
+            # rebalance) may lease concurrently: IMMEDIATE takes the write lock
+            # before reading, and the guarded UPDATE only claims still-available jobs
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT message_id, payload, attempts FROM jobs "
+                    "WHERE (status = ? AND available_at <= ?) OR (status = ? AND leased_until < ?) "
+                    "ORDER BY seq LIMIT ?",
+                    (*available, limit),
+                ).fetchall()
+                for message_id, payload, attempts in rows:
+                    cursor = self._conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, leased_until = ? "
+                        "WHERE message_id = ? "
+                        "AND ((status = ? AND available_at <= ?) OR (status = ? AND leased_until < ?))",
+                        (LEASED, self.owner, now + self.visibility_timeout_seconds, message_id, *available),
+                    )
+                    if cursor.rowcount == 1:
+                        leased.append(Job(message_id, json.loads(payload), attempts + 1))
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return leased
+
+    def ack(self, message_id: str) -> bool:
+        """
+        Removes a successfully processed job, if this queue still holds its lease.
+
+        Returns:
+            bool: False if the lease expired and another owner leased the job meanwhile
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE message_id = ? AND status = ? AND lease_owner = ?",
+                (message_id, LEASED, self.owner),
+            )
+            self._conn.commit()
+        if cursor.rowcount == 0:
+            logger.warning("work_queue_lease_lost", message_id=message_id, action="ack")
+        return cursor.rowcount == 1
+
+    def fail(self, message_id: str, error: str) -> bool:
+        """
+        Records a failed attempt and schedules a retry or dead-letters the job.
+
+        Nothing is recorded if the lease expired and another owner leased the job meanwhile.
+
+        Returns:
+            bool: True if the job was moved to the dead-letter table
+        """
+        now = time.time()
+        with self._lock:
+            # The check and the write run in one write transaction, like lease
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT payload, attempts FROM jobs WHERE message_id = ? AND status = ? AND lease_owner = ?",
+                    (message_id, LEASED, self.owner),
+                ).fetchone()
+                if row is None:
+                    self._conn.rollback()
+                    logger.warning("work_queue_lease_lost", message_id=message_id, action="fail")
+                    return False
+                payload, attempts = row
+                dead = attempts >= self.max_attempts
+                if dead:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO dead_letters VALUES (?, ?, ?, ?, ?)",
+                        (message_id, payload, attempts, error, now),
+                    )
+                    self._conn.execute("DELETE FROM jobs WHERE message_id = ?", (message_id,))
+                else:
+                    delay = self.retry_delay_seconds * 2 ** (attempts - 1)
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, "
+                        "leased_until = NULL, last_error = ? WHERE message_id = ?",
+                        (QUEUED, now + delay, error, message_id),
+                    )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        if dead:
+            logger.error("work_queue_dead_lettered", message_id=message_id, attempts=attempts, error=error)
+        return dead
+
+    def recover(self) -> int:
+        """
+        Releases leases held by processes on this host that are no longer running.
+
+        Returns:
+            int: Number of jobs made available again
+        """
+        host = socket.gethostname()
+        with self._lock:
+            stale = []
+            for message_id, owner in self._conn.execute(
+                "SELECT message_id, lease_owner FROM jobs WHERE status = ?", (LEASED,)
+            ):
+                owner_host, _, pid = (owner or "").rpartition(":")
+                if owner_host == host and pid.isdigit() and (int(pid) == os.getpid() or not _pid_alive(int(pid))):
+                    stale.append(message_id)
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, leased_until = NULL "
+                "WHERE message_id = ?",
+                [(QUEUED, time.time(), message_id) for message_id in stale],
+            )
+            self._conn.commit()
+        if stale:
+            logger.warning("work_queue_leases_recovered", count=len(stale))
+        return len(stale)
+
+    def requeue_dead_letters(self, message_ids: Optional[List[str]] = None) -> List[str]:
+        """
+        Moves dead-lettered jobs back into the queue with a fresh attempt count.
+
+        The ledger still records these emails as failed; callers reset their
+        entries (``ProcessedLedger.reset``), or the requeued jobs are skipped.
+
+        Args:
+            message_ids: Jobs to requeue (default: all)
+
+        Returns:
+            List[str]: IDs of the requeued jobs
+        """
+        now = time.time()
+        with self._lock:
+            query = "SELECT message_id, payload FROM dead_letters"
+            params: tuple = ()
+            if message_ids is not None:
+                query += f" WHERE message_id IN ({','.join('?' * len(message_ids))})"
+                params = tuple(message_ids)
+            rows = self._conn.execute(query, params).fetchall()
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs (message_id, payload, status, available_at, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(message_id, payload, QUEUED, now, now) for message_id, payload in rows],
+            )
+            self._conn.executemany(
+                "DELETE FROM dead_letters WHERE message_id = ?", [(row[0],) for row in rows]
+            )
+            self._conn.commit()
+        if rows:
+            logger.info("work_queue_dead_letters_requeued", count=len(rows))
+        return [row[0] for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the number of queued, leased and dead-lettered jobs and the age of the oldest job."""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+            (dead,) = self._conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()
+            (oldest,) = self._conn.execute("SELECT MIN(enqueued_at) FROM jobs").fetchone()
+        return {
+            "queued": counts.get(QUEUED, 0),
+            "leased": counts.get(LEASED, 0),
+            "dead": dead,
+            "oldest_queued_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+        }
+
+    def close(self) -> None:
+        """Closes the database connection; the instance is unusable afterwards."""
+        with self._lock:
+            self._conn.close()